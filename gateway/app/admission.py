@@ -0,0 +1,151 @@
+import os
+import heapq
+import asyncio
+import itertools
+from typing import List, Tuple
+
+# 우선순위 클래스 (숫자가 작을수록 먼저 처리됩니다)
+PRIORITY_CRITICAL = 0  # 로그인/인증
+PRIORITY_WRITE = 1     # 쓰기 요청
+PRIORITY_READ = 2      # 일반 조회
+PRIORITY_LIST = 3      # 목록 조회, 백그라운드 캐시 갱신
+
+PRIORITY_NAMES = {
+    PRIORITY_CRITICAL: "critical",
+    PRIORITY_WRITE: "write",
+    PRIORITY_READ: "read",
+    PRIORITY_LIST: "list",
+}
+
+# 세미콜론으로 구분한 경로 목록. '*'로 끝나면 prefix 입니다.
+GATEWAY_CRITICAL_PATHS = os.getenv("GATEWAY_CRITICAL_PATHS", "/api/auth/*")
+GATEWAY_LIST_PATHS = os.getenv("GATEWAY_LIST_PATHS", "/api/board/posts;/api/blog/articles;/api/blog/tags;/api/board/search;/api/blog/search")
+
+
+def _parse_paths(spec: str) -> Tuple[frozenset, Tuple[str, ...]]:
+    exact, prefixes = set(), []
+    for item in spec.split(";"):
+        item = item.strip()
+        if item.endswith("*"):
+            prefixes.append(item[:-1])
+        elif item:
+            exact.add(item)
+    return frozenset(exact), tuple(prefixes)
+
+
+_CRITICAL_EXACT, _CRITICAL_PREFIXES = _parse_paths(GATEWAY_CRITICAL_PATHS)
+_LIST_EXACT, _LIST_PREFIXES = _parse_paths(GATEWAY_LIST_PATHS)
+
+
+def request_priority(method: str, path: str) -> int:
+    if path in _CRITICAL_EXACT or path.startswith(_CRITICAL_PREFIXES):
+        return PRIORITY_CRITICAL
+    if method not in ("GET", "HEAD", "OPTIONS"):
+        return PRIORITY_WRITE
+    if path in _LIST_EXACT or path.startswith(_LIST_PREFIXES):
+        return PRIORITY_LIST
+    return PRIORITY_READ
+
+
+class UpstreamOverloaded(Exception):
+    """동시 처리 한도와 대기열이 모두 찼거나 대기 시간이 초과되었을 때 발생합니다."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: int):
+        super().__init__(f"{upstream} overloaded ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """업스트림 하나의 동시 요청 수를 제한하고, 초과분은 우선순위 대기열에 넣습니다.
+
+    대기열이 가득 차면 가장 낮은 우선순위 요청부터 즉시 거절(shed)하고,
+    대기열에서 queue_timeout 이상 기다린 요청도 거절합니다.
+    느린 업스트림 하나가 게이트웨이 워커 전체를 묶어두지 않도록 하기 위함입니다.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        # (우선순위, 순번, future) 최소 힙
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self.admitted = 0
+        self.queued = 0
+        self.shed = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.queue_timeouts = 0
+
+    def _overloaded(self, priority: int, reason: str) -> UpstreamOverloaded:
+        self.shed[PRIORITY_NAMES.get(priority, "read")] += 1
+        return UpstreamOverloaded(self.name, reason, self.retry_after)
+
+    async def acquire(self, priority: int = PRIORITY_READ):
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            # 대기열이 가득 찼을 때 새 요청보다 우선순위가 낮은 대기 요청이 있으면 그것을 대신 거절합니다.
+            worst_index = max(range(len(self._waiters)), key=lambda i: self._waiters[i][:2], default=None)
+            if worst_index is None or self._waiters[worst_index][0] <= priority:
+                raise self._overloaded(priority, "queue full")
+            worst_priority, _, worst_future = self._waiters.pop(worst_index)
+            heapq.heapify(self._waiters)
+            if not worst_future.done():
+                worst_future.set_exception(self._overloaded(worst_priority, "preempted"))
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        self.queued += 1
+        timer = loop.call_later(self.queue_timeout, self._expire, future, priority)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 슬롯을 넘겨받은 직후 취소되었다면 슬롯을 반납하고, 아니면 대기열에서 뺍니다.
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()
+            else:
+                self._discard(future)
+            raise
+        finally:
+            timer.cancel()
+        self.admitted += 1
+
+    def _expire(self, future: asyncio.Future, priority: int):
+        if not future.done():
+            self.queue_timeouts += 1
+            self._discard(future)
+            future.set_exception(self._overloaded(priority, "queue timeout"))
+
+    def _discard(self, future: asyncio.Future):
+        self._waiters = [waiter for waiter in self._waiters if waiter[2] is not future]
+        heapq.heapify(self._waiters)
+
+    def release(self):
+        # 대기 중인 요청이 있으면 슬롯을 바로 넘겨주므로 in_flight는 그대로 유지됩니다.
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_length": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "queue_timeouts": self.queue_timeouts,
+            "shed": dict(self.shed),
+        }
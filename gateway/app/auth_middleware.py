@@ -1,44 +1,150 @@
 import os
 import httpx
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
-from starlette.datastructures import MutableHeaders
+from typing import Optional, Tuple
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from session_cache import session_cache, session_cache_sync
+from upstreams import upstreams
+from admission import UpstreamOverloaded, PRIORITY_CRITICAL
+from tracing import span
+from session_tokens import (
+    SESSION_TOKEN_TTL_SECONDS, RevocationMirror, is_signed_token, needs_refresh,
+    sign_session_token, signed_sessions_enabled, verify_session_token,
+)
 
-USER_SERVICE_URL = os.getenv("USER_SERVICE_URL")
+# /api/batch는 하위 요청에 쓰기가 있을 때 핸들러 안에서 한 번만 인증합니다.
+PUBLIC_PATHS = frozenset(["/api/auth/login", "/api/auth/register", "/api/batch"])
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        public_paths = ["/api/auth/login", "/api/auth/register"]
-        
-        if request.method in ("GET", "OPTIONS") or request.url.path in public_paths:
-            return await call_next(request)
+# 이 경로들이 게이트웨이를 통과하면 해당 세션을 캐시에서 제거합니다.
+SESSION_INVALIDATING_PATHS = ("/api/auth/logout", "/api/auth/change-password")
 
-        session_id = request.cookies.get("session_id")
+
+# 서명 세션 토큰의 폐기 목록을 Redis에서 복제해 두는 미러 (SESSION_SIGNING_KEY와 REDIS_URL이 있을 때만 동작)
+revocation_mirror = RevocationMirror(os.getenv("REDIS_URL"))
+
+
+def session_id_from_scope(scope: Scope):
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            return cookie_parser(value.decode("latin-1")).get("session_id")
+    return None
+
+
+async def authenticate_session(session_id: str) -> Tuple[Optional[str], Optional[JSONResponse]]:
+    """세션 캐시 또는 user_service로 세션을 확인합니다. (user_id, 실패 응답) 중 하나만 채워 반환합니다."""
+    # 서명 토큰은 폐기 목록 미러가 살아 있는 동안 네트워크 호출 없이 여기서 바로 검증합니다.
+    if is_signed_token(session_id) and revocation_mirror.ready:
+        claims = verify_session_token(session_id)
+        if claims is None or revocation_mirror.is_revoked(claims):
+            return None, JSONResponse(status_code=401, content={"detail": "Invalid or expired session"})
+        return str(claims.user_id), None
+
+    cached = session_cache.get(session_id)
+    if cached is not None:
+        user_id, failure = cached
+        if failure is not None:
+            status_code, body = failure
+            return None, JSONResponse(status_code=status_code, content=body)
+        return user_id, None
+
+    try:
+        # 매 요청마다 클라이언트를 새로 만들지 않고 게이트웨이 공용 커넥션 풀을 재사용합니다.
+        user_upstream = upstreams.get("user")
+        auth_url = f"{user_upstream.base_url}/api/auth/me"
+        auth_resp = await user_upstream.request(
+            "GET", auth_url, priority=PRIORITY_CRITICAL, headers={"cookie": f"session_id={session_id}"}
+        )
+    except UpstreamOverloaded as exc:
+        return None, JSONResponse(
+            status_code=503,
+            content={"detail": "User service is overloaded"},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    except httpx.RequestError:
+        return None, JSONResponse(status_code=503, content={"detail": "User service is unavailable"})
+
+    if auth_resp.status_code != 200:
+        body = auth_resp.json()
+        # 유효하지 않은 세션(401)만 짧게 음성 캐시합니다. 5xx 등은 캐시하지 않습니다.
+        if auth_resp.status_code == 401:
+            session_cache.set_invalid(session_id, auth_resp.status_code, body)
+        return None, JSONResponse(status_code=auth_resp.status_code, content=body)
+
+    user_id = str(auth_resp.json().get("id"))
+    session_cache.set_user(session_id, user_id)
+    return user_id, None
+
+
+def refreshed_session_cookie(session_id: str) -> Optional[bytes]:
+    """인증을 통과한 서명 토큰이 수명의 절반을 넘겼으면 새 토큰을 담은 Set-Cookie 값을 반환합니다.
+
+    /api/auth/me는 페이지를 새로 열 때만 호출되므로, 한 화면에 오래 머무는 사용자도 쓰기 요청마다 세션이 연장되게 합니다.
+    """
+    if not signed_sessions_enabled() or not is_signed_token(session_id):
+        return None
+    claims = verify_session_token(session_id)
+    if claims is None or not needs_refresh(claims):
+        return None
+    token = sign_session_token(claims.user_id)
+    return f"session_id={token}; HttpOnly; Max-Age={SESSION_TOKEN_TTL_SECONDS}; Path=/; SameSite=lax".encode("latin-1")
+
+
+def _sets_session_cookie(headers) -> bool:
+    return any(name.lower() == b"set-cookie" and value.startswith(b"session_id=") for name, value in headers)
+
+
+class AuthMiddleware:
+    """쓰기 요청의 세션을 확인하고 X-User-Id 헤더를 ASGI scope에 직접 넣어주는 pure ASGI 미들웨어입니다.
+
+    BaseHTTPMiddleware는 요청마다 태스크와 메모리 스트림을 추가로 만들기 때문에 사용하지 않습니다.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # 클라이언트가 보낸 X-User-Id는 메서드와 관계없이 버립니다. 인증을 통과한 요청에만 게이트웨이가 다시 붙입니다.
+        scope["headers"] = [(name, value) for name, value in scope["headers"] if name != b"x-user-id"]
+        if scope["method"] in ("GET", "OPTIONS") or scope["path"] in PUBLIC_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        session_id = session_id_from_scope(scope)
         if not session_id:
-            return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+            await JSONResponse(status_code=401, content={"detail": "Not authenticated"})(scope, receive, send)
+            return
+
+        with span("gateway.auth") as auth_span:
+            user_id, failure = await authenticate_session(session_id)
+            if auth_span is not None:
+                auth_span.set_attribute("auth.result", "ok" if failure is None else failure.status_code)
+        if failure is not None:
+            await failure(scope, receive, send)
+            return
+
+        scope["headers"].append((b"x-user-id", user_id.encode("latin-1")))
+
+        # 로그아웃/비밀번호 변경은 user_service가 쿠키를 직접 지우거나 바꾸므로 갱신하지 않습니다.
+        refreshed = None if scope["path"] in SESSION_INVALIDATING_PATHS else refreshed_session_cookie(session_id)
+        if refreshed is not None:
+            downstream_send = send
+
+            async def send(message: Message):
+                if message["type"] == "http.response.start" and not _sets_session_cookie(message.get("headers", [])):
+                    message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", refreshed)]
+                await downstream_send(message)
 
         try:
-            async with httpx.AsyncClient() as client:
-                auth_url = f"{USER_SERVICE_URL}/api/auth/me"
-                auth_resp = await client.get(auth_url, cookies={"session_id": session_id})
-
-                if auth_resp.status_code != 200:
-                    return JSONResponse(status_code=auth_resp.status_code, content=auth_resp.json())
-                
-                user_data = auth_resp.json()
-                user_id = str(user_data.get("id"))
-
-                # ▼▼▼ 헤더 수정 로직 변경 ▼▼▼
-                # request.scope['headers']는 직접 수정할 수 없는 튜플 리스트입니다.
-                # 따라서 새로운 헤더 리스트를 만들어 교체해야 합니다.
-                new_headers = request.headers.mutablecopy()
-                new_headers["X-User-Id"] = user_id
-                request.scope["headers"] = new_headers.raw
-                # ▲▲▲ 헤더 수정 로직 변경 ▲▲▲
-
-        except httpx.RequestError:
-            return JSONResponse(status_code=503, content={"detail": "User service is unavailable"})
-
-        response = await call_next(request)
-        return response
\ No newline at end of file
+            await self.app(scope, receive, send)
+        finally:
+            # 로그아웃/비밀번호 변경 후에는 user_service에서 세션이 삭제되므로 모든 워커의 캐시도 비웁니다.
+            # 다운스트림에서 예외가 나도 세션이 이미 삭제됐을 수 있으므로 finally에서 처리합니다.
+            if scope["path"] == "/api/auth/change-password":
+                await session_cache_sync.invalidate_user(user_id)
+            elif scope["path"] in SESSION_INVALIDATING_PATHS:
+                await session_cache_sync.invalidate_session(session_id)
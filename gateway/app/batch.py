@@ -0,0 +1,202 @@
+import os
+import json
+import asyncio
+import httpx
+from typing import List, Optional
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from auth_middleware import PUBLIC_PATHS, SESSION_INVALIDATING_PATHS, authenticate_session, session_id_from_scope
+from routing import route_table
+from upstreams import upstreams
+from proxy import reverse_proxy
+from tracing import span
+
+# 배치 하나에 담을 수 있는 하위 요청 수와, 그중 동시에 업스트림으로 보낼 수
+GATEWAY_BATCH_MAX = int(os.getenv("GATEWAY_BATCH_MAX", "20"))
+GATEWAY_BATCH_CONCURRENCY = int(os.getenv("GATEWAY_BATCH_CONCURRENCY", "8"))
+
+BATCH_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+# 하위 요청에 그대로 복사하지 않는 바깥 요청 헤더
+# (본문 관련 헤더는 하위 요청마다 새로 만들고, 하위 응답은 JSON에 담아야 하므로 압축을 요청하지 않습니다.)
+_DROPPED_HEADERS = frozenset([
+    b"content-length", b"content-type", b"transfer-encoding", b"accept-encoding",
+    b"x-user-id", b"if-none-match", b"expect",
+])
+
+# 하위 응답에서 클라이언트에 돌려주는 헤더
+_RETURNED_HEADERS = ("content-type", "etag", "cache-control", "x-cache", "location", "retry-after")
+
+
+def _parse_batch(payload) -> List[dict]:
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        raise HTTPException(status_code=400, detail="Body must be {\"requests\": [...]}")
+    items = payload["requests"]
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(items) > GATEWAY_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {GATEWAY_BATCH_MAX})")
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            raise HTTPException(status_code=400, detail=f"Sub-request {index} needs a path")
+    return items
+
+
+def _error(sub_id, status_code: int, detail: str) -> dict:
+    return {"id": sub_id, "status": status_code, "headers": {}, "body": {"detail": detail}}
+
+
+def _decode_body(content_type: str, body: bytes):
+    if not body:
+        return None
+    if content_type.startswith("application/json"):
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", errors="replace")
+
+
+async def _run_sub_request(outer: Request, base_headers: list, user_id: Optional[str], index: int, item: dict) -> dict:
+    sub_id = item.get("id", index)
+    method = str(item.get("method", "GET")).upper()
+    path, _, query = item["path"].partition("?")
+
+    if method not in BATCH_METHODS:
+        return _error(sub_id, 405, "Method not allowed in batch")
+    # 세션 쿠키를 만들거나 지우는 요청은 Set-Cookie를 브라우저에 전달할 수 없으므로 배치에서 받지 않습니다.
+    if path in PUBLIC_PATHS or path in SESSION_INVALIDATING_PATHS:
+        return _error(sub_id, 400, "Path not allowed in batch")
+    matched = route_table.match(path)
+    if matched is None:
+        return _error(sub_id, 404, "Endpoint not found")
+    if method != "GET" and user_id is None:
+        return _error(sub_id, 401, "Not authenticated")
+
+    headers = list(base_headers)
+    extra_headers = item.get("headers") or {}
+    if not isinstance(extra_headers, dict):
+        return _error(sub_id, 400, "headers must be an object")
+    for name, value in extra_headers.items():
+        name = name.lower().encode("latin-1")
+        if name not in _DROPPED_HEADERS and name not in (b"cookie", b"host"):
+            headers.append((name, str(value).encode("latin-1")))
+    body = b""
+    if "body" in item and method != "GET":
+        body = json.dumps(item["body"]).encode("utf-8")
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+    # 직접 보낸 GET처럼 읽기에는 X-User-Id를 붙이지 않습니다. (배치 여부에 따라 캐시/병합 키가 달라지지 않도록)
+    if user_id is not None and method != "GET":
+        headers.append((b"x-user-id", user_id.encode("latin-1")))
+
+    scope = {
+        "type": "http",
+        "http_version": outer.scope.get("http_version", "1.1"),
+        "method": method,
+        "scheme": outer.scope.get("scheme", "http"),
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("latin-1"),
+        "root_path": "",
+        "headers": headers,
+        "client": outer.scope.get("client"),
+        "server": outer.scope.get("server"),
+    }
+    body_sent = False
+    # 하위 요청에는 끊길 클라이언트가 없으므로 본문을 준 뒤에는 영원히 기다립니다.
+    # 여기서 http.disconnect를 돌려주면 StreamingResponse가 연결이 끊긴 줄 알고 본문 전송을 바로 취소합니다.
+    never_disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if body_sent:
+            await never_disconnected.wait()
+        body_sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    try:
+        response = await reverse_proxy(Request(scope, receive), upstreams.get(matched[1]))
+    except HTTPException as exc:
+        return _error(sub_id, exc.status_code, exc.detail)
+    except httpx.HTTPError as exc:
+        # 하위 요청 하나의 실패가 배치 전체를 실패시키지 않도록 해당 항목만 502로 돌려줍니다.
+        return _error(sub_id, 502, f"Upstream error: {exc.__class__.__name__}")
+
+    # 스트리밍 응답도 여기서 끝까지 읽어야 업스트림 커넥션/승인 슬롯이 반환됩니다.
+    status_code = 500
+    response_headers = {}
+    chunks = []
+
+    async def send(message):
+        nonlocal status_code, response_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers = {
+                name.decode("latin-1"): value.decode("latin-1") for name, value in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await response(scope, receive, send)
+    except httpx.HTTPError as exc:
+        return _error(sub_id, 502, f"Upstream error: {exc.__class__.__name__}")
+    content_type = response_headers.get("content-type", "")
+    return {
+        "id": sub_id,
+        "status": status_code,
+        "headers": {name: response_headers[name] for name in _RETURNED_HEADERS if name in response_headers},
+        "body": _decode_body(content_type, b"".join(chunks)),
+    }
+
+
+async def execute_batch(request: Request) -> JSONResponse:
+    """여러 하위 요청을 한 번의 왕복으로 처리합니다.
+
+    하위 요청은 라우팅 테이블/응답 캐시/single-flight/승인 제어를 그대로 거치고,
+    각 결과는 요청 순서대로 자신의 상태 코드와 함께 반환됩니다.
+    읽기(GET)는 동시에 실행하고, 쓰기는 앞의 쓰기가 끝난 뒤에 요청 순서대로 하나씩 실행합니다.
+    그래서 같은 배치의 생성 -> 수정은 순서대로 적용되지만, 읽기가 같은 배치의 쓰기 결과를 본다는 보장은 없습니다.
+    쓰기 하위 요청이 있을 때만 세션을 한 번 확인합니다.
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    items = _parse_batch(payload)
+
+    base_headers = [(name, value) for name, value in request.headers.raw if name not in _DROPPED_HEADERS]
+
+    user_id = None
+    needs_auth = any(str(item.get("method", "GET")).upper() != "GET" for item in items)
+    session_id = session_id_from_scope(request.scope)
+    if needs_auth and session_id:
+        with span("gateway.auth"):
+            user_id, failure = await authenticate_session(session_id)
+        # 세션이 유효하지 않으면(401) 쓰기 하위 요청만 401이 되고, 그 외 실패는 배치 전체 실패로 돌려줍니다.
+        if failure is not None and failure.status_code != 401:
+            return failure
+
+    semaphore = asyncio.Semaphore(GATEWAY_BATCH_CONCURRENCY)
+
+    async def run(index: int, item: dict) -> dict:
+        async with semaphore:
+            return await _run_sub_request(request, base_headers, user_id, index, item)
+
+    results: List[Optional[dict]] = [None] * len(items)
+    is_read = [str(item.get("method", "GET")).upper() == "GET" for item in items]
+    reads = [index for index, read in enumerate(is_read) if read]
+    writes = [index for index, read in enumerate(is_read) if not read]
+
+    async def run_reads():
+        for index, result in zip(reads, await asyncio.gather(*(run(index, items[index]) for index in reads))):
+            results[index] = result
+
+    async def run_writes():
+        for index in writes:
+            results[index] = await run(index, items[index])
+
+    await asyncio.gather(run_reads(), run_writes())
+    return JSONResponse(content={"responses": results})
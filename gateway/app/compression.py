@@ -0,0 +1,214 @@
+import os
+import zlib
+from typing import Optional, Set, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli는 선택 의존성입니다. 없으면 gzip만 사용합니다.
+    brotli = None
+
+GATEWAY_COMPRESSION_MIN_SIZE = int(os.getenv("GATEWAY_COMPRESSION_MIN_SIZE", "1024"))
+GATEWAY_COMPRESSION_TYPES = tuple(
+    item.strip()
+    for item in os.getenv(
+        "GATEWAY_COMPRESSION_TYPES", "application/json,text/,application/javascript,image/svg+xml"
+    ).split(",")
+    if item.strip()
+)
+GATEWAY_GZIP_LEVEL = int(os.getenv("GATEWAY_GZIP_LEVEL", "6"))
+GATEWAY_BROTLI_QUALITY = int(os.getenv("GATEWAY_BROTLI_QUALITY", "4"))
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Accept-Encoding(q 값 포함)를 보고 br 또는 gzip 중 하나를 고릅니다."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def _split_etag(etag: str) -> Tuple[str, str]:
+    return ("W/", etag[2:]) if etag.startswith("W/") else ("", etag)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """압축된 표현의 ETag를 만듭니다. 따옴표 안에 -{encoding}을 붙여 강한 ETag는 강한 ETag로 유지합니다.
+
+    예) "abc" -> "abc-gzip", W/"abc" -> W/"abc-gzip"
+    """
+    weak, opaque = _split_etag(etag)
+    if len(opaque) < 2 or not (opaque.startswith('"') and opaque.endswith('"')):
+        return etag
+    return f'{weak}{opaque[:-1]}-{encoding}"'
+
+
+def strip_encoded_etags(if_none_match: str, encoding: str) -> Tuple[str, Set[str]]:
+    """If-None-Match에서 encoded_etag()가 붙인 접미사를 떼어 업스트림/응답 캐시의 ETag와 비교할 수 있게 합니다.
+
+    (바꾼 헤더 값, 접미사를 뗀 원래 ETag 집합)을 반환합니다.
+    """
+    suffix = f'-{encoding}"'
+    candidates = []
+    stripped = set()
+    for candidate in if_none_match.split(","):
+        weak, opaque = _split_etag(candidate.strip())
+        if opaque.endswith(suffix) and len(opaque) > len(suffix):
+            opaque = opaque[:-len(suffix)] + '"'
+            stripped.add(opaque)
+        candidates.append(weak + opaque)
+    return ", ".join(candidates), stripped
+
+
+class _Encoder:
+    """gzip/brotli 스트리밍 인코더를 같은 인터페이스로 감쌉니다."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=GATEWAY_BROTLI_QUALITY)
+        else:
+            # wbits=31: gzip 헤더/트레일러 포함
+            self._compressor = zlib.compressobj(GATEWAY_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """Accept-Encoding에 따라 응답을 gzip/brotli로 압축하는 pure ASGI 미들웨어입니다.
+
+    - 업스트림이 이미 압축해서 보낸 응답(content-encoding 있음)은 그대로 통과시킵니다.
+    - 허용된 content-type만, 한 번에 끝나는 응답은 최소 크기 이상일 때만 압축합니다.
+    - 스트리밍 응답은 청크가 도착할 때마다 인코더에 넣어 전체 본문을 모으지 않습니다.
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int = GATEWAY_COMPRESSION_MIN_SIZE, content_types: Tuple[str, ...] = GATEWAY_COMPRESSION_TYPES):
+        self.app = app
+        self.min_size = min_size
+        self.content_types = content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        # 클라이언트는 압축된 표현의 ETag("...-gzip")를 보내므로, 안쪽에는 원래 ETag로 바꿔서 전달합니다.
+        revalidated: Set[str] = set()
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            if_none_match, revalidated = strip_encoded_etags(if_none_match, encoding)
+            scope = dict(scope)
+            scope["headers"] = [(name, value) for name, value in scope["headers"] if name != b"if-none-match"]
+            scope["headers"].append((b"if-none-match", if_none_match.encode("latin-1")))
+        await _CompressionResponder(self, encoding, send, revalidated)(scope, receive)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send, revalidated: Set[str]):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        # If-None-Match에서 압축 접미사를 뗀 ETag. 304 응답에는 클라이언트가 가진 압축 표현의 ETag를 돌려줍니다.
+        self.revalidated = revalidated
+        self.start_message: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        # None: 아직 결정 전, True: 압축, False: 그대로 통과
+        self.compress: Optional[bool] = None
+
+    async def __call__(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.send_wrapper)
+
+    def _compressible(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        if message["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(self.middleware.content_types)
+
+    async def send_wrapper(self, message: Message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            if not self._compressible(message):
+                self.compress = False
+                if message["status"] == 304 and self.revalidated:
+                    headers = MutableHeaders(raw=message["headers"])
+                    etag = headers.get("etag")
+                    if etag and _split_etag(etag)[1] in self.revalidated:
+                        headers["etag"] = encoded_etag(etag, self.encoding)
+                        message["headers"] = headers.raw
+                await self.send(message)
+                return
+            # 본문 첫 청크를 보고 압축 여부를 정할 때까지 시작 메시지를 보류합니다.
+            self.start_message = message
+            return
+
+        if message_type != "http.response.body" or self.compress is False:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compress is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not more_body and len(body) < self.middleware.min_size:
+                self.compress = False
+                # 같은 경로라도 본문이 커지면 압축되므로 캐시가 인코딩별로 구분하도록 알립니다.
+                headers.add_vary_header("Accept-Encoding")
+                self.start_message["headers"] = headers.raw
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.compress = True
+            self.encoder = _Encoder(self.encoding)
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag:
+                # 압축된 표현은 바이트가 다르므로 인코딩별로 다른 ETag를 씁니다. (강한 ETag는 그대로 강한 ETag)
+                headers["etag"] = encoded_etag(etag, self.encoding)
+            if more_body:
+                del headers["content-length"]
+                self.start_message["headers"] = headers.raw
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": self.encoder.compress(body), "more_body": True})
+            else:
+                compressed = self.encoder.compress(body) + self.encoder.finish()
+                headers["content-length"] = str(len(compressed))
+                self.start_message["headers"] = headers.raw
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        chunk = self.encoder.compress(body)
+        if not more_body:
+            chunk += self.encoder.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
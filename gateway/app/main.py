@@ -1,11 +1,26 @@
-import os
-import httpx
-from fastapi import FastAPI, Request, Response, HTTPException
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware # CORS 미들웨어 임포트
-from auth_middleware import AuthMiddleware
+from auth_middleware import AuthMiddleware, revocation_mirror
+from routing import GatewayRouter, route_table
+from session_cache import session_cache, session_cache_sync
+from upstreams import upstreams
+from response_cache import response_cache
+from single_flight import single_flight
+from compression import CompressionMiddleware
+from batch import execute_batch
+from metrics import MetricsMiddleware, GatewayStatsCollector, register_collector, metrics_response
+from tracing import TracingMiddleware, traces_response
 
 app = FastAPI(title="API Gateway")
 
+# /api 프록시 경로는 FastAPI 라우팅을 거치지 않고 pure ASGI 라우터가 바로 처리합니다.
+# add_middleware는 나중에 추가한 것이 바깥쪽이 되므로 가장 먼저 추가합니다.
+app.add_middleware(GatewayRouter, table=route_table)
+
+# 응답 압축은 라우터 바로 바깥에서 처리합니다 (업스트림이 압축한 응답은 그대로 통과).
+app.add_middleware(CompressionMiddleware)
+
 # ▼▼▼ CORS 미들웨어 추가 ▼▼▼
 origins = [
     "http://localhost",
@@ -23,56 +38,95 @@ app.add_middleware(
 # 인증 미들웨어는 CORS 미들웨어 뒤에 추가
 app.add_middleware(AuthMiddleware)
 
-USER_SERVICE_URL = os.getenv("USER_SERVICE_URL")
-BOARD_SERVICE_URL = os.getenv("BOARD_SERVICE_URL")
-BLOG_SERVICE_URL = os.getenv("BLOG_SERVICE_URL")
+# 메트릭 미들웨어는 가장 바깥에서 전체 처리 시간을 측정합니다.
+app.add_middleware(MetricsMiddleware, route_table=route_table)
+register_collector(GatewayStatsCollector(session_cache, response_cache, single_flight, upstreams))
+
+# 트레이싱은 메트릭보다도 바깥에서 traceparent를 읽어 요청 전체를 하나의 server 스팬으로 기록합니다.
+app.add_middleware(TracingMiddleware, service_name="gateway")
 
 @app.on_event("startup")
 async def startup_event():
-    timeout = httpx.Timeout(10.0, connect=5.0)
-    app.state.client = httpx.AsyncClient(timeout=timeout)
+    # 업스트림 커넥션 풀은 upstreams 모듈에서 공유하며, AuthMiddleware도 같은 풀을 사용합니다.
+    app.state.upstreams = upstreams
+    # 서명 세션 토큰을 로컬에서 검증할 수 있도록 폐기 목록 미러를 시작합니다.
+    await revocation_mirror.start()
+    # 로그아웃/비밀번호 변경으로 지운 세션을 다른 워커와 주고받습니다.
+    await session_cache_sync.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    await app.state.client.aclose()
+    await upstreams.aclose()
+    await revocation_mirror.stop()
+    await session_cache_sync.stop()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식의 메트릭을 반환합니다."""
+    return metrics_response()
+
+
+@app.post("/api/batch")
+async def batch(request: Request):
+    """여러 API 호출을 한 번에 보내고 각 결과를 상태 코드와 함께 받습니다.
+
+    요청 예: {"requests": [{"id": "me", "method": "GET", "path": "/api/auth/me"},
+                          {"id": "post", "method": "GET", "path": "/api/board/posts/1"}]}
+    """
+    return await execute_batch(request)
+
+
+# 게이트웨이 내부 상태 조회용 엔드포인트
+@app.get("/gateway/stats/session-cache")
+async def session_cache_stats():
+    """AuthMiddleware 세션 캐시의 적중/미스 카운터를 반환합니다."""
+    return session_cache.stats() | {"sync": session_cache_sync.stats()}
+
+
+@app.get("/gateway/stats/session-tokens")
+async def session_token_stats():
+    """서명 세션 토큰 폐기 목록 미러의 상태를 반환합니다."""
+    return revocation_mirror.stats()
+
+
+@app.get("/gateway/stats/upstreams")
+async def upstream_stats():
+    """업스트림별 커넥션 풀 점유율과 대기 시간 통계를 반환합니다."""
+    return upstreams.stats()
+
+
+@app.get("/gateway/stats/admission")
+async def admission_stats():
+    """업스트림별 동시 처리/대기열/거절(shed) 카운터를 반환합니다."""
+    return upstreams.admission_stats()
+
+
+@app.get("/gateway/stats/response-cache")
+async def response_cache_stats():
+    """공개 GET 응답 캐시의 적중률과 메모리 사용량을 반환합니다."""
+    return response_cache.stats()
+
+
+@app.get("/gateway/stats/single-flight")
+async def single_flight_stats():
+    """동일한 동시 GET 요청이 몇 번 합쳐졌는지 반환합니다."""
+    return single_flight.stats()
+
+
+@app.get("/gateway/traces")
+async def traces(limit: int = 100, trace_id: Optional[str] = None):
+    """최근 기록된 스팬을 반환합니다. trace_id로 트레이스 하나만 볼 수 있습니다."""
+    return traces_response(limit, trace_id)
+
+
+@app.get("/gateway/stats/routes")
+async def route_stats():
+    """현재 로드된 라우팅 테이블을 반환합니다."""
+    return route_table.describe()
 
 
-# ▼▼▼ 이 데코레이터에 methods를 추가하여 모든 요청 방식을 허용하도록 변경합니다. ▼▼▼
+# 라우팅 테이블에 없는 경로는 여기로 떨어집니다.
 @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-async def reverse_proxy(request: Request):
-    path = request.url.path
-    client: httpx.AsyncClient = request.app.state.client
-    print(path)
-    print(USER_SERVICE_URL)
-    if path.startswith("/api/users") or path.startswith("/api/auth"):
-        base_url = USER_SERVICE_URL
-    elif path.startswith("/api/board"):
-        base_url = BOARD_SERVICE_URL
-    elif path.startswith("/api/blog"):
-        base_url = BLOG_SERVICE_URL
-    else:
-        raise HTTPException(status_code=404, detail="Endpoint not found")
-
-    url = f"{base_url}{path}?{request.url.query}"
-    
-    try:
-        rp_resp = await client.request(
-            method=request.method,
-            url=url,
-            headers=request.headers.raw,
-            content=await request.body()
-        )
-        
-        response_headers = dict(rp_resp.headers)
-        response_headers.pop("content-length", None)
-        response_headers.pop("content-encoding", None)
-        
-        return Response(
-            content=rp_resp.content,
-            status_code=rp_resp.status_code,
-            headers=response_headers,
-        )
-    except httpx.ConnectError:
-        raise HTTPException(status_code=503, detail=f"Service unavailable: {base_url}")
-    except httpx.ReadTimeout:
-        raise HTTPException(status_code=504, detail=f"Request timeout: {base_url}")
\ No newline at end of file
+async def not_found(path: str):
+    raise HTTPException(status_code=404, detail="Endpoint not found")
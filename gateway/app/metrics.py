@@ -0,0 +1,127 @@
+import time
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_COUNT = Counter(
+    "gateway_requests_total", "게이트웨이가 처리한 요청 수", ["route", "method", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "gateway_request_duration_seconds", "게이트웨이 요청 처리 시간", ["route", "method"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("gateway_requests_in_flight", "처리 중인 게이트웨이 요청 수")
+UPSTREAM_LATENCY = Histogram(
+    "gateway_upstream_request_duration_seconds",
+    "업스트림 호출 시간 (스트리밍은 응답 헤더 수신까지)",
+    ["upstream", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def observe_upstream(upstream: str, status: str, started: float):
+    UPSTREAM_LATENCY.labels(upstream, status).observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """요청 수, 지연 시간, 처리 중 요청 수를 기록하는 pure ASGI 미들웨어입니다.
+
+    route 라벨은 원본 경로가 아니라 라우팅 테이블의 prefix를 사용하므로
+    /api/board/posts/123 같은 경로 때문에 라벨 수가 늘어나지 않습니다.
+    """
+
+    def __init__(self, app: ASGIApp, route_table):
+        self.app = app
+        self.route_table = route_table
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            matched = self.route_table.match(scope["path"])
+            if matched is not None:
+                route = matched[0]
+            else:
+                route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(route, method).observe(time.perf_counter() - started)
+            REQUEST_COUNT.labels(route, method, str(status_code)).inc()
+
+
+class GatewayStatsCollector:
+    """세션 캐시, 응답 캐시, single-flight, 업스트림 풀/승인 제어 통계를 스크랩 시점에 읽어 내보냅니다."""
+
+    def __init__(self, session_cache, response_cache, single_flight, upstreams):
+        self.session_cache = session_cache
+        self.response_cache = response_cache
+        self.single_flight = single_flight
+        self.upstreams = upstreams
+
+    def collect(self):
+        session = self.session_cache.stats()
+        lookups = CounterMetricFamily("gateway_session_cache_lookups", "세션 캐시 조회 결과", labels=["result"])
+        lookups.add_metric(["hit"], session["hits"])
+        lookups.add_metric(["negative_hit"], session["negative_hits"])
+        lookups.add_metric(["miss"], session["misses"])
+        yield lookups
+        yield GaugeMetricFamily("gateway_session_cache_entries", "세션 캐시 엔트리 수", value=session["size"])
+
+        cache = self.response_cache.stats()
+        cache_lookups = CounterMetricFamily("gateway_response_cache_lookups", "응답 캐시 조회 결과", labels=["result"])
+        cache_lookups.add_metric(["hit"], cache["hits"])
+        cache_lookups.add_metric(["stale"], cache["stale_hits"])
+        cache_lookups.add_metric(["miss"], cache["misses"])
+        yield cache_lookups
+        yield CounterMetricFamily("gateway_response_cache_not_modified", "304로 응답한 횟수", value=cache["not_modified"])
+        yield CounterMetricFamily("gateway_response_cache_evictions", "LRU로 제거된 엔트리 수", value=cache["evictions"])
+        yield GaugeMetricFamily("gateway_response_cache_bytes", "응답 캐시 사용 메모리", value=cache["bytes"])
+
+        flight = self.single_flight.stats()
+        yield CounterMetricFamily("gateway_single_flight_leaders", "업스트림으로 나간 합치기 대상 요청 수", value=flight["leaders"])
+        yield CounterMetricFamily("gateway_single_flight_coalesced", "다른 요청의 응답을 공유한 요청 수", value=flight["coalesced"])
+
+        pool_in_flight = GaugeMetricFamily("gateway_upstream_in_flight", "업스트림별 처리 중 요청 수", labels=["upstream"])
+        pool_open = GaugeMetricFamily("gateway_upstream_connections", "업스트림별 커넥션 수", labels=["upstream", "state"])
+        pool_wait = GaugeMetricFamily("gateway_upstream_pool_wait_max_seconds", "커넥션 풀 최대 대기 시간", labels=["upstream"])
+        pool_timeouts = CounterMetricFamily("gateway_upstream_pool_timeouts", "커넥션 풀 대기 타임아웃 수", labels=["upstream"])
+        queue_length = GaugeMetricFamily("gateway_admission_queue_length", "승인 대기열 길이", labels=["upstream"])
+        queued = CounterMetricFamily("gateway_admission_queued", "대기열에 들어간 요청 수", labels=["upstream"])
+        shed = CounterMetricFamily("gateway_admission_shed", "거절된 요청 수", labels=["upstream", "priority"])
+        for upstream in self.upstreams:
+            stats = upstream.stats()
+            pool_in_flight.add_metric([upstream.name], stats["in_flight"])
+            pool_open.add_metric([upstream.name, "active"], stats["connections"]["active"])
+            pool_open.add_metric([upstream.name, "idle"], stats["connections"]["idle"])
+            pool_wait.add_metric([upstream.name], stats["pool_wait_max_ms"] / 1000)
+            pool_timeouts.add_metric([upstream.name], stats["pool_timeouts"])
+            admission = stats["admission"]
+            queue_length.add_metric([upstream.name], admission["queue_length"])
+            queued.add_metric([upstream.name], admission["queued"])
+            for priority, count in admission["shed"].items():
+                shed.add_metric([upstream.name, priority], count)
+        yield from (pool_in_flight, pool_open, pool_wait, pool_timeouts, queue_length, queued, shed)
+
+
+def register_collector(collector):
+    REGISTRY.register(collector)
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,190 @@
+import os
+import asyncio
+import httpx
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+from upstreams import Upstream
+from admission import UpstreamOverloaded, request_priority, PRIORITY_LIST
+from response_cache import response_cache, etag_matches, CacheRule, CachedResponse
+from single_flight import single_flight
+from tracing import span
+
+# stream: 요청/응답 본문을 청크 단위로 그대로 흘려보냅니다 (기본값).
+# buffer: 기존 방식처럼 본문 전체를 메모리에 읽은 뒤 전달합니다.
+GATEWAY_PROXY_MODE = os.getenv("GATEWAY_PROXY_MODE", "stream")
+
+# 캐시를 무효화하는 쓰기 메서드
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+# 진행 중인 stale-while-revalidate 백그라운드 갱신 작업 (GC 방지용 참조)
+_background_tasks = set()
+
+
+async def reverse_proxy(request: Request, upstream: Upstream) -> Response:
+    """라우팅 테이블이 고른 업스트림으로 요청을 전달합니다."""
+    path = request.url.path
+    base_url = upstream.base_url
+    url = f"{base_url}{path}?{request.url.query}"
+    priority = request_priority(request.method, path)
+
+    # 스트리밍 응답은 업스트림 응답 헤더를 받을 때까지가 이 스팬의 범위입니다.
+    with span("gateway.proxy", upstream=upstream.name, **{"http.method": request.method, "http.target": path}):
+        try:
+            if request.method == "GET":
+                rule = response_cache.rule_for(path)
+                if rule is not None:
+                    return await _proxy_cached(upstream, request, url, rule, priority)
+                if single_flight.applies(path):
+                    return await _proxy_coalesced(upstream, request, url, priority)
+            if GATEWAY_PROXY_MODE == "buffer":
+                response = await _proxy_buffered(upstream, request, url, priority)
+            else:
+                response = await _proxy_streaming(upstream, request, url, priority)
+            # 업스트림이 쓰기 요청에 응답했다면 같은 리소스의 캐시를 비웁니다.
+            if request.method in WRITE_METHODS:
+                response_cache.invalidate_for_write(path)
+            return response
+        except (httpx.ConnectError, httpx.PoolTimeout):
+            raise HTTPException(status_code=503, detail=f"Service unavailable: {base_url}")
+        except httpx.ReadTimeout:
+            raise HTTPException(status_code=504, detail=f"Request timeout: {base_url}")
+        except UpstreamOverloaded as exc:
+            # 10초 타임아웃까지 기다리게 하지 않고 바로 거절합니다.
+            raise HTTPException(
+                status_code=503,
+                detail=f"Service overloaded: {base_url}",
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+
+
+def _response_headers(rp_resp: httpx.Response) -> dict:
+    response_headers = dict(rp_resp.headers)
+    response_headers.pop("content-length", None)
+    response_headers.pop("content-encoding", None)
+    return response_headers
+
+
+async def _proxy_buffered(upstream: Upstream, request: Request, url: str, priority: int) -> Response:
+    """요청/응답 본문 전체를 메모리에 올려 전달합니다."""
+    rp_resp = await upstream.request(
+        method=request.method,
+        url=url,
+        priority=priority,
+        headers=request.headers.raw,
+        content=await request.body()
+    )
+    return Response(
+        content=rp_resp.content,
+        status_code=rp_resp.status_code,
+        headers=_response_headers(rp_resp),
+    )
+
+
+async def _proxy_streaming(upstream: Upstream, request: Request, url: str, priority: int) -> Response:
+    """요청 본문을 청크 단위로 업스트림에 보내고, 응답도 청크 단위로 돌려줍니다.
+
+    본문 크기와 관계없이 요청 하나가 차지하는 메모리는 청크 몇 개 수준으로 유지됩니다.
+    """
+    # 본문이 없는 요청(GET 등)에 chunked 인코딩이 붙지 않도록 본문이 있을 때만 스트림을 연결합니다.
+    has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+    rp_req = upstream.build_request(
+        method=request.method,
+        url=url,
+        headers=request.headers.raw,
+        content=request.stream() if has_body else None,
+    )
+    rp_resp = await upstream.send_stream(rp_req, priority)
+    # 업스트림이 이미 압축한 본문은 풀지 않고 그대로 전달합니다 (클라이언트의 Accept-Encoding을 그대로 보냈으므로).
+    headers = _response_headers(rp_resp)
+    content_encoding = rp_resp.headers.get("content-encoding")
+    if content_encoding:
+        headers["content-encoding"] = content_encoding
+    # 응답 헤더를 보낸 이후에는 상태 코드를 바꿀 수 없으므로,
+    # 503/504 매핑은 업스트림이 응답 헤더를 보내기 전까지의 오류에만 적용됩니다.
+    return UpstreamStreamingResponse(upstream, rp_resp, status_code=rp_resp.status_code, headers=headers)
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    """업스트림 응답 본문을 그대로 흘려보냅니다.
+
+    본문 도중 업스트림 오류가 나면 Starlette는 background 작업을 실행하지 않으므로,
+    슬롯/커넥션 반환을 background에 맡기지 않고 본문 제너레이터(iter_stream)의 finally에서 처리합니다.
+    본문을 읽기 시작하기 전에 끝난 경우(클라이언트 연결 끊김 등)는 __call__의 finally가 처리합니다.
+    """
+
+    def __init__(self, upstream: Upstream, rp_resp: httpx.Response, status_code: int, headers: dict):
+        super().__init__(upstream.iter_stream(rp_resp), status_code=status_code, headers=headers)
+        self.upstream = upstream
+        self.rp_resp = rp_resp
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.close_stream(self.rp_resp)
+
+
+def _cached_response(request: Request, entry: CachedResponse, cache_status: str) -> Response:
+    """캐시 엔트리로 응답합니다. If-None-Match가 일치하면 본문 없이 304를 반환합니다."""
+    headers = {"etag": entry.etag, "cache-control": "no-cache", "x-cache": cache_status}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, status_code=entry.status_code, headers={**entry.headers, **headers})
+
+
+async def _fetch_into_cache(upstream: Upstream, url: str, headers: list, key: str, rule: CacheRule, priority: int):
+    """업스트림에서 응답을 받아 캐시에 저장합니다. (httpx 응답, 캐시 엔트리 또는 None)을 반환합니다."""
+    generation = rule.generation
+    rp_resp = await upstream.request("GET", url, priority=priority, headers=headers)
+    entry = response_cache.store(key, rule, generation, rp_resp.status_code, _response_headers(rp_resp), rp_resp.content)
+    return rp_resp, entry
+
+
+async def _refresh_in_background(upstream: Upstream, url: str, headers: list, key: str, rule: CacheRule):
+    try:
+        # 이미 stale 응답을 돌려준 뒤이므로 가장 낮은 우선순위로 갱신합니다.
+        await _fetch_into_cache(upstream, url, headers, key, rule, PRIORITY_LIST)
+    except (httpx.HTTPError, UpstreamOverloaded) as e:
+        print(f"[gateway] background refresh failed for {key}: {e!r}")
+    finally:
+        response_cache.refreshing.discard(key)
+
+
+async def _proxy_cached(upstream: Upstream, request: Request, url: str, rule: CacheRule, priority: int) -> Response:
+    """캐시 대상 GET 요청을 처리합니다. fresh면 바로, stale이면 응답 후 백그라운드에서 갱신합니다."""
+    key = response_cache.make_key(request.url.path, request.url.query)
+    headers = list(request.headers.raw)
+    entry, fresh = response_cache.lookup(key, rule)
+    if entry is not None:
+        if not fresh and key not in response_cache.refreshing:
+            response_cache.refreshing.add(key)
+            task = asyncio.create_task(_refresh_in_background(upstream, url, headers, key, rule))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return _cached_response(request, entry, "HIT" if fresh else "STALE")
+
+    # 캐시 미스가 동시에 몰려도 업스트림 호출은 하나만 나갑니다.
+    flight_key = single_flight.make_key("GET", request.url.path, request.url.query, request.headers)
+    rp_resp, entry = await single_flight.do(flight_key, lambda: _fetch_into_cache(upstream, url, headers, key, rule, priority))
+    if entry is not None:
+        return _cached_response(request, entry, "MISS")
+    return Response(
+        content=rp_resp.content,
+        status_code=rp_resp.status_code,
+        headers=_response_headers(rp_resp),
+    )
+
+
+async def _proxy_coalesced(upstream: Upstream, request: Request, url: str, priority: int) -> Response:
+    """동일한 GET 요청이 동시에 진행 중이면 그 응답을 함께 사용합니다."""
+    flight_key = single_flight.make_key("GET", request.url.path, request.url.query, request.headers)
+    headers = list(request.headers.raw)
+    rp_resp = await single_flight.do(flight_key, lambda: upstream.request("GET", url, priority=priority, headers=headers))
+    return Response(
+        content=rp_resp.content,
+        status_code=rp_resp.status_code,
+        headers=_response_headers(rp_resp),
+    )
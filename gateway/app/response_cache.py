@@ -0,0 +1,188 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+# 경로=TTL:stale-while-revalidate[:무효화 prefix] 를 세미콜론으로 구분합니다.
+# 무효화 prefix를 생략하면 경로 자체가 prefix가 됩니다.
+# 예) /api/blog/tags 는 게시글이 바뀔 때 함께 바뀌므로 /api/blog/articles 쓰기에 무효화됩니다.
+DEFAULT_CACHE_ROUTES = (
+    "/api/board/posts=5:30;"
+    "/api/blog/articles=5:30;"
+    "/api/board/search=5:30:/api/board/posts;"
+    "/api/blog/search=5:30:/api/blog/articles;"
+    "/api/blog/tags=60:300:/api/blog/articles"
+)
+GATEWAY_CACHE_ROUTES = os.getenv("GATEWAY_CACHE_ROUTES", DEFAULT_CACHE_ROUTES)
+GATEWAY_CACHE_MAX_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# 캐시에 저장하지 않는 응답 헤더
+_UNCACHEABLE_HEADERS = {"set-cookie", "date", "server", "transfer-encoding", "connection", "etag"}
+
+
+class CacheRule:
+    """캐시할 GET 경로 하나의 설정입니다. 경로는 정확히 일치해야 합니다 (상세 조회는 조회수 증가가 있어 제외)."""
+
+    __slots__ = ("path", "ttl", "stale_while_revalidate", "invalidate_prefix", "generation")
+
+    def __init__(self, path: str, ttl: float, stale_while_revalidate: float, invalidate_prefix: Optional[str] = None):
+        self.path = path
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.invalidate_prefix = invalidate_prefix or path
+        # 무효화될 때마다 증가합니다. 무효화 이전에 시작된 요청의 응답이 캐시에 들어가는 것을 막습니다.
+        self.generation = 0
+
+
+class CachedResponse:
+    __slots__ = ("key", "path", "status_code", "headers", "body", "etag", "stored_at", "size")
+
+    def __init__(self, key: str, path: str, status_code: int, headers: Dict[str, str], body: bytes):
+        self.key = key
+        self.path = path
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.stored_at = time.monotonic()
+        self.size = len(body) + len(key) + sum(len(k) + len(v) for k, v in headers.items())
+
+
+def parse_cache_routes(spec: str) -> List[CacheRule]:
+    rules = []
+    for item in spec.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        path, _, settings = item.partition("=")
+        parts = settings.split(":")
+        ttl = float(parts[0]) if parts and parts[0] else 5.0
+        swr = float(parts[1]) if len(parts) > 1 and parts[1] else 0.0
+        invalidate_prefix = parts[2] if len(parts) > 2 and parts[2] else None
+        rules.append(CacheRule(path.strip(), ttl, swr, invalidate_prefix))
+    return rules
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더가 주어진 ETag와 일치하는지 확인합니다 (약한 비교)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """공개 GET 응답을 저장하는 메모리 상한이 있는 LRU 캐시입니다.
+
+    프로세스 단위 캐시이므로 다른 게이트웨이 워커를 거친 쓰기는 TTL이 지나야 반영됩니다.
+    """
+
+    def __init__(self, rules: List[CacheRule], max_bytes: int):
+        self.rules: Dict[str, CacheRule] = {rule.path: rule for rule in rules}
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._keys_by_path: Dict[str, Set[str]] = {rule.path: set() for rule in rules}
+        self._bytes = 0
+        # 백그라운드 갱신이 진행 중인 키 (같은 키를 중복 갱신하지 않기 위함)
+        self.refreshing: Set[str] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def rule_for(self, path: str) -> Optional[CacheRule]:
+        return self.rules.get(path)
+
+    @staticmethod
+    def make_key(path: str, query: str) -> str:
+        # 쿼리 파라미터 순서가 달라도 같은 키가 되도록 정렬합니다.
+        normalized = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+        return f"{path}?{normalized}"
+
+    def lookup(self, key: str, rule: CacheRule) -> Tuple[Optional[CachedResponse], bool]:
+        """(엔트리, fresh 여부)를 반환합니다. stale-while-revalidate 구간이면 fresh=False 입니다."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        age = time.monotonic() - entry.stored_at
+        if age < rule.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry, True
+        if age < rule.ttl + rule.stale_while_revalidate:
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            return entry, False
+        self._remove(key)
+        self.misses += 1
+        return None, False
+
+    def store(self, key: str, rule: CacheRule, generation: int, status_code: int, headers: Dict[str, str], body: bytes) -> Optional[CachedResponse]:
+        """200 응답만 저장합니다. 요청이 시작된 뒤 무효화가 있었다면 저장하지 않습니다."""
+        if status_code != 200 or "set-cookie" in headers or generation != rule.generation:
+            return None
+        stored_headers = {k: v for k, v in headers.items() if k.lower() not in _UNCACHEABLE_HEADERS}
+        entry = CachedResponse(key, rule.path, status_code, stored_headers, body)
+        if entry.size > self.max_bytes:
+            return entry
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._keys_by_path[rule.path].add(key)
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+        return entry
+
+    def invalidate_for_write(self, path: str):
+        """쓰기 요청 경로가 무효화 prefix에 해당하는 모든 캐시 경로의 엔트리를 제거합니다."""
+        for rule in self.rules.values():
+            if path.startswith(rule.invalidate_prefix):
+                rule.generation += 1
+                keys = self._keys_by_path[rule.path]
+                if keys:
+                    self.invalidations += len(keys)
+                    for key in list(keys):
+                        self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            self._keys_by_path[entry.path].discard(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "routes": {
+                path: {"ttl": rule.ttl, "stale_while_revalidate": rule.stale_while_revalidate, "invalidate_prefix": rule.invalidate_prefix}
+                for path, rule in self.rules.items()
+            },
+        }
+
+
+response_cache = ResponseCache(parse_cache_routes(GATEWAY_CACHE_ROUTES), GATEWAY_CACHE_MAX_BYTES)
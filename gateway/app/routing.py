@@ -0,0 +1,84 @@
+import os
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from upstreams import upstreams
+from proxy import reverse_proxy
+
+# 경로 prefix=업스트림 이름 을 세미콜론으로 구분합니다.
+DEFAULT_GATEWAY_ROUTES = "/api/users=user;/api/auth=user;/api/board=board;/api/blog=blog"
+GATEWAY_ROUTES = os.getenv("GATEWAY_ROUTES", DEFAULT_GATEWAY_ROUTES)
+
+
+class RouteTable:
+    """시작 시 한 번 컴파일되는 prefix -> 업스트림 라우팅 테이블입니다.
+
+    prefix를 길이별 dict로 묶어 두므로, 요청마다 prefix 길이 종류 수만큼만 dict 조회를 합니다.
+    긴 prefix가 먼저 일치합니다.
+    """
+
+    def __init__(self, routes: List[Tuple[str, str]]):
+        self.routes = routes
+        by_length: Dict[int, Dict[str, str]] = {}
+        for prefix, upstream_name in routes:
+            by_length.setdefault(len(prefix), {})[prefix] = upstream_name
+        self._by_length: Tuple[Tuple[int, Dict[str, str]], ...] = tuple(
+            sorted(by_length.items(), key=lambda item: item[0], reverse=True)
+        )
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "RouteTable":
+        routes = []
+        for item in spec.split(";"):
+            item = item.strip()
+            if not item:
+                continue
+            prefix, _, upstream_name = item.partition("=")
+            routes.append((prefix.strip(), upstream_name.strip()))
+        return cls(routes)
+
+    def match(self, path: str) -> Optional[Tuple[str, str]]:
+        """(일치한 prefix, 업스트림 이름)을 반환합니다."""
+        for length, prefixes in self._by_length:
+            prefix = path[:length]
+            upstream_name = prefixes.get(prefix)
+            if upstream_name is not None:
+                return prefix, upstream_name
+        return None
+
+    def describe(self) -> dict:
+        return {prefix: upstream_name for prefix, upstream_name in self.routes}
+
+
+class GatewayRouter:
+    """라우팅 테이블에 일치하는 요청을 FastAPI 라우팅/의존성 처리 없이 바로 프록시하는 ASGI 미들웨어입니다.
+
+    일치하지 않는 요청(/gateway/stats 등)은 안쪽의 FastAPI 앱으로 넘깁니다.
+    """
+
+    def __init__(self, app: ASGIApp, table: RouteTable):
+        self.app = app
+        self.table = table
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        matched = self.table.match(scope["path"])
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+        _, upstream_name = matched
+
+        request = Request(scope, receive)
+        try:
+            response = await reverse_proxy(request, upstreams.get(upstream_name))
+        except HTTPException as exc:
+            response = JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
+        await response(scope, receive, send)
+
+
+route_table = RouteTable.from_spec(GATEWAY_ROUTES)
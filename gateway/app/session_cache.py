@@ -0,0 +1,196 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Tuple
+import redis.asyncio as redis
+
+# 세션 캐시 설정 (환경 변수로 조정 가능)
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "30"))
+SESSION_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+
+# 로그아웃/비밀번호 변경으로 지운 세션을 다른 게이트웨이 워커에 알리는 채널
+SESSION_INVALIDATION_CHANNEL = "gateway:session:invalidate"
+
+
+class SessionCache:
+    """session_id -> user_id 를 저장하는 TTL + LRU 캐시입니다.
+
+    유효하지 않은 세션은 짧은 시간 동안 음성(negative) 캐시로 기억하여
+    같은 잘못된 쿠키로 user_service를 반복 호출하지 않도록 합니다.
+    캐시는 프로세스 단위이므로 로그아웃/비밀번호 변경은 SessionCacheSync가 Redis pub/sub로 모든 워커에 알립니다.
+    Redis에 연결할 수 없는 동안에는 알림이 전달되지 않으므로, 폐기된 세션이 다른 워커에서
+    최대 TTL(기본 30초)만큼 남아 있을 수 있습니다. 그래서 TTL은 짧게 유지합니다.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # session_id -> (만료 시각, user_id 또는 None, 실패 응답(status, body) 또는 None)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str], Optional[Tuple[int, dict]]]]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, session_id: str):
+        """캐시된 값을 반환합니다. 없으면 None, 있으면 (user_id, 실패 응답) 튜플입니다."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user_id, failure = entry
+        if expires_at <= time.monotonic():
+            del self._entries[session_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        if failure is not None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return user_id, failure
+
+    def set_user(self, session_id: str, user_id: str):
+        self._store(session_id, (time.monotonic() + self.ttl, user_id, None))
+
+    def set_invalid(self, session_id: str, status_code: int, body: dict):
+        self._store(session_id, (time.monotonic() + self.negative_ttl, None, (status_code, body)))
+
+    def invalidate(self, session_id: str):
+        if self._entries.pop(session_id, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str):
+        """사용자의 모든 세션을 지웁니다. 비밀번호 변경처럼 드물게만 호출되므로 전체를 훑습니다."""
+        session_ids = [session_id for session_id, entry in self._entries.items() if entry[1] == user_id]
+        for session_id in session_ids:
+            del self._entries[session_id]
+        self.invalidations += len(session_ids)
+
+    def _store(self, session_id: str, entry):
+        self._entries[session_id] = entry
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+session_cache = SessionCache(
+    ttl=SESSION_CACHE_TTL_SECONDS,
+    negative_ttl=SESSION_CACHE_NEGATIVE_TTL_SECONDS,
+    max_entries=SESSION_CACHE_MAX_ENTRIES,
+)
+
+
+class SessionCacheSync:
+    """세션 캐시 무효화를 Redis pub/sub로 모든 게이트웨이 워커에 전달합니다.
+
+    메시지는 "session {session_id}" 또는 "user {user_id}"입니다. 보낸 워커도 자기 메시지를 받지만 이미 지운 뒤라 영향이 없습니다.
+    REDIS_URL이 없거나 연결이 끊긴 동안에는 이 워커의 캐시만 지워지고, 나머지 워커는 TTL이 지나야 반영됩니다.
+    """
+
+    def __init__(self, cache: SessionCache, redis_url: Optional[str]):
+        self.cache = cache
+        self.redis_url = redis_url
+        self.ready = False
+        self._client: Optional[redis.Redis] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+        self.publish_failures = 0
+
+    async def start(self):
+        if not self.redis_url or self._task is not None:
+            return
+        self._client = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.ready = False
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(SESSION_INVALIDATION_CHANNEL)
+                self.ready = True
+                backoff = 1
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.received += 1
+                        self._apply(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.ready = False
+                print(f"[session] invalidation channel disconnected: {e!r}; retrying in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                await pubsub.aclose()
+
+    def _apply(self, message: str):
+        kind, _, value = message.partition(" ")
+        if kind == "session":
+            self.cache.invalidate(value)
+        elif kind == "user":
+            self.cache.invalidate_user(value)
+
+    async def _publish(self, message: str):
+        self._apply(message)
+        if self._client is None:
+            return
+        try:
+            await self._client.publish(SESSION_INVALIDATION_CHANNEL, message)
+            self.published += 1
+        except redis.RedisError as e:
+            self.publish_failures += 1
+            print(f"[session] invalidation publish failed: {e!r}")
+
+    async def invalidate_session(self, session_id: str):
+        """로그아웃: 세션 하나를 모든 워커의 캐시에서 지웁니다."""
+        await self._publish(f"session {session_id}")
+
+    async def invalidate_user(self, user_id: str):
+        """비밀번호 변경: user_service가 사용자의 모든 세션을 지우므로 캐시에서도 모두 지웁니다."""
+        await self._publish(f"user {user_id}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": bool(self.redis_url),
+            "ready": self.ready,
+            "published": self.published,
+            "received": self.received,
+            "publish_failures": self.publish_failures,
+        }
+
+
+session_cache_sync = SessionCacheSync(session_cache, os.getenv("REDIS_URL"))
@@ -0,0 +1,97 @@
+import os
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import parse_qsl, urlencode
+from starlette.datastructures import Headers
+
+T = TypeVar("T")
+
+# 합칠 GET 경로 목록 (세미콜론 구분). '*'로 끝나면 prefix, 아니면 정확히 일치해야 합니다.
+# /api/board/posts/{id} 는 조회할 때마다 조회수가 올라가므로 기본 목록에서 제외합니다.
+DEFAULT_COALESCE_PATHS = "/api/board/posts;/api/blog/*;/api/users/*;/api/auth/me"
+GATEWAY_COALESCE_PATHS = os.getenv("GATEWAY_COALESCE_PATHS", DEFAULT_COALESCE_PATHS)
+# 먼저 시작된 요청을 기다리는 최대 시간(초). 넘기면 직접 업스트림을 호출합니다.
+GATEWAY_COALESCE_MAX_WAIT = float(os.getenv("GATEWAY_COALESCE_MAX_WAIT", "5"))
+
+# 응답 내용에 영향을 주는 헤더만 키에 포함합니다.
+KEY_HEADERS = ("cookie", "authorization", "accept", "accept-language", "x-user-id")
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 요청들이 업스트림 호출 하나를 공유하도록 합니다."""
+
+    def __init__(self, paths: str, max_wait: float):
+        self.max_wait = max_wait
+        self.exact_paths = set()
+        prefixes = []
+        for item in paths.split(";"):
+            item = item.strip()
+            if item.endswith("*"):
+                prefixes.append(item[:-1])
+            elif item:
+                self.exact_paths.add(item)
+        self.prefixes: Tuple[str, ...] = tuple(prefixes)
+        self._calls: Dict[tuple, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.wait_timeouts = 0
+        self.errors = 0
+
+    def applies(self, path: str) -> bool:
+        return path in self.exact_paths or path.startswith(self.prefixes)
+
+    @staticmethod
+    def make_key(method: str, path: str, query: str, headers: Headers) -> tuple:
+        normalized = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+        return (method, path, normalized) + tuple(headers.get(name, "") for name in KEY_HEADERS)
+
+    async def do(self, key: tuple, fn: Callable[[], Awaitable[T]]) -> T:
+        """key로 진행 중인 호출이 있으면 그 결과를 기다리고, 없으면 fn()을 실행해 결과를 공유합니다."""
+        call: Optional[asyncio.Future] = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(call), self.max_wait)
+            except asyncio.TimeoutError:
+                self.wait_timeouts += 1
+                return await fn()
+            except asyncio.CancelledError:
+                # 선행 요청(클라이언트 연결 종료 등)이 취소된 경우에만 직접 호출로 대체합니다.
+                if call.cancelled():
+                    return await fn()
+                raise
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as exc:
+            self.errors += 1
+            # 기다리는 요청들도 같은 오류(예: ConnectError -> 503)를 받습니다.
+            call.set_exception(exc)
+            # 기다리는 요청이 없을 때 "exception was never retrieved" 경고를 막습니다.
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "wait_timeouts": self.wait_timeouts,
+            "errors": self.errors,
+            "max_wait": self.max_wait,
+        }
+
+
+single_flight = SingleFlight(GATEWAY_COALESCE_PATHS, GATEWAY_COALESCE_MAX_WAIT)
@@ -0,0 +1,238 @@
+import os
+import time
+import importlib.util
+from typing import Dict, Optional
+import httpx
+from admission import AdmissionController, PRIORITY_READ
+from metrics import observe_upstream
+from tracing import traced_transport
+
+# 업스트림 이름 -> 주소 환경 변수
+UPSTREAM_URL_ENVS = {
+    "user": "USER_SERVICE_URL",
+    "board": "BOARD_SERVICE_URL",
+    "blog": "BLOG_SERVICE_URL",
+}
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _env(prefix: str, key: str, default: str) -> str:
+    """업스트림별 설정(예: BOARD_SERVICE_POOL_SIZE)을 읽고, 없으면 공통 설정(UPSTREAM_POOL_SIZE)을 사용합니다."""
+    return os.getenv(f"{prefix}_{key}", os.getenv(f"UPSTREAM_{key}", default))
+
+
+class _RequestTrace:
+    """httpcore trace 확장으로 요청 하나의 커넥션 대기/연결 시간을 측정합니다."""
+
+    __slots__ = ("upstream", "started", "connect_started", "connect_time")
+
+    def __init__(self, upstream: "Upstream"):
+        self.upstream = upstream
+        self.started = time.perf_counter()
+        self.connect_started = 0.0
+        self.connect_time = 0.0
+
+    async def __call__(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.started":
+            self.connect_started = time.perf_counter()
+        elif event_name == "connection.connect_tcp.complete":
+            self.connect_time = time.perf_counter() - self.connect_started
+            self.upstream.connections_opened += 1
+        elif event_name in ("http11.send_request_headers.started", "http2.send_request_headers.started"):
+            # 요청 헤더를 보내기 시작한 시점까지 걸린 시간에서 TCP 연결 시간을 빼면 풀 대기 시간입니다.
+            wait = time.perf_counter() - self.started - self.connect_time
+            self.upstream.record_pool_wait(max(wait, 0.0))
+
+
+class Upstream:
+    """업스트림 서비스 하나에 대한 전용 커넥션 풀입니다."""
+
+    def __init__(self, name: str, base_url: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        prefix = UPSTREAM_URL_ENVS.get(name, f"{name.upper()}_SERVICE_URL").rsplit("_URL", 1)[0]
+        self.name = name
+        self.base_url = base_url
+        self.max_connections = int(_env(prefix, "POOL_SIZE", "100"))
+        self.max_keepalive = int(_env(prefix, "POOL_KEEPALIVE", "20"))
+        self.keepalive_expiry = float(_env(prefix, "KEEPALIVE_EXPIRY", "30"))
+        self.pool_timeout = float(_env(prefix, "POOL_TIMEOUT", "5"))
+        http2 = _env(prefix, "HTTP2", "false").lower() in ("1", "true", "yes")
+        if http2 and not HTTP2_AVAILABLE:
+            print(f"[gateway] {prefix}_HTTP2 requested but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+        # HTTP/2를 켜면 업스트림이 h2c(prior knowledge)를 지원해야 합니다.
+        # uvicorn은 HTTP/1.1만 지원하므로 기본값은 꺼져 있습니다.
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                http1=not http2,
+                http2=http2,
+            )
+        self._transport = transport
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0, pool=self.pool_timeout),
+            transport=traced_transport(transport, name),
+        )
+
+        # 업스트림이 느려졌을 때 게이트웨이 워커가 모두 묶이지 않도록 동시 요청 수를 제한합니다.
+        self.admission = AdmissionController(
+            name,
+            max_concurrency=int(_env(prefix, "MAX_CONCURRENCY", "64")),
+            max_queue=int(_env(prefix, "MAX_QUEUE", "128")),
+            queue_timeout=float(_env(prefix, "QUEUE_TIMEOUT", "2")),
+            retry_after=int(_env(prefix, "RETRY_AFTER", "1")),
+        )
+
+        self.in_flight = 0
+        # 아직 슬롯을 반환하지 않은 스트리밍 응답
+        self._open_streams = set()
+        self.requests = 0
+        self.connections_opened = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+        self.pool_wait_count = 0
+        self.pool_timeouts = 0
+
+    def record_pool_wait(self, seconds: float):
+        self.pool_wait_total += seconds
+        self.pool_wait_count += 1
+        if seconds > self.pool_wait_max:
+            self.pool_wait_max = seconds
+
+    def _extensions(self) -> dict:
+        return {"trace": _RequestTrace(self)}
+
+    async def request(self, method: str, url: str, priority: int = PRIORITY_READ, **kwargs) -> httpx.Response:
+        """본문 전체를 읽어오는 일반 요청입니다. 한도를 넘으면 UpstreamOverloaded가 발생합니다."""
+        await self.admission.acquire(priority)
+        self.in_flight += 1
+        self.requests += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, extensions=self._extensions(), **kwargs)
+            observe_upstream(self.name, str(response.status_code), started)
+            return response
+        except httpx.HTTPError as exc:
+            if isinstance(exc, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+            observe_upstream(self.name, type(exc).__name__, started)
+            raise
+        finally:
+            self.in_flight -= 1
+            self.admission.release()
+
+    def build_request(self, method: str, url: str, **kwargs) -> httpx.Request:
+        return self.client.build_request(method, url, extensions=self._extensions(), **kwargs)
+
+    async def send_stream(self, rp_req: httpx.Request, priority: int = PRIORITY_READ) -> httpx.Response:
+        """스트리밍 요청을 보냅니다. 호출한 쪽에서 반드시 close_stream()으로 응답을 닫아야 합니다.
+
+        동시 처리 슬롯은 응답 본문 스트림이 닫힐 때까지 유지됩니다.
+        본문은 iter_stream()으로 읽으면 끝나거나 실패하는 즉시 닫힙니다.
+        """
+        await self.admission.acquire(priority)
+        trace = rp_req.extensions.get("trace")
+        if isinstance(trace, _RequestTrace):
+            # 대기열에서 기다린 시간은 커넥션 풀 대기 시간에서 제외합니다.
+            trace.started = time.perf_counter()
+        self.in_flight += 1
+        self.requests += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.send(rp_req, stream=True)
+        except BaseException as exc:
+            self.in_flight -= 1
+            self.admission.release()
+            if isinstance(exc, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+            observe_upstream(self.name, type(exc).__name__, started)
+            raise
+        observe_upstream(self.name, str(response.status_code), started)
+        self._open_streams.add(response)
+        return response
+
+    async def iter_stream(self, rp_resp: httpx.Response):
+        """응답 본문을 청크 단위로 돌려주고, 다 읽었거나 도중에 오류/취소가 나면 바로 close_stream()합니다."""
+        try:
+            async for chunk in rp_resp.aiter_raw():
+                yield chunk
+        finally:
+            await self.close_stream(rp_resp)
+
+    async def close_stream(self, rp_resp: httpx.Response):
+        """응답을 닫고 슬롯을 반환합니다. 여러 번 호출해도 한 번만 반환합니다."""
+        if rp_resp not in self._open_streams:
+            return
+        self._open_streams.discard(rp_resp)
+        try:
+            await rp_resp.aclose()
+        finally:
+            self.in_flight -= 1
+            self.admission.release()
+
+    def _pool_connections(self) -> Dict[str, int]:
+        # httpx는 풀 상태를 공개 API로 제공하지 않으므로 httpcore 풀을 조심스럽게 들여다봅니다.
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", None) or [])
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry": self.keepalive_expiry,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "connections": self._pool_connections(),
+            "connections_opened": self.connections_opened,
+            "pool_timeouts": self.pool_timeouts,
+            "pool_wait_avg_ms": round(self.pool_wait_total / self.pool_wait_count * 1000, 3) if self.pool_wait_count else 0.0,
+            "pool_wait_max_ms": round(self.pool_wait_max * 1000, 3),
+            "admission": self.admission.stats(),
+        }
+
+
+class UpstreamRegistry:
+    """게이트웨이 전체에서 공유하는 업스트림별 커넥션 풀 모음입니다."""
+
+    def __init__(self):
+        self._upstreams: Dict[str, Upstream] = {}
+
+    @classmethod
+    def from_env(cls) -> "UpstreamRegistry":
+        registry = cls()
+        for name, env in UPSTREAM_URL_ENVS.items():
+            registry.register(name, os.getenv(env))
+        return registry
+
+    def register(self, name: str, base_url: str, transport: Optional[httpx.AsyncBaseTransport] = None) -> Upstream:
+        self._upstreams[name] = Upstream(name, base_url, transport=transport)
+        return self._upstreams[name]
+
+    def get(self, name: str) -> Upstream:
+        return self._upstreams[name]
+
+    def __iter__(self):
+        return iter(self._upstreams.values())
+
+    async def aclose(self):
+        for upstream in self._upstreams.values():
+            await upstream.client.aclose()
+
+    def stats(self) -> dict:
+        return {name: upstream.stats() for name, upstream in self._upstreams.items()}
+
+    def admission_stats(self) -> dict:
+        return {name: upstream.admission.stats() for name, upstream in self._upstreams.items()}
+
+
+upstreams = UpstreamRegistry.from_env()
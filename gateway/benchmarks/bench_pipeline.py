@@ -0,0 +1,150 @@
+"""게이트웨이 파이프라인의 요청당 오버헤드를 측정하는 마이크로 벤치마크입니다.
+
+기존 파이프라인(BaseHTTPMiddleware + startswith 라우팅 + print)과 현재 pure ASGI 파이프라인을
+같은 로컬 스텁 업스트림(ASGI 앱, 네트워크 없음)에 대해 비교합니다.
+
+    cd gateway && python benchmarks/bench_pipeline.py [요청 수]
+"""
+import os
+import sys
+import time
+import asyncio
+import contextlib
+import statistics
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+STUB_URLS = {
+    "USER_SERVICE_URL": "http://user-stub",
+    "BOARD_SERVICE_URL": "http://board-stub",
+    "BLOG_SERVICE_URL": "http://blog-stub",
+}
+os.environ.update(STUB_URLS)
+
+import httpx
+from fastapi import FastAPI, Request, Response, HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# --- 로컬 스텁 업스트림 ---
+stub = FastAPI()
+
+
+@stub.get("/api/auth/me")
+async def stub_me():
+    return {"id": 1, "username": "bench"}
+
+
+@stub.get("/api/board/posts/{post_id}")
+async def stub_get_post(post_id: int):
+    return {"post": {"id": post_id, "title": "t", "content": "c" * 512}, "views": 1}
+
+
+@stub.patch("/api/board/posts/{post_id}")
+async def stub_update_post(post_id: int, request: Request):
+    return {"id": post_id, "owner_id": int(request.headers.get("x-user-id", 0))}
+
+
+stub_transport = httpx.ASGITransport(app=stub)
+
+
+# --- 기존 파이프라인 (변경 전 main.py / auth_middleware.py 재현) ---
+def build_legacy_app() -> FastAPI:
+    legacy = FastAPI()
+    client = httpx.AsyncClient(transport=stub_transport, timeout=httpx.Timeout(10.0, connect=5.0))
+
+    class LegacyAuthMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            if request.method in ("GET", "OPTIONS") or request.url.path in ["/api/auth/login", "/api/auth/register"]:
+                return await call_next(request)
+            session_id = request.cookies.get("session_id")
+            async with httpx.AsyncClient(transport=stub_transport) as auth_client:
+                auth_resp = await auth_client.get(f"{STUB_URLS['USER_SERVICE_URL']}/api/auth/me", cookies={"session_id": session_id})
+                new_headers = request.headers.mutablecopy()
+                new_headers["X-User-Id"] = str(auth_resp.json().get("id"))
+                request.scope["headers"] = new_headers.raw
+            return await call_next(request)
+
+    legacy.add_middleware(LegacyAuthMiddleware)
+
+    @legacy.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+    async def reverse_proxy(request: Request):
+        path = request.url.path
+        print(path)
+        print(STUB_URLS["USER_SERVICE_URL"])
+        if path.startswith("/api/users") or path.startswith("/api/auth"):
+            base_url = STUB_URLS["USER_SERVICE_URL"]
+        elif path.startswith("/api/board"):
+            base_url = STUB_URLS["BOARD_SERVICE_URL"]
+        elif path.startswith("/api/blog"):
+            base_url = STUB_URLS["BLOG_SERVICE_URL"]
+        else:
+            raise HTTPException(status_code=404, detail="Endpoint not found")
+        rp_resp = await client.request(
+            method=request.method,
+            url=f"{base_url}{path}?{request.url.query}",
+            headers=request.headers.raw,
+            content=await request.body(),
+        )
+        headers = dict(rp_resp.headers)
+        headers.pop("content-length", None)
+        headers.pop("content-encoding", None)
+        return Response(content=rp_resp.content, status_code=rp_resp.status_code, headers=headers)
+
+    return legacy
+
+
+# --- 현재 파이프라인 ---
+def build_current_app():
+    from upstreams import upstreams
+    for name, env in (("user", "USER_SERVICE_URL"), ("board", "BOARD_SERVICE_URL"), ("blog", "BLOG_SERVICE_URL")):
+        upstreams.register(name, STUB_URLS[env], transport=stub_transport)
+    import main
+    return main.app
+
+
+async def run(app, method: str, path: str, n: int) -> list:
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway", cookies={"session_id": "bench"}) as client:
+        kwargs = {}
+        if method != "GET":
+            kwargs["json"] = {"title": "x"}
+        for _ in range(n // 10):  # 워밍업
+            await client.request(method, path, **kwargs)
+        for _ in range(n):
+            started = time.perf_counter()
+            resp = await client.request(method, path, **kwargs)
+            samples.append(time.perf_counter() - started)
+            assert resp.status_code == 200, resp.text
+    return samples
+
+
+async def measure_stub(method: str, path: str, n: int) -> list:
+    """게이트웨이 없이 스텁만 호출했을 때의 기준 시간입니다."""
+    return await run(stub, method, path, n)
+
+
+def summarize(label: str, samples: list, baseline: float):
+    samples = sorted(samples)
+    mean = statistics.mean(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"  {label:<8} mean={mean * 1e6:8.1f}us  p50={samples[len(samples) // 2] * 1e6:8.1f}us  "
+          f"p99={p99 * 1e6:8.1f}us  overhead={(mean - baseline) * 1e6:8.1f}us")
+
+
+async def main(n: int):
+    legacy_app = build_legacy_app()
+    current_app = build_current_app()
+    for method, path in (("GET", "/api/board/posts/1"), ("PATCH", "/api/board/posts/1")):
+        print(f"{method} {path} (n={n})")
+        baseline = statistics.mean(await measure_stub(method, path, n))
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            legacy = await run(legacy_app, method, path, n)
+        current = await run(current_app, method, path, n)
+        summarize("legacy", legacy, baseline)
+        summarize("current", current, baseline)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
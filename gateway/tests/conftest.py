@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 게이트웨이 모듈은 컨테이너 안에서처럼 app 폴더를 기준으로 임포트합니다 (from upstreams import ...).
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
@@ -0,0 +1,65 @@
+import json
+import asyncio
+import httpx
+
+from upstreams import upstreams
+
+
+class SlowStream(httpx.AsyncByteStream):
+    """청크 사이마다 이벤트 루프에 양보하는 응답 본문입니다. (실제 업스트림처럼 본문이 나중에 도착합니다.)"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def __aiter__(self):
+        for start in range(0, len(self.body), 4):
+            await asyncio.sleep(0.001)
+            yield self.body[start:start + 4]
+
+
+# 스텁이 응답한 요청의 (메서드, 경로)를 응답한 순서대로 기록합니다.
+handled = []
+
+
+class StreamingUpstream(httpx.AsyncBaseTransport):
+    """요청 경로, 메서드, 게이트웨이가 붙인 X-User-Id를 JSON으로 나눠 보내는 업스트림 스텁입니다.
+
+    X-Stub-Fail이 있으면 연결 오류를 내고, X-Stub-Delay가 있으면 그 시간(초)만큼 늦게 응답합니다.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if "x-stub-fail" in request.headers:
+            raise httpx.ReadError("connection reset")
+        if "x-stub-delay" in request.headers:
+            await asyncio.sleep(float(request.headers["x-stub-delay"]))
+        handled.append((request.method, request.url.path))
+        if request.url.path == "/api/auth/me":
+            payload = {"id": 7}
+        else:
+            payload = {"path": request.url.path, "method": request.method, "user": request.headers.get("x-user-id")}
+        body = json.dumps(payload).encode()
+        return httpx.Response(200, headers={"content-type": "application/json"}, stream=SlowStream(body))
+
+
+for name in ("user", "board", "blog"):
+    upstreams.register(name, f"http://{name}-stub", transport=StreamingUpstream())
+
+import main  # noqa: E402  업스트림을 스텁으로 바꾼 뒤에 앱을 만듭니다.
+
+
+def run_batch(payload: dict, cookies: dict = None) -> httpx.Response:
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway", cookies=cookies) as client:
+            return await client.post("/api/batch", json=payload)
+
+    return asyncio.run(go())
+
+
+def call_gateway(method: str, path: str, **kwargs) -> httpx.Response:
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(go())
@@ -0,0 +1,80 @@
+import httpx
+import pytest
+
+from session_cache import session_cache
+from stubs import call_gateway
+
+
+def test_client_x_user_id_is_dropped_on_reads():
+    response = call_gateway("GET", "/api/board/posts/1", headers={"X-User-Id": "99"})
+
+    assert response.status_code == 200
+    assert response.json()["user"] is None
+
+
+def test_client_x_user_id_is_replaced_on_writes():
+    response = call_gateway(
+        "POST", "/api/board/posts", json={"title": "t"},
+        headers={"X-User-Id": "99", "Cookie": "session_id=test-session"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["user"] == "7"
+
+
+def test_logout_invalidates_session_even_if_downstream_fails():
+    session_cache.set_user("logout-session", "7")
+
+    with pytest.raises(httpx.ReadError):
+        call_gateway("POST", "/api/auth/logout", headers={"Cookie": "session_id=logout-session", "X-Stub-Fail": "1"})
+
+    assert session_cache.get("logout-session") is None
+
+
+def test_change_password_invalidates_every_session_of_the_user():
+    for session_id in ("password-session", "other-device"):
+        session_cache.set_user(session_id, "7")
+    session_cache.set_user("someone-else", "8")
+
+    call_gateway("POST", "/api/auth/change-password", json={}, headers={"Cookie": "session_id=password-session"})
+
+    assert session_cache.get("password-session") is None
+    assert session_cache.get("other-device") is None
+    assert session_cache.get("someone-else") == ("8", None)
+
+
+@pytest.fixture
+def signed_sessions(monkeypatch):
+    import session_tokens
+
+    monkeypatch.setattr(session_tokens, "SESSION_MODE", "signed")
+    monkeypatch.setattr(session_tokens, "SESSION_SIGNING_KEY", "test-key")
+    return session_tokens
+
+
+def _token_issued_seconds_ago(session_tokens, seconds: int) -> str:
+    issued_at_ms = session_tokens._now_ms() - seconds * 1000
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(session_tokens, "_now_ms", lambda: issued_at_ms)
+        return session_tokens.sign_session_token(7)
+
+
+def test_writes_refresh_signed_token_past_half_life(signed_sessions):
+    token = _token_issued_seconds_ago(signed_sessions, signed_sessions.SESSION_TOKEN_TTL_SECONDS * 3 // 4)
+
+    response = call_gateway("POST", "/api/board/posts", json={"title": "t"}, headers={"Cookie": f"session_id={token}"})
+
+    assert response.status_code == 200
+    refreshed = response.cookies.get("session_id")
+    assert refreshed and refreshed != token
+    claims = signed_sessions.verify_session_token(refreshed)
+    assert claims.user_id == 7 and not signed_sessions.needs_refresh(claims)
+
+
+def test_fresh_signed_token_is_not_reissued(signed_sessions):
+    token = _token_issued_seconds_ago(signed_sessions, 10)
+
+    response = call_gateway("POST", "/api/board/posts", json={"title": "t"}, headers={"Cookie": f"session_id={token}"})
+
+    assert response.status_code == 200
+    assert "set-cookie" not in response.headers
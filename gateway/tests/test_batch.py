@@ -0,0 +1,62 @@
+from upstreams import upstreams
+from stubs import handled, run_batch
+
+
+def test_streamed_sub_request_returns_full_body():
+    response = run_batch({"requests": [{"id": "post", "path": "/api/board/posts/1"}]})
+
+    assert response.status_code == 200
+    (result,) = response.json()["responses"]
+    assert result["status"] == 200
+    assert result["body"] == {"path": "/api/board/posts/1", "method": "GET", "user": None}
+
+
+def test_streamed_write_sub_request_returns_full_body():
+    response = run_batch(
+        {"requests": [{"method": "POST", "path": "/api/board/posts", "body": {"title": "t"}}]},
+        cookies={"session_id": "test-session"},
+    )
+
+    (result,) = response.json()["responses"]
+    assert result["status"] == 200
+    assert result["body"] == {"path": "/api/board/posts", "method": "POST", "user": "7"}
+
+
+def test_streamed_sub_request_releases_upstream_slot():
+    board = upstreams.get("board")
+    run_batch({"requests": [{"path": f"/api/board/posts/{post_id}"} for post_id in range(1, 4)]})
+
+    assert board.in_flight == 0
+
+
+def test_batched_reads_do_not_carry_the_user_id():
+    response = run_batch(
+        {"requests": [
+            {"id": "read", "path": "/api/board/posts/1"},
+            {"id": "write", "method": "POST", "path": "/api/board/posts", "body": {"title": "t"}},
+        ]},
+        cookies={"session_id": "test-session"},
+    )
+
+    read, write = response.json()["responses"]
+    assert read["body"]["user"] is None
+    assert write["body"]["user"] == "7"
+
+
+def test_writes_run_in_request_order():
+    handled.clear()
+    response = run_batch(
+        {"requests": [
+            {"method": "POST", "path": "/api/board/posts", "body": {}, "headers": {"X-Stub-Delay": "0.05"}},
+            {"path": "/api/board/posts/2"},
+            {"method": "PATCH", "path": "/api/board/posts/1", "body": {}},
+            {"method": "DELETE", "path": "/api/board/posts/1"},
+        ]},
+        cookies={"session_id": "test-session"},
+    )
+
+    assert [result["status"] for result in response.json()["responses"]] == [200] * 4
+    writes = [entry for entry in handled if entry[0] != "GET"]
+    assert writes == [
+        ("POST", "/api/board/posts"), ("PATCH", "/api/board/posts/1"), ("DELETE", "/api/board/posts/1"),
+    ]
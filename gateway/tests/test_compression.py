@@ -0,0 +1,58 @@
+import asyncio
+import httpx
+from starlette.responses import Response
+
+from compression import CompressionMiddleware
+from response_cache import etag_matches
+
+ETAG = '"abc123"'
+
+
+async def etag_app(scope, receive, send):
+    """응답 캐시처럼 강한 ETag를 붙이고 If-None-Match가 맞으면 304를 돌려주는 앱입니다."""
+    request_headers = dict((name.decode(), value.decode()) for name, value in scope["headers"])
+    if etag_matches(request_headers.get("if-none-match"), ETAG):
+        response = Response(status_code=304, headers={"etag": ETAG})
+    else:
+        size = 10 if scope["path"] == "/small" else 5000
+        response = Response(b"x" * size, media_type="application/json", headers={"etag": ETAG})
+    await response(scope, receive, send)
+
+
+def get(path: str, headers: dict) -> httpx.Response:
+    async def go():
+        transport = httpx.ASGITransport(app=CompressionMiddleware(etag_app, min_size=1024))
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            return await client.get(path, headers=headers)
+
+    return asyncio.run(go())
+
+
+def test_compressed_response_keeps_strong_etag_per_encoding():
+    response = get("/large", {"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"abc123-gzip"'
+    assert response.content == b"x" * 5000
+
+
+def test_revalidation_with_encoded_etag_returns_304():
+    response = get("/large", {"accept-encoding": "gzip", "if-none-match": '"abc123-gzip"'})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"abc123-gzip"'
+
+
+def test_encoded_etag_does_not_match_identity_representation():
+    response = get("/large", {"accept-encoding": "identity", "if-none-match": '"abc123-gzip"'})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == ETAG
+
+
+def test_small_response_varies_on_accept_encoding():
+    response = get("/small", {"accept-encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == ETAG
+    assert "accept-encoding" in response.headers["vary"].lower()
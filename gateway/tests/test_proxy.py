@@ -0,0 +1,96 @@
+import asyncio
+import httpx
+import pytest
+from starlette.requests import Request
+
+from upstreams import Upstream
+from proxy import reverse_proxy
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """첫 청크를 보낸 뒤 업스트림 연결이 끊기는 응답 본문입니다."""
+
+    async def __aiter__(self):
+        yield b'{"partial":'
+        await asyncio.sleep(0)
+        raise httpx.ReadError("connection reset")
+
+
+class BrokenUpstream(httpx.AsyncBaseTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "application/json"}, stream=BrokenStream())
+
+
+def make_request(path: str) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"gateway")],
+        "asgi": {"spec_version": "2.4"},
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    return Request(scope, receive)
+
+
+def test_upstream_error_mid_body_releases_slot():
+    upstream = Upstream("board", "http://board-stub", transport=BrokenUpstream())
+
+    async def proxy_once():
+        request = make_request("/api/board/posts/1")
+        response = await reverse_proxy(request, upstream)
+
+        async def send(message):
+            pass
+
+        with pytest.raises(httpx.ReadError):
+            await response(request.scope, request.receive, send)
+
+    async def go():
+        for _ in range(3):
+            await proxy_once()
+
+    asyncio.run(go())
+    assert upstream.in_flight == 0
+    assert upstream.admission.stats()["in_flight"] == 0
+
+
+class SlowUpstream(httpx.AsyncBaseTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async def body():
+            await asyncio.sleep(1)
+            yield b"{}"
+
+        class Stream(httpx.AsyncByteStream):
+            def __aiter__(self):
+                return body()
+
+        return httpx.Response(200, stream=Stream())
+
+
+def test_client_disconnect_before_body_releases_slot():
+    upstream = Upstream("board", "http://board-stub", transport=SlowUpstream())
+
+    async def go():
+        request = make_request("/api/board/posts/1")
+        # ASGI 2.4 이전 서버처럼 연결 끊김을 듣도록 합니다.
+        request.scope["asgi"] = {"spec_version": "2.0"}
+        response = await reverse_proxy(request, upstream)
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        await response(request.scope, receive, send)
+
+    asyncio.run(go())
+    assert upstream.in_flight == 0
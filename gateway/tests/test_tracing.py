@@ -0,0 +1,54 @@
+import asyncio
+import httpx
+import pytest
+from tracing import Span, _current_span, exporter
+from upstreams import Upstream
+
+
+def _refuse(request):
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+def _ok(request):
+    return httpx.Response(200, json={"traceparent": request.headers.get("traceparent")})
+
+
+async def _call(parent: Span, handler):
+    upstream = Upstream("traced", "http://traced", transport=httpx.MockTransport(handler))
+    token = _current_span.set(parent)
+    try:
+        return await upstream.request("GET", "http://traced/x")
+    finally:
+        _current_span.reset(token)
+        await upstream.client.aclose()
+
+
+def _client_spans(parent: Span) -> list:
+    return [span for span in exporter.spans if span["parent_id"] == parent.span_id]
+
+
+def _parent() -> Span:
+    return Span("GET /test", "a" * 32, None, True, kind="server")
+
+
+def test_client_span_is_ended_when_upstream_is_unreachable():
+    parent = _parent()
+
+    async def go():
+        with pytest.raises(httpx.ConnectError):
+            await _call(parent, _refuse)
+
+    asyncio.run(go())
+    (span,) = _client_spans(parent)
+    assert span["kind"] == "client"
+    assert span["error"].startswith("ConnectError")
+    assert span["attributes"]["peer.service"] == "traced"
+
+
+def test_client_span_propagates_traceparent_and_records_status():
+    parent = _parent()
+    response = asyncio.run(_call(parent, _ok))
+    (span,) = _client_spans(parent)
+    assert span["attributes"]["http.status_code"] == 200
+    assert span["error"] is None
+    assert response.json()["traceparent"] == f"00-{parent.trace_id}-{span['span_id']}-01"
@@ -1,37 +1,85 @@
 import os
 import math
 import asyncio
-import uuid
-from typing import Annotated, List, Set
+from typing import Annotated, Dict, List, Optional, Set
 from fastapi import FastAPI, Depends, HTTPException, Header, Query, status, UploadFile, File
 from fastapi.staticfiles import StaticFiles
-from sqlmodel import select, func, SQLModel
+from sqlmodel import select, SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import selectinload
-import httpx
 
 
-from database import init_db, get_session
-from models import BlogArticle, ArticleCreate, ArticleUpdate, ArticleImage
+from database import init_db, get_session, engine, pool_stats
+from metrics import MetricsMiddleware, instrument_engine, metrics_response
+from tracing import TracingMiddleware, trace_engine, traces_response
+from models import BlogArticle, ArticleCreate, ArticleUpdate, ArticleImage, ImageDerivative, ListCounter
+from http_client import user_service_client, close_http_clients, fetch_authors
+from storage import ContentAddressedStorage
+from derivatives import DerivativePipeline
+from pagination import adjust_totals, get_total, fetch_page, TotalsReconciler
+from search import FullTextSearch
 
 app = FastAPI(title="Blog Service")
-USER_SERVICE_URL = os.getenv("USER_SERVICE_URL")
+app.add_middleware(MetricsMiddleware)
+# traceparent를 이어받아 요청 전체를 server 스팬으로, DB 쿼리를 자식 스팬으로 기록합니다.
+app.add_middleware(TracingMiddleware, service_name="blog_service")
+instrument_engine(engine)
+trace_engine(engine)
 
 STATIC_DIR = "/app/static"
 IMAGE_DIR = f"{STATIC_DIR}/images"
 os.makedirs(IMAGE_DIR, exist_ok=True)
+image_storage = ContentAddressedStorage(IMAGE_DIR)
+image_derivatives = DerivativePipeline(engine, ImageDerivative, IMAGE_DIR, "/static/images")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+# 제목/본문/태그 전문 검색 (MySQL FULLTEXT, ngram 파서)
+article_search = FullTextSearch(BlogArticle, ["title", "content", "tags"], "ft_blogarticle_title_content_tags")
+
+# 목록 개수 카운터를 서버 시작 때 채우고 주기적으로 COUNT(*)와 맞춥니다.
+article_totals = TotalsReconciler(engine, BlogArticle, ListCounter)
+
 class PaginatedResponse(SQLModel):
     total: int
-    page: int
+    # after_id로 조회하면 page는 None입니다.
+    page: Optional[int] = None
     size: int
     pages: int
     items: List[dict] = []
+    # 다음 페이지를 읽을 때 after_id로 넘길 값. 마지막 페이지면 None입니다.
+    next_after_id: Optional[int] = None
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식의 메트릭을 반환합니다."""
+    return metrics_response()
+
+@app.get("/traces")
+async def traces(limit: int = 100, trace_id: Optional[str] = None):
+    """최근 기록된 스팬을 반환합니다. trace_id로 트레이스 하나만 볼 수 있습니다."""
+    return traces_response(limit, trace_id)
+
+@app.get("/stats/db-pool")
+async def db_pool_stats():
+    """DB 커넥션 풀의 사용 중/overflow 연결 수와 고갈/타임아웃 횟수를 반환합니다."""
+    return pool_stats()
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    await article_totals.start()
+    await article_search.ensure_index(engine)
+    # 재시작 전에 끝나지 못한 파생 이미지 작업을 다시 예약합니다.
+    async with AsyncSession(engine) as session:
+        filenames = await session.exec(select(ArticleImage.image_filename).distinct())
+        filenames = filenames.all()
+    await image_derivatives.backfill(filenames)
+    await asyncio.to_thread(image_storage.recover)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await article_totals.stop()
+    await close_http_clients()
+    image_derivatives.shutdown()
 
 @app.post("/api/blog/articles", response_model=BlogArticle, status_code=status.HTTP_201_CREATED)
 async def create_article(
@@ -42,80 +90,106 @@ async def create_article(
     """새로운 블로그 게시글을 생성합니다."""
     new_article = BlogArticle.model_validate(article_data, update={"owner_id": x_user_id})
     session.add(new_article)
+    await adjust_totals(session, ListCounter, x_user_id, 1)
     await session.commit()
     await session.refresh(new_article)
     return new_article
 
+async def get_thumbnail_urls(session: AsyncSession, article_ids: List[int]) -> Dict[int, str]:
+    """게시글별 첫 이미지의 목록용 URL을 반환합니다. 썸네일이 준비됐으면 썸네일을, 아직이면 원본을 씁니다."""
+    first_images = {}
+    if article_ids:
+        image_query = select(ArticleImage).where(ArticleImage.article_id.in_(article_ids)).order_by(ArticleImage.id)
+        image_results = await session.exec(image_query)
+        for img in image_results.all():
+            first_images.setdefault(img.article_id, img.image_filename)
+
+    variants = await image_derivatives.variant_urls(session, first_images.values())
+    return {
+        article_id: variants.get(filename, {}).get("thumb", f"/static/images/{filename}")
+        for article_id, filename in first_images.items()
+    }
+
 @app.get("/api/blog/articles", response_model=PaginatedResponse)
 async def list_articles(
     session: Annotated[AsyncSession, Depends(get_session)],
     page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=100)
+    size: int = Query(10, ge=1, le=100),
+    owner_id: Optional[int] = None,
+    after_id: Optional[int] = Query(None, ge=1, description="이전 응답의 next_after_id. 주면 page 대신 id 기준으로 이어서 읽습니다."),
 ):
     """블로그 게시글 목록을 페이지네이션하여 반환합니다."""
-    offset = (page - 1) * size
-    count_query = select(func.count(BlogArticle.id))
-    total_result = await session.exec(count_query)
-    total = total_result.one()
-
-    articles_query = select(BlogArticle).order_by(BlogArticle.id.desc()).offset(offset).limit(size)
-    articles_result = await session.exec(articles_query)
-    articles = articles_result.all()
-
-    author_ids = {p.owner_id for p in articles}
-    authors = {}
-    if author_ids:
-        try:
-            async with httpx.AsyncClient() as client:
-                tasks = [client.get(f"{USER_SERVICE_URL}/api/users/{uid}") for uid in author_ids]
-                results = await asyncio.gather(*tasks)
-                for resp in results:
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        authors[data['id']] = data.get('username', 'Unknown')
-        except Exception: pass
-    
-    article_ids = [a.id for a in articles]
-    thumbnails = {}
-    if article_ids:
-        image_query = select(ArticleImage).where(ArticleImage.article_id.in_(article_ids))
-        image_results = await session.exec(image_query)
-        for img in image_results.all():
-            if img.article_id not in thumbnails:
-                thumbnails[img.article_id] = f"/static/images/{img.image_filename}"
+    # 전체 개수는 매번 세지 않고 글 생성/삭제 때 갱신되는 카운터에서 읽습니다.
+    total = await get_total(session, ListCounter, owner_id)
+    articles, next_after_id = await fetch_page(session, BlogArticle, size, page, after_id, owner_id)
+
+    authors = await fetch_authors(p.owner_id for p in articles)
+
+    thumbnails = await get_thumbnail_urls(session, [a.id for a in articles])
 
     items_with_details = []
     for article in articles:
         article_dict = article.model_dump()
-        article_dict["author_username"] = authors.get(article.owner_id, "Unknown")
+        article_dict["author_username"] = authors.get(article.owner_id, {}).get("username", "Unknown")
         article_dict["image_url"] = thumbnails.get(article.id)
         items_with_details.append(article_dict)
         
+    return PaginatedResponse(
+        total=total, page=None if after_id is not None else page, size=size,
+        pages=math.ceil(total / size), items=items_with_details, next_after_id=next_after_id,
+    )
+
+@app.get("/api/blog/search", response_model=PaginatedResponse)
+async def search_articles(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    q: str = Query(..., min_length=2, max_length=100, description="검색어 (2글자 이상)"),
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=100),
+    owner_id: Optional[int] = None,
+):
+    """제목, 본문, 태그에서 검색어와 관련도가 높은 게시글 순으로 반환합니다."""
+    total, results = await article_search.search(session, q.strip(), page, size, owner_id)
+    authors = await fetch_authors(article.owner_id for article, _ in results)
+
+    thumbnails = await get_thumbnail_urls(session, [article.id for article, _ in results])
+
+    items_with_details = []
+    for article, score in results:
+        article_dict = article.model_dump()
+        article_dict["author_username"] = authors.get(article.owner_id, {}).get("username", "Unknown")
+        article_dict["image_url"] = thumbnails.get(article.id)
+        article_dict["score"] = score
+        items_with_details.append(article_dict)
+
     return PaginatedResponse(
         total=total, page=page, size=size,
-        pages=math.ceil(total / size), items=items_with_details
+        pages=math.ceil(total / size), items=items_with_details,
     )
 
 @app.get("/api/blog/articles/{article_id}")
 async def get_article(article_id: int, session: Annotated[AsyncSession, Depends(get_session)]):
     """특정 블로그 게시글의 상세 정보를 반환합니다."""
-    query = select(BlogArticle).where(BlogArticle.id == article_id).options(selectinload(BlogArticle.images))
-    results = await session.exec(query)
-    article = results.one_or_none()
+    article = await session.get(BlogArticle, article_id)
     
     if not article: raise HTTPException(status_code=404, detail="Article not found")
     
     author_info = {}
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{USER_SERVICE_URL}/api/users/{article.owner_id}")
-            if resp.status_code == 200: author_info = resp.json()
+        resp = await user_service_client.get(f"/api/users/{article.owner_id}")
+        if resp.status_code == 200: author_info = resp.json()
     except Exception:
         author_info = {"username": "Unknown"}
 
-    image_urls = [f"/static/images/{img.image_filename}" for img in article.images]
-    
-    return {"article": article, "author": author_info, "image_urls": image_urls}
+    image_results = await session.exec(
+        select(ArticleImage.image_filename).where(ArticleImage.article_id == article_id).order_by(ArticleImage.id)
+    )
+    filenames = image_results.all()
+    image_urls = [f"/static/images/{filename}" for filename in filenames]
+    # image_urls와 같은 순서로, 준비된 파생 이미지 URL({"thumb": ..., "medium": ...})을 담습니다.
+    variants = await image_derivatives.variant_urls(session, filenames)
+    image_variants = [variants.get(filename, {}) for filename in filenames]
+
+    return {"article": article, "author": author_info, "image_urls": image_urls, "image_variants": image_variants}
 
 @app.patch("/api/blog/articles/{article_id}", response_model=BlogArticle)
 async def update_article(
@@ -146,29 +220,41 @@ async def delete_article(
     x_user_id: Annotated[int, Header(alias="X-User-Id")],
 ):
     """게시글과 연결된 모든 이미지를 삭제하고, 게시글 자체를 삭제합니다."""
-    # 게시글과 이미지들을 함께 불러옵니다.
-    query = select(BlogArticle).where(BlogArticle.id == article_id).options(selectinload(BlogArticle.images))
-    results = await session.exec(query)
-    db_article = results.one_or_none()
+    db_article = await session.get(BlogArticle, article_id)
 
     if not db_article:
         raise HTTPException(status_code=404, detail="Article not found")
     if db_article.owner_id != x_user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # 연결된 이미지 파일들을 서버에서 삭제
-    for image in db_article.images:
-        file_path = os.path.join(IMAGE_DIR, image.image_filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        # 이미지 DB 레코드 삭제
+    # 이미지 DB 레코드 삭제
+    image_results = await session.exec(select(ArticleImage).where(ArticleImage.article_id == article_id))
+    filenames = set()
+    for image in image_results.all():
+        filenames.add(image.image_filename)
         await session.delete(image)
 
     # 게시글 DB 레코드 삭제
     await session.delete(db_article)
+    await adjust_totals(session, ListCounter, db_article.owner_id, -1)
     await session.commit()
+
+    # 같은 내용의 이미지는 파일 하나를 공유하므로, 더 이상 참조하는 행이 없는 파일만 서버에서 삭제합니다.
+    deleted = False
+    for filename in filenames:
+        if await image_storage.delete_unreferenced(filename, is_image_referenced):
+            await image_derivatives.delete_variants(session, filename)
+            deleted = True
+    if deleted:
+        await session.commit()
     return
 
+async def is_image_referenced(filename: str) -> bool:
+    """이미지 파일을 참조하는 행이 있는지 확인합니다. 다른 요청이 방금 커밋한 행도 보도록 새 세션에서 조회합니다."""
+    async with AsyncSession(engine) as session:
+        result = await session.exec(select(ArticleImage.id).where(ArticleImage.image_filename == filename).limit(1))
+        return result.first() is not None
+
 @app.post("/api/blog/articles/{article_id}/upload-images", response_model=List[str])
 async def upload_article_images(
     article_id: int,
@@ -183,20 +269,23 @@ async def upload_article_images(
     if db_article.owner_id != x_user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    # 여러 파일을 동시에 디스크로 스트리밍합니다. 같은 내용의 파일은 한 번만 저장됩니다.
+    stored_files = await image_storage.save_many(files, is_image_referenced)
     saved_filenames = []
-    for file in files:
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(IMAGE_DIR, unique_filename)
+    try:
+        for stored in stored_files:
+            new_image = ArticleImage(image_filename=stored.filename, article_id=article_id)
+            session.add(new_image)
+            saved_filenames.append(stored.filename)
 
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
+        await session.commit()
+    finally:
+        # 이미 있던 파일을 참조한 경우, 커밋하는 사이에 그 파일이 지워졌으면 다시 만듭니다.
+        await image_storage.settle(stored_files)
 
-        new_image = ArticleImage(image_filename=unique_filename, article_id=article_id)
-        session.add(new_image)
-        saved_filenames.append(unique_filename)
-    
-    await session.commit()
+    # 썸네일/중간 크기 이미지는 응답을 보낸 뒤 프로세스 풀에서 만듭니다.
+    for filename in dict.fromkeys(saved_filenames):
+        image_derivatives.submit(filename)
     return saved_filenames
 
 @app.get("/api/blog/tags", response_model=List[str])
@@ -1,11 +1,12 @@
 from datetime import datetime, timezone 
 from typing import List, Optional
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 # 1. 이미지 정보를 저장할 새 테이블 모델
 class ArticleImage(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    image_filename: str
+    image_filename: str = Field(index=True)
     
     # 외래 키 제약 조건 및 Relationship 제거
     article_id: Optional[int] = Field(default=None, index=True)
@@ -17,7 +18,8 @@ class BlogArticle(SQLModel, table=True):
     title: str = Field(index=True)
     content: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    owner_id: int
+    # 작성자별 목록을 id 순으로 읽을 때 사용 (InnoDB 보조 인덱스는 기본 키를 포함합니다)
+    owner_id: int = Field(index=True)
     tags: Optional[str] = Field(default=None)
     
     # Relationship 제거
@@ -32,4 +34,21 @@ class ArticleCreate(SQLModel):
 class ArticleUpdate(SQLModel):
     title: Optional[str] = Field(default=None)
     content: Optional[str] = Field(default=None)
-    tags: Optional[str] = Field(default=None)
\ No newline at end of file
+    tags: Optional[str] = Field(default=None)
+
+# 업로드 이미지의 썸네일/중간 크기 파생 이미지 (derivatives.py가 백그라운드에서 기록)
+class ImageDerivative(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("source_filename", "variant"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source_filename: str = Field(index=True, max_length=255)
+    variant: str = Field(max_length=32)
+    filename: str = Field(max_length=255)
+    width: int
+    height: int
+
+
+# 목록 전체/작성자별 글 개수 (pagination.py가 글 생성/삭제 때 갱신)
+class ListCounter(SQLModel, table=True):
+    name: str = Field(primary_key=True, max_length=64)
+    value: int = Field(default=0)
@@ -0,0 +1,19 @@
+import asyncio
+
+from database import engine
+from main import article_search
+
+# 전문 검색 인덱스를 지우고 기존 데이터로 다시 만듭니다.
+# 평소에는 InnoDB가 글 저장/수정/삭제 때 인덱스를 함께 갱신하므로 필요 없고,
+# ngram_token_size를 바꿨거나 대량 삭제 후 인덱스를 정리할 때 실행합니다.
+#   docker compose exec blog_service python rebuild_search_index.py
+
+
+async def main():
+    await article_search.rebuild_index(engine)
+    await engine.dispose()
+    print("[search] index rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
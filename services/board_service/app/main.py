@@ -1,36 +1,96 @@
 import os
 import math
 import asyncio
-import time # time 모듈 추가
 from typing import Annotated, List, Optional
 from fastapi import FastAPI, Depends, HTTPException, Header, Query, status, Response
-from sqlmodel import select, func, SQLModel
+from sqlmodel import select, col, SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-import httpx
-import redis.asyncio as redis
 
 # 같은 폴더에 있는 다른 .py 파일들을 임포트합니다.
-from database import init_db, get_session
-from redis_client import get_redis
-from models import Post, PostCreate, PostUpdate
+from database import init_db, get_session, engine, pool_stats
+from metrics import MetricsMiddleware, instrument_engine, metrics_response
+from tracing import TracingMiddleware, trace_engine, traces_response
+from models import Post, PostCreate, PostUpdate, ListCounter
+from http_client import user_service_client, close_http_clients, fetch_authors
+from pagination import adjust_totals, get_total, fetch_page, TotalsReconciler
+from view_counter import view_counter
+from trending import trending_posts
+from search import FullTextSearch
+from post_cache import post_cache
 
 app = FastAPI(title="Board Service")
+app.add_middleware(MetricsMiddleware)
+# traceparent를 이어받아 요청 전체를 server 스팬으로, DB 쿼리를 자식 스팬으로 기록합니다.
+app.add_middleware(TracingMiddleware, service_name="board_service")
+instrument_engine(engine)
+trace_engine(engine)
 
-# 환경 변수에서 User Service의 주소를 가져옵니다.
-USER_SERVICE_URL = os.getenv("USER_SERVICE_URL")
+# 제목/본문 전문 검색 (MySQL FULLTEXT, ngram 파서)
+post_search = FullTextSearch(Post, ["title", "content"], "ft_post_title_content")
+
+# 목록 개수 카운터를 서버 시작 때 채우고 주기적으로 COUNT(*)와 맞춥니다.
+post_totals = TotalsReconciler(engine, Post, ListCounter)
 
 # 페이지네이션 응답을 위한 데이터 모델
 class PaginatedResponse(SQLModel):
     total: int
-    page: int
+    # after_id로 조회하면 page는 None입니다.
+    page: Optional[int] = None
     size: int
     pages: int
     items: List[dict] = []
+    # 다음 페이지를 읽을 때 after_id로 넘길 값. 마지막 페이지면 None입니다.
+    next_after_id: Optional[int] = None
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식의 메트릭을 반환합니다."""
+    return metrics_response()
+
+@app.get("/traces")
+async def traces(limit: int = 100, trace_id: Optional[str] = None):
+    """최근 기록된 스팬을 반환합니다. trace_id로 트레이스 하나만 볼 수 있습니다."""
+    return traces_response(limit, trace_id)
+
+@app.get("/stats/db-pool")
+async def db_pool_stats():
+    """DB 커넥션 풀의 사용 중/overflow 연결 수와 고갈/타임아웃 횟수를 반환합니다."""
+    return pool_stats()
+
+@app.get("/stats/views")
+async def view_counter_stats():
+    """아직 Redis에 반영하지 않은 조회수 증가분과 반영 횟수를 반환합니다."""
+    return view_counter.stats() | {"trending_rebases": trending_posts.rebases}
+
+@app.get("/stats/post-cache")
+async def post_cache_stats():
+    """게시글 캐시의 단계별(프로세스 안/Redis) 적중 수와 적중률을 반환합니다."""
+    return post_cache.stats()
+
+def with_live_views(post_dict: dict) -> dict:
+    """캐시나 DB에서 읽은 게시글에 이 프로세스가 알고 있는 최신 조회수를 합친 사본을 반환합니다."""
+    post_dict = dict(post_dict)
+    live_views = view_counter.current(post_dict["id"])
+    if live_views is not None:
+        post_dict["views"] = max(post_dict["views"], live_views)
+    return post_dict
 
 @app.on_event("startup")
 async def on_startup():
     """서버가 시작될 때 DB 테이블을 생성합니다."""
     await init_db()
+    await post_totals.start()
+    await post_search.ensure_index(engine)
+    await view_counter.start()
+    await trending_posts.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await post_totals.stop()
+    # 남은 조회수 증가분을 Redis에 반영한 뒤 종료합니다.
+    await view_counter.stop()
+    await trending_posts.stop()
+    await close_http_clients()
 
 @app.post("/api/board/posts", response_model=Post, status_code=status.HTTP_201_CREATED)
 async def create_post(
@@ -41,8 +101,10 @@ async def create_post(
     """새로운 게시글을 생성합니다."""
     new_post = Post.model_validate(post_data, update={"owner_id": x_user_id})
     session.add(new_post)
+    await adjust_totals(session, ListCounter, x_user_id, 1)
     await session.commit()
     await session.refresh(new_post)
+    await post_cache.invalidate_lists()
     return new_post
 
 @app.get("/api/board/posts", response_model=PaginatedResponse)
@@ -51,83 +113,110 @@ async def list_posts(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     owner_id: Optional[int] = None,
+    after_id: Optional[int] = Query(None, ge=1, description="이전 응답의 next_after_id. 주면 page 대신 id 기준으로 이어서 읽습니다."),
 ):
-    """게시글 목록을 페이지네이션하여 반환합니다."""
-    offset = (page - 1) * size
-    
-    # 필터링 조건에 따라 전체 개수와 목록 쿼리를 준비합니다.
-    count_query = select(func.count(Post.id))
-    posts_query = select(Post).order_by(Post.id.desc())
-
-    if owner_id:
-        count_query = count_query.where(Post.owner_id == owner_id)
-        posts_query = posts_query.where(Post.owner_id == owner_id)
-
-    # 전체 개수를 먼저 조회합니다.
-    total_result = await session.exec(count_query)
-    total = total_result.one()
-
-    # 현재 페이지에 해당하는 목록을 조회합니다.
-    paginated_query = posts_query.offset(offset).limit(size)
-    posts_result = await session.exec(paginated_query)
-    posts = posts_result.all()
-
-    # User Service에 작성자 정보를 한 번에 문의합니다.
-    author_ids = {p.owner_id for p in posts}
-    authors = {}
-    if author_ids:
-        try:
-            async with httpx.AsyncClient() as client:
-                tasks = [client.get(f"{USER_SERVICE_URL}/api/users/{uid}") for uid in author_ids]
-                results = await asyncio.gather(*tasks)
-                for resp in results:
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        authors[data['id']] = data.get('username', 'Unknown')
-        except Exception as e:
-            print(f"Error fetching authors: {e}")
-
-    # 최종 응답 데이터를 조립합니다.
+    """게시글 목록을 페이지네이션하여 반환합니다. 작성자 이름까지 붙인 페이지를 캐시하고 조회수만 요청마다 합칩니다."""
+    async def load_page():
+        # 전체 개수는 매번 세지 않고 글 생성/삭제 때 갱신되는 카운터에서 읽습니다.
+        total = await get_total(session, ListCounter, owner_id)
+        posts, next_after_id = await fetch_page(session, Post, size, page, after_id, owner_id)
+
+        # User Service에 작성자 정보를 배치 조회 한 번으로 문의합니다.
+        authors = await fetch_authors(p.owner_id for p in posts)
+
+        # 최종 응답 데이터를 조립합니다.
+        items_with_details = []
+        for post in posts:
+            post_dict = post.model_dump(mode='json')
+            post_dict["author_username"] = authors.get(post.owner_id, {}).get("username", "Unknown")
+            items_with_details.append(post_dict)
+        return {"total": total, "items": items_with_details, "next_after_id": next_after_id}
+
+    cached = await post_cache.list_page(page, size, owner_id, after_id, load_page)
+    total = cached["total"]
+    return PaginatedResponse(
+        total=total, page=None if after_id is not None else page, size=size,
+        pages=math.ceil(total / size), items=[with_live_views(item) for item in cached["items"]],
+        next_after_id=cached["next_after_id"],
+    )
+
+@app.get("/api/board/search", response_model=PaginatedResponse)
+async def search_posts(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    q: str = Query(..., min_length=2, max_length=100, description="검색어 (2글자 이상)"),
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=100),
+    owner_id: Optional[int] = None,
+):
+    """제목과 본문에서 검색어와 관련도가 높은 게시글 순으로 반환합니다."""
+    total, results = await post_search.search(session, q.strip(), page, size, owner_id)
+    authors = await fetch_authors(post.owner_id for post, _ in results)
+
     items_with_details = []
-    for post in posts:
+    for post, score in results:
         post_dict = post.model_dump(mode='json')
-        post_dict["author_username"] = authors.get(post.owner_id, "Unknown")
+        post_dict["author_username"] = authors.get(post.owner_id, {}).get("username", "Unknown")
+        post_dict["score"] = score
         items_with_details.append(post_dict)
-        
+
     return PaginatedResponse(
         total=total, page=page, size=size,
-        pages=math.ceil(total / size), items=items_with_details
+        pages=math.ceil(total / size), items=items_with_details,
     )
 
+# /api/board/posts/{post_id}보다 먼저 선언해야 "trending"이 post_id로 해석되지 않습니다.
+@app.get("/api/board/posts/trending", response_model=List[dict])
+async def list_trending_posts(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    limit: int = Query(10, ge=1, le=50),
+):
+    """최근 조회가 많은 게시글을 점수 순으로 반환합니다. 순위는 Redis에서 정하고 MySQL은 기본 키로만 조회합니다."""
+    ranked = await trending_posts.top(limit)
+    if not ranked:
+        return []
+    result = await session.exec(select(Post).where(col(Post.id).in_([post_id for post_id, _ in ranked])))
+    posts = {post.id: post for post in result.all()}
+    authors = await fetch_authors(post.owner_id for post in posts.values())
+
+    items = []
+    for post_id, score in ranked:
+        post = posts.get(post_id)
+        if post is None:
+            # 삭제됐지만 점수가 남아 있는 게시글
+            continue
+        post_dict = with_live_views(post.model_dump(mode='json'))
+        post_dict["author_username"] = authors.get(post.owner_id, {}).get("username", "Unknown")
+        post_dict["trending_score"] = score
+        items.append(post_dict)
+    return items
+
 @app.get("/api/board/posts/{post_id}")
 async def get_post(
     post_id: int, 
     session: Annotated[AsyncSession, Depends(get_session)],
-    redis: Annotated[Redis, Depends(get_redis)],
 ):
-    """특정 게시글의 상세 정보와 함께, Redis로 조회수를 1 올리고 동기화 작업을 등록합니다."""
-    # Redis에서 해당 게시물의 조회수를 1 증가시킵니다.
-    redis_key = f"views:post:{post_id}"
-    view_count = await redis.incr(redis_key)
-    
-    # ▼▼▼ 동기화 작업 등록 로직 추가 ▼▼▼
-    # 'view_sync_queue'라는 작업 큐에 post_id를 현재 시간 점수와 함께 추가합니다.
-    await redis.zadd("view_sync_queue", {str(post_id): time.time()})
-    
-    post = await session.get(Post, post_id)
+    """특정 게시글의 상세 정보와 함께 조회수를 1 올립니다. 증가분은 모아서 Redis에 반영되고 워커가 MySQL로 옮깁니다."""
+    async def load_post():
+        post = await session.get(Post, post_id)
+        return post.model_dump(mode='json') if post else None
+
+    # 본문은 캐시에서 읽고, 조회수는 캐시하지 않고 요청마다 view_counter에서 가져옵니다.
+    post = await post_cache.post(post_id, load_post)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+
+    # 없는 게시글의 조회수 키가 생기지 않도록 게시글을 확인한 뒤에 기록합니다.
+    view_count = await view_counter.record(post_id)
     
     author_info = {}
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{USER_SERVICE_URL}/api/users/{post.owner_id}")
-            if resp.status_code == 200:
-                author_info = resp.json()
+        resp = await user_service_client.get(f"/api/users/{post['owner_id']}")
+        if resp.status_code == 200:
+            author_info = resp.json()
     except Exception:
         author_info = {"username": "Unknown"}
 
-    return {"post": post.model_dump(mode='json'), "author": author_info, "views": view_count}
+    return {"post": with_live_views(post), "author": author_info, "views": view_count}
 
 @app.patch("/api/board/posts/{post_id}", response_model=Post)
 async def update_post(
@@ -149,6 +238,7 @@ async def update_post(
     
     await session.commit()
     await session.refresh(db_post)
+    await post_cache.invalidate_post(post_id)
     return db_post
 
 @app.delete("/api/board/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -165,5 +255,8 @@ async def delete_post(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     await session.delete(db_post)
+    await adjust_totals(session, ListCounter, db_post.owner_id, -1)
     await session.commit()
+    await post_cache.invalidate_post(post_id)
+    await trending_posts.remove(post_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -7,7 +7,8 @@ class Post(SQLModel, table=True):
     title: str = Field(index=True)
     content: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    owner_id: int
+    # 작성자별 목록을 id 순으로 읽을 때 사용 (InnoDB 보조 인덱스는 기본 키를 포함합니다)
+    owner_id: int = Field(index=True)
     views: int = Field(default=0)
 
 class PostCreate(SQLModel):
@@ -17,3 +18,9 @@ class PostCreate(SQLModel):
 class PostUpdate(SQLModel):
     title: Optional[str] = None
     content: Optional[str] = None
+
+
+# 목록 전체/작성자별 글 개수 (pagination.py가 글 생성/삭제 때 갱신)
+class ListCounter(SQLModel, table=True):
+    name: str = Field(primary_key=True, max_length=64)
+    value: int = Field(default=0)
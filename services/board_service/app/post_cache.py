@@ -0,0 +1,202 @@
+import os
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional
+import redis.asyncio as redis
+from prometheus_client import Counter
+from redis_client import redis_client
+
+# Redis에 저장한 목록 페이지/게시글 본문의 만료 시간(초). 작성자 이름 변경은 이 시간 안에 반영됩니다.
+POST_CACHE_TTL_SECONDS = int(os.getenv("POST_CACHE_TTL_SECONDS", "60"))
+# 프로세스 안 LRU에 둘 항목 수와 만료 시간(초)
+POST_CACHE_LOCAL_MAX = int(os.getenv("POST_CACHE_LOCAL_MAX", "2000"))
+POST_CACHE_LOCAL_TTL = float(os.getenv("POST_CACHE_LOCAL_TTL", "10"))
+# 버전 값을 프로세스 안에 기억하는 시간(초). 다른 워커에서 글이 바뀌면 최대 이 시간 뒤에 반영됩니다.
+POST_CACHE_VERSION_TTL = float(os.getenv("POST_CACHE_VERSION_TTL", "1"))
+
+# 글이 생기거나, 고쳐지거나, 지워질 때마다 올리는 목록 전체의 버전
+LIST_VERSION_KEY = "board:cache:lists:version"
+
+CACHE_LOOKUPS = Counter("post_cache_lookups_total", "게시글 캐시 조회 결과", ["kind", "result"])
+
+# 캐시할 값을 DB에서 읽어 오는 함수. 없는 게시글이면 None을 반환하고, None은 캐시하지 않습니다.
+Loader = Callable[[], Awaitable[Optional[Any]]]
+
+
+def post_version_key(post_id: int) -> str:
+    return f"board:cache:post:{post_id}:version"
+
+
+class LocalLRU:
+    """만료 시간이 있는 프로세스 안 LRU입니다. 값은 여러 요청이 공유하므로 꺼낸 쪽에서 고치면 안 됩니다."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PostCache:
+    """게시글 목록 페이지와 본문을 프로세스 안 LRU -> Redis -> MySQL 순서로 읽는 캐시입니다.
+
+    캐시 키에 버전을 붙여 두고, 글이 바뀌면 키를 지우는 대신 버전만 INCR합니다.
+    - 목록: 목록 전체 버전 하나를 씁니다. 글 생성/수정/삭제 때 올라갑니다.
+    - 본문: 게시글마다 버전을 둡니다. 수정/삭제 때 올라갑니다.
+    옛 버전의 항목은 아무도 읽지 않게 되고 TTL이 지나면 사라집니다.
+    버전 값은 프로세스 안에 잠깐 기억하므로, 캐시를 읽을 때 Redis 왕복은 LRU에 없을 때만 생깁니다.
+    조회수는 자주 바뀌므로 캐시된 값 대신 호출한 쪽에서 view_counter 값을 합쳐서 씁니다.
+    Redis에 문제가 있으면 캐시 없이 DB에서 바로 읽습니다.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, local_max: int, local_ttl: float, version_ttl: float):
+        self.redis = client
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self._local = LocalLRU(local_max, local_ttl)
+        self._versions = LocalLRU(local_max, version_ttl)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def _count(self, kind: str, result: str):
+        if result == "local":
+            self.local_hits += 1
+        elif result == "redis":
+            self.redis_hits += 1
+        elif result == "miss":
+            self.misses += 1
+        else:
+            self.bypasses += 1
+        CACHE_LOOKUPS.labels(kind, result).inc()
+
+    async def _version(self, version_key: str) -> Optional[int]:
+        version = self._versions.get(version_key)
+        if version is not None:
+            return version
+        try:
+            value = await self.redis.get(version_key)
+        except redis.RedisError as e:
+            print(f"[post_cache] version read failed: {e!r}")
+            return None
+        version = int(value or 0)
+        self._versions.set(version_key, version)
+        return version
+
+    async def _get(self, kind: str, version_key: str, key: str, loader: Loader) -> Optional[Any]:
+        version = await self._version(version_key)
+        if version is None:
+            self._count(kind, "bypass")
+            return await loader()
+        key = f"{key}:v{version}"
+
+        value = self._local.get(key)
+        if value is not None:
+            self._count(kind, "local")
+            return value
+
+        try:
+            cached = await self.redis.get(key)
+        except redis.RedisError as e:
+            print(f"[post_cache] redis get failed: {e!r}")
+            self._count(kind, "bypass")
+            return await loader()
+        if cached is not None:
+            value = json.loads(cached)
+            self._local.set(key, value)
+            self._count(kind, "redis")
+            return value
+
+        self._count(kind, "miss")
+        value = await loader()
+        if value is None:
+            return None
+        self._local.set(key, value)
+        try:
+            await self.redis.set(key, json.dumps(value), ex=self.ttl)
+        except redis.RedisError as e:
+            print(f"[post_cache] redis set failed: {e!r}")
+        return value
+
+    async def list_page(
+        self,
+        page: int,
+        size: int,
+        owner_id: Optional[int],
+        after_id: Optional[int],
+        loader: Loader,
+    ) -> Optional[Any]:
+        """직렬화된 목록 페이지를 반환합니다. 캐시에 없으면 loader로 채웁니다."""
+        key = f"board:cache:list:{owner_id or ''}:{page}:{size}:{after_id or ''}"
+        return await self._get("list", LIST_VERSION_KEY, key, loader)
+
+    async def post(self, post_id: int, loader: Loader) -> Optional[Any]:
+        """직렬화된 게시글 본문을 반환합니다. 없는 게시글이면 None입니다."""
+        return await self._get("post", post_version_key(post_id), f"board:cache:post:{post_id}", loader)
+
+    async def _bump(self, version_keys: Iterable[str]):
+        """버전을 올립니다. 커밋한 뒤에 호출해야 새 버전으로 읽은 쪽이 바뀐 데이터를 봅니다."""
+        version_keys = list(version_keys)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for version_key in version_keys:
+                pipe.incr(version_key)
+            versions = await pipe.execute()
+        except redis.RedisError as e:
+            # 다른 워커는 옛 항목을 TTL 동안 계속 볼 수 있습니다.
+            print(f"[post_cache] version bump failed: {e!r}")
+            return
+        # 이 프로세스는 다음 요청부터 바로 새 버전을 씁니다.
+        for version_key, version in zip(version_keys, versions):
+            self._versions.set(version_key, int(version))
+
+    async def invalidate_lists(self):
+        """새 글이 생겼을 때 호출합니다."""
+        await self._bump([LIST_VERSION_KEY])
+
+    async def invalidate_post(self, post_id: int):
+        """글이 수정되거나 삭제됐을 때 호출합니다. 목록에도 제목 등이 보이므로 함께 무효화합니다."""
+        await self._bump([post_version_key(post_id), LIST_VERSION_KEY])
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.redis_hits + self.misses + self.bypasses
+        return {
+            "ttl": self.ttl,
+            "version_ttl": self.version_ttl,
+            "local_entries": len(self._local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_ratio": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+post_cache = PostCache(
+    redis_client,
+    ttl=POST_CACHE_TTL_SECONDS,
+    local_max=POST_CACHE_LOCAL_MAX,
+    local_ttl=POST_CACHE_LOCAL_TTL,
+    version_ttl=POST_CACHE_VERSION_TTL,
+)
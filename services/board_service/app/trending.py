@@ -0,0 +1,100 @@
+import os
+import asyncio
+import time
+from typing import List, Optional, Tuple
+from redis_client import redis_client
+
+# 인기 글 점수: 조회 1회마다 2^((t - T0) / 반감기)를 더합니다.
+# 모든 점수를 매번 줄이는 대신 새 조회의 가중치를 키우는 방식이라, 반감기만큼 지난 조회는 새 조회의 절반 가치가 됩니다.
+TRENDING_KEY = "trending:posts"
+# 가중치의 기준 시각 T0 (초). 비어 있으면 첫 조회 때 정해집니다.
+TRENDING_EPOCH_KEY = "trending:epoch"
+TRENDING_HALF_LIFE_SECONDS = float(os.getenv("TRENDING_HALF_LIFE_SECONDS", str(6 * 3600)))
+# 점수 상위 몇 개만 남길지
+TRENDING_MAX_SIZE = int(os.getenv("TRENDING_MAX_SIZE", "1000"))
+TRENDING_TRIM_INTERVAL = float(os.getenv("TRENDING_TRIM_INTERVAL", "60"))
+# 가중치가 2^이 값을 넘으면 모든 점수를 줄이고 T0를 현재로 옮깁니다. (double 정밀도 안에서 충분히 여유 있는 값)
+TRENDING_REBASE_EXPONENT = float(os.getenv("TRENDING_REBASE_EXPONENT", "32"))
+
+# 조회수 반영 스크립트(view_counter.py) 앞부분에 붙이는 Lua 코드.
+# KEYS[2]: 인기 글 sorted set, KEYS[3]: T0, ARGV[1]: 현재 시각, ARGV[3]: 반감기
+# 스크립트 안에서 T0를 읽으므로 재기준화와 동시에 실행돼도 점수가 어긋나지 않습니다.
+TRENDING_WEIGHT_LUA = """
+local now = tonumber(ARGV[1])
+local epoch = tonumber(redis.call('GET', KEYS[3]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[3], epoch)
+end
+local trending_weight = math.pow(2, (now - epoch) / tonumber(ARGV[3]))
+"""
+
+# KEYS[1]: 인기 글 sorted set, KEYS[2]: T0, ARGV[1]: 현재 시각, ARGV[2]: 반감기, ARGV[3]: 남길 개수, ARGV[4]: 재기준화 지수
+# 상위 N개만 남기고, 가중치가 너무 커졌으면 모든 점수에 2^-지수를 곱한 뒤 T0를 현재 시각으로 옮깁니다.
+MAINTAIN_SCRIPT = """
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[3]) + 1))
+local epoch = tonumber(redis.call('GET', KEYS[2]))
+if not epoch then
+    return 0
+end
+local exponent = (tonumber(ARGV[1]) - epoch) / tonumber(ARGV[2])
+if exponent < tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', math.pow(2, -exponent))
+redis.call('SET', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+class TrendingPosts:
+    """조회 시각에 따라 가중치를 준 인기 글 점수를 Redis sorted set으로 관리합니다.
+
+    점수는 조회수 반영 스크립트가 함께 올리고, 이 클래스는 상위 N개 조회와 주기적인 정리(크기 제한, 재기준화)를 맡습니다.
+    """
+
+    def __init__(self, client, trim_interval: float = TRENDING_TRIM_INTERVAL):
+        self.client = client
+        self.trim_interval = trim_interval
+        self._maintain = client.register_script(MAINTAIN_SCRIPT)
+        self._task: Optional[asyncio.Task] = None
+        self.rebases = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.trim_interval)
+            try:
+                await self.maintain()
+            except Exception as e:
+                print(f"[trending] maintenance failed: {e!r}")
+
+    async def maintain(self):
+        rebased = await self._maintain(
+            keys=[TRENDING_KEY, TRENDING_EPOCH_KEY],
+            args=[time.time(), TRENDING_HALF_LIFE_SECONDS, TRENDING_MAX_SIZE, TRENDING_REBASE_EXPONENT],
+        )
+        if rebased:
+            self.rebases += 1
+
+    async def top(self, limit: int) -> List[Tuple[int, float]]:
+        entries = await self.client.zrevrange(TRENDING_KEY, 0, limit - 1, withscores=True)
+        return [(int(post_id), score) for post_id, score in entries]
+
+    async def remove(self, post_id: int):
+        await self.client.zrem(TRENDING_KEY, post_id)
+
+
+trending_posts = TrendingPosts(redis_client)
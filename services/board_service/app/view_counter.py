@@ -0,0 +1,279 @@
+import os
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from prometheus_client import Counter, Histogram
+from redis_client import redis_client
+from trending import TRENDING_KEY, TRENDING_EPOCH_KEY, TRENDING_HALF_LIFE_SECONDS, TRENDING_WEIGHT_LUA
+
+# 조회수 증가분을 모아서 Redis에 반영하는 주기(초)
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "0.2"))
+# 마지막으로 알고 있는 Redis 조회수를 기억해 둘 게시글 수
+VIEW_KNOWN_MAX = int(os.getenv("VIEW_KNOWN_MAX", "10000"))
+# 다른 워커의 조회가 반영되지 않은 값을 이 시간(초)보다 오래 쓰지 않습니다. 지나면 다음 조회 때 Redis 값을 다시 읽습니다.
+VIEW_KNOWN_TTL = float(os.getenv("VIEW_KNOWN_TTL", "5"))
+# Redis 호출이 실패하면 이 시간(초) 동안은 바로 반영하지 않고 증가분으로만 모읍니다.
+VIEW_RETRY_AFTER = float(os.getenv("VIEW_RETRY_AFTER", "1"))
+
+# queue: 조회된 게시글 ID를 sorted set 큐에 넣고 워커가 주기적으로 꺼냅니다 (기본값).
+# stream: 반영할 때마다 Redis Stream에 이벤트를 남기고, 여러 워커가 consumer group으로 나눠 처리합니다.
+VIEW_SYNC_MODE = os.getenv("VIEW_SYNC_MODE", "queue")
+# 워커(worker.py)가 MySQL로 옮길 게시글 ID 큐. score는 아직 동기화되지 않은 첫 조회 시각입니다.
+VIEW_SYNC_QUEUE = "view_sync_queue"
+VIEW_EVENT_STREAM = "views:events"
+# 처리가 끝난 이벤트는 워커가 ACK한 뒤 지웁니다(worker.py의 trim_acked). 이 값은 그와 별개인 비상용 길이 상한(근사)이고,
+# 0(기본값)이면 두지 않습니다. 상한을 두면 워커가 오래 멈췄을 때 ACK되지 않은 이벤트도 잘려서
+# 그 게시글의 DB 조회수는 다음 조회가 있을 때까지 맞춰지지 않습니다.
+VIEW_STREAM_MAXLEN = int(os.getenv("VIEW_STREAM_MAXLEN", "0"))
+# 반영한 배치 ID를 Redis에 기억하는 시간(초). 응답을 받지 못한 배치는 이 시간의 절반 안에서만 같은 ID로 다시 보내고,
+# 그 뒤에는 두 번 반영될 수 있으므로 버립니다.
+VIEW_FLUSH_DEDUPE_TTL = int(os.getenv("VIEW_FLUSH_DEDUPE_TTL", "600"))
+
+
+def view_key(post_id: int) -> str:
+    return f"views:post:{post_id}"
+
+
+# 두 스크립트 공통 인자
+# KEYS[1]: 동기화 큐 또는 이벤트 스트림, KEYS[2]: 인기 글 sorted set, KEYS[3]: 인기 글 T0, KEYS[4]: 배치 ID 키
+# ARGV[1]: 현재 시각, ARGV[2]: 스트림 길이 상한, ARGV[3]: 인기 글 반감기, ARGV[4]: 배치 ID 키 TTL,
+# ARGV[5..]: post_id, 증가분 쌍
+# 게시글마다 INCRBY하고 인기 글 점수를 올린 뒤, 반영된 뒤의 조회수를 순서대로 돌려줍니다.
+
+# 응답만 잃어버린 배치를 다시 보내도 한 번만 반영되도록, 이미 본 배치 ID면 더하지 않고 현재 조회수만 돌려줍니다.
+APPLY_ONCE_LUA = """
+if not redis.call('SET', KEYS[4], 1, 'NX', 'EX', ARGV[4]) then
+    local current = {}
+    for i = 5, #ARGV, 2 do
+        current[#current + 1] = tonumber(redis.call('GET', 'views:post:' .. ARGV[i]) or 0)
+    end
+    return current
+end
+"""
+
+# 큐에 넣습니다. ZADD NX이므로 이미 큐에 있는 게시글의 대기 시작 시각은 바뀌지 않습니다.
+FLUSH_SCRIPT = APPLY_ONCE_LUA + TRENDING_WEIGHT_LUA + """
+local totals = {}
+for i = 5, #ARGV, 2 do
+    local post_id = ARGV[i]
+    totals[#totals + 1] = redis.call('INCRBY', 'views:post:' .. post_id, ARGV[i + 1])
+    redis.call('ZINCRBY', KEYS[2], tonumber(ARGV[i + 1]) * trending_weight, post_id)
+    redis.call('ZADD', KEYS[1], 'NX', ARGV[1], post_id)
+end
+return totals
+"""
+
+# 반영한 게시글 ID들을 이벤트 하나로 남깁니다. 워커는 ID만 보고 Redis의 현재 값을 MySQL에 씁니다.
+STREAM_FLUSH_SCRIPT = APPLY_ONCE_LUA + TRENDING_WEIGHT_LUA + """
+local totals = {}
+local post_ids = {}
+for i = 5, #ARGV, 2 do
+    totals[#totals + 1] = redis.call('INCRBY', 'views:post:' .. ARGV[i], ARGV[i + 1])
+    redis.call('ZINCRBY', KEYS[2], tonumber(ARGV[i + 1]) * trending_weight, ARGV[i])
+    post_ids[#post_ids + 1] = ARGV[i]
+end
+if tonumber(ARGV[2]) > 0 then
+    redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'posts', table.concat(post_ids, ','))
+else
+    redis.call('XADD', KEYS[1], '*', 'posts', table.concat(post_ids, ','))
+end
+return totals
+"""
+
+VIEWS_RECORDED = Counter("views_recorded_total", "기록한 게시글 조회 수")
+VIEW_FLUSHES = Counter("view_flushes_total", "Redis에 조회수 증가분을 반영한 횟수", ["result"])
+VIEWS_DROPPED = Counter("views_dropped_total", "반영됐는지 확인하지 못한 채 재시도 기한이 지나 버린 조회 수")
+VIEW_FLUSH_BATCH = Histogram(
+    "view_flush_batch_posts", "한 번에 반영한 게시글 수", buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+
+
+class ViewCounter:
+    """게시글 조회수를 프로세스 안에서 모았다가 짧은 주기로 한 번에 Redis에 반영합니다.
+
+    조회 요청마다 INCR + ZADD 두 번 왕복하던 것을, 주기마다 Lua 스크립트 한 번으로 줄입니다.
+    같은 스크립트에서 인기 글 점수(trending.py)도 함께 올립니다.
+    인기 글에 조회가 몰려도 워커마다 주기당 INCRBY 한 번만 보내므로 한 키에 쓰기가 몰리지 않습니다.
+    호출한 쪽에는 마지막으로 반영된 Redis 값 + 아직 반영하지 않은 증가분을 돌려줍니다.
+
+    배치마다 ID를 붙여 보내고, 타임아웃 등으로 응답을 받지 못하면 같은 ID로 다시 보냅니다.
+    스크립트가 이미 반영한 배치 ID는 건너뛰므로 조회수와 인기 글 점수가 두 번 올라가지 않습니다.
+    """
+
+    def __init__(
+        self,
+        client,
+        flush_interval: float = VIEW_FLUSH_INTERVAL,
+        known_max: int = VIEW_KNOWN_MAX,
+        known_ttl: float = VIEW_KNOWN_TTL,
+        mode: str = VIEW_SYNC_MODE,
+    ):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.known_max = known_max
+        self.known_ttl = known_ttl
+        self.mode = mode
+        self._script = client.register_script(STREAM_FLUSH_SCRIPT if mode == "stream" else FLUSH_SCRIPT)
+        self._pending: Dict[int, int] = {}
+        # 배치 ID -> (증가분, 처음 보낸 시각). 보내는 중이거나 반영됐다는 응답을 아직 받지 못한 배치입니다.
+        # 현재 조회수 계산에 포함하고, 다음 주기에 같은 ID로 다시 보냅니다.
+        self._flushing: Dict[str, Tuple[Dict[int, int], float]] = {}
+        self._flush_lock = asyncio.Lock()
+        # post_id -> (마지막으로 반영된 Redis 조회수, 읽은 시각)
+        self._known: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+        self._first_views: Dict[int, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._direct_disabled_until = 0.0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    async def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """주기 작업을 멈추고 남은 증가분을 마지막으로 반영합니다."""
+        if self._task is not None:
+            # 보내는 도중에 취소하면 증가분이 두 번 반영되거나 사라질 수 있어서, 취소 대신 멈추라고 알리고 기다립니다.
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def _remember(self, post_id: int, total: int):
+        self._known[post_id] = (total, time.monotonic())
+        self._known.move_to_end(post_id)
+        if len(self._known) > self.known_max:
+            self._known.popitem(last=False)
+
+    def _is_fresh(self, post_id: int) -> bool:
+        known = self._known.get(post_id)
+        return known is not None and time.monotonic() - known[1] < self.known_ttl
+
+    def _live(self, post_id: int) -> int:
+        known = self._known.get(post_id)
+        flushing = sum(increments.get(post_id, 0) for increments, _ in self._flushing.values())
+        return (known[0] if known else 0) + flushing + self._pending.get(post_id, 0)
+
+    def _add_pending(self, post_id: int, delta: int = 1):
+        self._pending[post_id] = self._pending.get(post_id, 0) + delta
+
+    async def record(self, post_id: int) -> int:
+        """조회 1회를 기록하고 현재 조회수(근사값)를 반환합니다."""
+        VIEWS_RECORDED.inc()
+        if self._is_fresh(post_id) or time.monotonic() < self._direct_disabled_until:
+            self._add_pending(post_id)
+            return self._live(post_id)
+
+        # 처음 보거나 오래된 게시글은 이 조회를 바로 반영하면서 Redis의 현재 값을 읽어 옵니다.
+        # 같은 게시글에 이런 조회가 동시에 여러 개 오면 하나만 Redis에 보내고 나머지는 증가분으로 모읍니다.
+        waiting = self._first_views.get(post_id)
+        if waiting is not None:
+            self._add_pending(post_id)
+            await asyncio.shield(waiting)
+            return self._live(post_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._first_views[post_id] = future
+        batch_id = secrets.token_hex(8)
+        started = time.monotonic()
+        try:
+            (total,) = await self._apply(batch_id, {post_id: 1})
+            self._remember(post_id, int(total))
+        except Exception as e:
+            # Redis 장애로 조회 요청이 실패하지 않게 합니다. 반영됐는지 모르므로 같은 배치 ID로 다음 주기에 다시 보냅니다.
+            print(f"[views] direct increment failed for post {post_id}: {e!r}")
+            self._direct_disabled_until = time.monotonic() + VIEW_RETRY_AFTER
+            self._flushing[batch_id] = ({post_id: 1}, started)
+        finally:
+            del self._first_views[post_id]
+            future.set_result(None)
+        return self._live(post_id)
+
+    async def _apply(self, batch_id: str, increments: Dict[int, int]):
+        key = VIEW_EVENT_STREAM if self.mode == "stream" else VIEW_SYNC_QUEUE
+        args = [time.time(), VIEW_STREAM_MAXLEN, TRENDING_HALF_LIFE_SECONDS, VIEW_FLUSH_DEDUPE_TTL]
+        for post_id, delta in increments.items():
+            args.extend((post_id, delta))
+        keys = [key, TRENDING_KEY, TRENDING_EPOCH_KEY, f"views:flush:{batch_id}"]
+        return await self._script(keys=keys, args=args)
+
+    def current(self, post_id: int) -> Optional[int]:
+        """조회를 기록하지 않고 이 프로세스가 알고 있는 현재 조회수를 반환합니다. 모르면 None입니다."""
+        if post_id in self._known or post_id in self._pending:
+            return self._live(post_id)
+        if any(post_id in increments for increments, _ in self._flushing.values()):
+            return self._live(post_id)
+        return None
+
+    async def _send(self, batch_id: str, increments: Dict[int, int]) -> bool:
+        """배치 하나를 보냅니다. 실패하면 _flushing에 남겨 두고 False를 반환합니다."""
+        try:
+            totals = await self._apply(batch_id, increments)
+        except Exception as e:
+            self.failures += 1
+            VIEW_FLUSHES.labels("error").inc()
+            print(f"[views] flush of {len(increments)} posts failed: {e!r}")
+            return False
+        del self._flushing[batch_id]
+        self.flushes += 1
+        VIEW_FLUSHES.labels("ok").inc()
+        VIEW_FLUSH_BATCH.observe(len(increments))
+        for post_id, total in zip(increments, totals):
+            self._remember(post_id, int(total))
+        return True
+
+    async def flush(self):
+        """모아 둔 증가분을 Lua 스크립트 한 번으로 반영합니다.
+
+        응답을 받지 못한 배치가 있으면 먼저 같은 ID로 다시 보내고, 그동안 새 증가분은 _pending에 계속 모읍니다.
+        재시도 기한(VIEW_FLUSH_DEDUPE_TTL의 절반)이 지난 배치는 두 번 반영될 수 있으므로 버리고 메트릭으로 셉니다.
+        """
+        if self._flush_lock.locked():
+            return
+        async with self._flush_lock:
+            now = time.monotonic()
+            for batch_id, (increments, started) in list(self._flushing.items()):
+                if now - started >= VIEW_FLUSH_DEDUPE_TTL / 2:
+                    del self._flushing[batch_id]
+                    views = sum(increments.values())
+                    self.dropped += views
+                    VIEWS_DROPPED.inc(views)
+                    VIEW_FLUSHES.labels("dropped").inc()
+                    print(f"[views] dropped unconfirmed batch of {views} views after {now - started:.0f}s")
+                elif not await self._send(batch_id, increments):
+                    return
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            batch_id = secrets.token_hex(8)
+            self._flushing[batch_id] = (batch, time.monotonic())
+            await self._send(batch_id, batch)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "flush_interval": self.flush_interval,
+            "pending_posts": len(self._pending),
+            "pending_views": sum(self._pending.values()),
+            "known_posts": len(self._known),
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "unconfirmed_batches": len(self._flushing),
+            "dropped_views": self.dropped,
+        }
+
+
+view_counter = ViewCounter(redis_client)
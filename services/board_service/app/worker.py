@@ -1,74 +1,282 @@
 import asyncio
 import os
+import time
+import socket
+from typing import Iterable, List, Optional, Tuple
 from dotenv import load_dotenv
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlmodel import select
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from sqlalchemy import bindparam, case, update
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine
-import redis.asyncio as redis
 
 # models.py에서 Post 모델을 가져옵니다.
 from models import Post
+# 서비스와 같은 풀 설정/메트릭을 쓰는 엔진과 Redis 클라이언트
+from database import engine
+from redis_client import redis_client
+from view_counter import VIEW_SYNC_MODE, VIEW_SYNC_QUEUE, VIEW_EVENT_STREAM, view_key
 
 # 환경 변수 로드
 load_dotenv()
 
-# 워커를 위한 별도의 DB 및 Redis 연결 설정
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_async_engine(DATABASE_URL)
-REDIS_URL = os.getenv("REDIS_URL")
-redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+# 한 번에 큐에서 꺼내 MySQL에 쓰는 게시글 수
+VIEW_SYNC_CHUNK_SIZE = int(os.getenv("VIEW_SYNC_CHUNK_SIZE", "500"))
+# queue 모드에서 큐를 비우는 주기(초)
+VIEW_SYNC_INTERVAL = float(os.getenv("VIEW_SYNC_INTERVAL", "60"))
+# stream 모드 설정: 모아 둔 이벤트를 MySQL에 쓰는 주기(초), 한 번에 읽는 이벤트 수,
+# 이 시간(ms) 넘게 ACK되지 않은 이벤트는 죽은 워커의 것으로 보고 가져옵니다.
+VIEW_STREAM_GROUP = os.getenv("VIEW_STREAM_GROUP", "view-sync")
+VIEW_STREAM_FLUSH_INTERVAL = float(os.getenv("VIEW_STREAM_FLUSH_INTERVAL", "1"))
+VIEW_STREAM_BATCH = int(os.getenv("VIEW_STREAM_BATCH", "1000"))
+VIEW_STREAM_CLAIM_IDLE_MS = int(os.getenv("VIEW_STREAM_CLAIM_IDLE_MS", "30000"))
+# consumer group 안에서 워커를 구분하는 이름. 호스트 이름(컨테이너마다 다름)을 쓰므로
+# 재시작해도 같은 이름으로 자기 미처리 이벤트를 이어받고, group에 consumer가 계속 늘어나지 않습니다.
+WORKER_NAME = os.getenv("WORKER_NAME") or socket.gethostname()
+# 미처리 이벤트가 없고 이 시간(ms) 넘게 조용한 consumer는 없어진 워커(예: 재배포 전 컨테이너)로 보고 group에서 지웁니다.
+VIEW_STREAM_CONSUMER_IDLE_MS = int(os.getenv("VIEW_STREAM_CONSUMER_IDLE_MS", str(3600 * 1000)))
+# ACK까지 끝난 이벤트를 스트림에서 지우는 주기(초)
+VIEW_STREAM_TRIM_INTERVAL = float(os.getenv("VIEW_STREAM_TRIM_INTERVAL", "10"))
+# 워커 메트릭(/metrics)을 내보내는 포트
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9102"))
+
+SYNC_POSTS = Counter("view_sync_posts_total", "MySQL에 조회수를 반영한 게시글 수")
+SYNC_FAILURES = Counter("view_sync_failures_total", "실패해서 큐에 되돌린 청크 수")
+SYNC_CYCLE_SECONDS = Histogram(
+    "view_sync_cycle_seconds", "동기화 한 주기에 걸린 시간", buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+SYNC_THROUGHPUT = Gauge("view_sync_posts_per_second", "마지막 동기화 주기의 처리량")
+SYNC_LAG = Gauge("view_sync_lag_seconds", "마지막 주기에 처리한 가장 오래된 항목이 큐에서 기다린 시간")
+SYNC_EVENTS = Counter("view_sync_events_total", "처리하고 ACK한 조회 이벤트 수")
+SYNC_CLAIMED = Counter("view_sync_claimed_total", "다른 워커에게서 가져온 미처리 이벤트 수")
+SYNC_QUEUE_LENGTH = Gauge("view_sync_queue_length", "동기화를 기다리는 게시글 수")
+SYNC_TRIMMED = Counter("view_sync_events_trimmed_total", "ACK까지 끝나 스트림에서 지운 이벤트 수")
+SYNC_CONSUMERS_REMOVED = Counter("view_sync_consumers_removed_total", "group에서 지운 없어진 워커(consumer) 수")
+
+# 조회수는 늘기만 하므로, 늦게 도착한 작은 값이 이미 반영된 큰 값을 덮어쓰지 않게 합니다.
+UPDATE_VIEWS = (
+    update(Post.__table__)
+    .where(Post.__table__.c.id == bindparam("post_id"))
+    .values(views=case(
+        (Post.__table__.c.views < bindparam("views"), bindparam("views")),
+        else_=Post.__table__.c.views,
+    ))
+)
+
+
+async def write_views(post_ids: Iterable[int]) -> int:
+    """게시글들의 Redis 조회수를 MGET 한 번으로 읽어 executemany UPDATE 한 번으로 씁니다.
+
+    항상 Redis의 현재 값을 쓰므로 같은 게시글을 여러 번 처리해도 결과가 같습니다.
+    """
+    post_ids = list(post_ids)
+    values = await redis_client.mget([view_key(post_id) for post_id in post_ids])
+    rows = [
+        {"post_id": post_id, "views": int(value)}
+        for post_id, value in zip(post_ids, values) if value is not None
+    ]
+    if rows:
+        async with AsyncSession(engine) as session:
+            connection = await session.connection()
+            await connection.execute(UPDATE_VIEWS, rows)
+            await session.commit()
+    return len(rows)
+
+
+async def sync_chunk(entries: List[Tuple[str, float]]) -> int:
+    """ZPOPMIN으로 꺼낸 청크 하나를 MGET 한 번과 executemany UPDATE 한 번으로 반영합니다.
+
+    실패하면 원래 score로 큐에 되돌립니다. ZADD LT라서 그 사이 새 조회로 다시 들어온 항목은 더 오래된 시각을 유지합니다.
+    """
+    try:
+        return await write_views(int(member) for member, _ in entries)
+    except Exception:
+        SYNC_FAILURES.inc()
+        await redis_client.zadd(VIEW_SYNC_QUEUE, dict(entries), lt=True)
+        raise
+
 
 async def sync_redis_to_mysql():
     """
-    1분마다 실행되며, Redis의 조회수를 MySQL에 동기화하는 메인 함수입니다.
+    queue 모드에서 VIEW_SYNC_INTERVAL(기본 1분)마다 실행되며, Redis의 조회수를 MySQL에 동기화하는 메인 함수입니다.
+
+    큐를 통째로 읽고 나중에 지우는 대신 ZPOPMIN으로 청크씩 꺼내므로, 동기화 중에 새로 들어온 게시글은 큐에 남아 다음 청크/주기에 처리됩니다.
     """
-    print("--- [Worker] 조회수 동기화 작업 시작 ---")
-    
-    # 1. 'view_sync_queue'에서 처리해야 할 모든 게시물 ID를 가져옵니다.
-    post_ids_to_sync = await redis_client.zrange("view_sync_queue", 0, -1)
-    if not post_ids_to_sync:
-        print("--- [Worker] 동기화할 게시물이 없습니다. ---")
-        return
+    started = time.perf_counter()
+    synced = 0
+    oldest = None
+    try:
+        while True:
+            entries = await redis_client.zpopmin(VIEW_SYNC_QUEUE, VIEW_SYNC_CHUNK_SIZE)
+            if not entries:
+                break
+            if oldest is None:
+                oldest = entries[0][1]
+            synced += await sync_chunk(entries)
+            if len(entries) < VIEW_SYNC_CHUNK_SIZE:
+                break
+    except Exception as e:
+        print(f"--- [Worker] 동기화 중 오류 발생: {e!r} (처리 중이던 청크는 큐에 되돌렸습니다) ---")
+    finally:
+        elapsed = time.perf_counter() - started
+        SYNC_POSTS.inc(synced)
+        SYNC_CYCLE_SECONDS.observe(elapsed)
+        SYNC_THROUGHPUT.set(synced / elapsed if elapsed > 0 else 0)
+        SYNC_LAG.set(time.time() - oldest if oldest is not None else 0)
+        try:
+            SYNC_QUEUE_LENGTH.set(await redis_client.zcard(VIEW_SYNC_QUEUE))
+        except Exception:
+            pass
+    if synced:
+        print(f"--- [Worker] {synced}개 게시글 조회수 동기화 완료 ({elapsed:.3f}s) ---")
+
+
+def _entry_time(entry_id: str) -> float:
+    # 스트림 ID는 "{ms}-{seq}" 형식이라 이벤트가 기록된 시각을 알 수 있습니다.
+    return int(entry_id.split("-", 1)[0]) / 1000
 
-    async with AsyncSession(engine) as session:
-        for post_id_str in post_ids_to_sync:
-            try:
-                post_id = int(post_id_str)
-                
-                # 2. Redis에서 해당 게시물의 최종 조회수를 가져옵니다.
-                redis_key = f"views:post:{post_id}"
-                view_count = await redis_client.get(redis_key)
-                if view_count is None:
-                    continue
-
-                # 3. MySQL에서 해당 게시물을 찾습니다.
-                db_post = await session.get(Post, post_id)
-                
-                if db_post:
-                    # 4. MySQL의 views 컬럼을 Redis의 값으로 업데이트합니다.
-                    db_post.views = int(view_count)
-                    session.add(db_post) # 세션에 변경사항 등록
-                    print(f"--- [Worker] Post ID: {post_id}, 조회수: {view_count}로 DB 업데이트 준비 ---")
-            except Exception as e:
-                print(f"--- [Worker] 동기화 중 오류 발생 (Post ID: {post_id_str}): {e} ---")
 
-        # 5. 모든 변경사항을 DB에 한 번에 커밋합니다.
-        await session.commit()
-        print("--- [Worker] DB 동기화 완료 ---")
+def _entry_order(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
 
-    # 6. 처리된 작업들을 큐에서 제거합니다.
-    await redis_client.zrem("view_sync_queue", *post_ids_to_sync)
-    print(f"--- [Worker] {len(post_ids_to_sync)}개 작업 큐에서 제거 ---")
+
+class StreamSyncer:
+    """views:events 스트림을 consumer group으로 읽어 MySQL에 반영합니다.
+
+    이벤트는 워커들에게 나눠 전달되므로 워커를 늘린 만큼 처리량이 늘어납니다.
+    VIEW_STREAM_FLUSH_INTERVAL 동안(또는 VIEW_STREAM_BATCH개가 찰 때까지) 모은 게시글 ID를 한 번에 쓰고 나서 ACK합니다.
+    쓰기 전에 워커가 죽으면 ACK되지 않은 이벤트를 다른 워커가 XAUTOCLAIM으로 가져가 다시 처리합니다.
+    쓰는 값은 이벤트 내용이 아니라 Redis의 현재 조회수라서 같은 이벤트를 두 번 처리해도 괜찮습니다.
+    ACK까지 끝난 이벤트는 trim_acked()가 주기적으로 스트림에서 지웁니다.
+    """
+
+    def __init__(self, consumer: str = WORKER_NAME):
+        self.consumer = consumer
+        self._next_claim = 0.0
+        self._next_trim = 0.0
+
+    async def ensure_group(self):
+        try:
+            await redis_client.xgroup_create(VIEW_EVENT_STREAM, VIEW_STREAM_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def claim_stale(self) -> list:
+        """오래 ACK되지 않은 이벤트를 가져옵니다. 자기 것도 포함되므로 재시작 전에 처리하지 못한 이벤트도 다시 처리됩니다."""
+        if time.monotonic() < self._next_claim:
+            return []
+        self._next_claim = time.monotonic() + VIEW_STREAM_CLAIM_IDLE_MS / 2000
+        claimed = []
+        start = "0-0"
+        while True:
+            result = await redis_client.xautoclaim(
+                VIEW_EVENT_STREAM, VIEW_STREAM_GROUP, self.consumer,
+                min_idle_time=VIEW_STREAM_CLAIM_IDLE_MS, start_id=start, count=VIEW_STREAM_BATCH,
+            )
+            start, entries = result[0], result[1]
+            # 길이 상한으로 이미 지워진 이벤트는 내용이 없습니다.
+            claimed.extend(entry for entry in entries if entry and entry[1])
+            if start == "0-0" or len(claimed) >= VIEW_STREAM_BATCH:
+                break
+        if claimed:
+            SYNC_CLAIMED.inc(len(claimed))
+        await self.remove_idle_consumers()
+        return claimed
+
+    async def remove_idle_consumers(self):
+        """미처리 이벤트가 없고 오래 조용한 consumer를 group에서 지워 XINFO/XPENDING 결과가 끝없이 늘지 않게 합니다.
+
+        미처리 이벤트가 있는 consumer는 지우지 않습니다. (DELCONSUMER는 그 이벤트들을 다시 가져갈 수 없게 만듭니다.)
+        """
+        for consumer in await redis_client.xinfo_consumers(VIEW_EVENT_STREAM, VIEW_STREAM_GROUP):
+            if consumer["name"] == self.consumer or consumer["pending"] or consumer["idle"] < VIEW_STREAM_CONSUMER_IDLE_MS:
+                continue
+            await redis_client.xgroup_delconsumer(VIEW_EVENT_STREAM, VIEW_STREAM_GROUP, consumer["name"])
+            SYNC_CONSUMERS_REMOVED.inc()
+            print(f"--- [Worker] 사용하지 않는 consumer {consumer['name']}를 group에서 지웠습니다 ---")
+
+    async def trim_acked(self):
+        """모든 group이 ACK까지 끝낸 이벤트만 스트림에서 지웁니다.
+
+        group마다 가장 오래된 미처리 이벤트(없으면 마지막으로 전달한 이벤트)보다 앞선 이벤트만 지우므로,
+        아직 전달되지 않았거나 ACK되지 않은 이벤트는 워커가 얼마나 밀려 있든 남습니다.
+        """
+        if time.monotonic() < self._next_trim:
+            return
+        self._next_trim = time.monotonic() + VIEW_STREAM_TRIM_INTERVAL
+        keep_from: Optional[str] = None
+        for group in await redis_client.xinfo_groups(VIEW_EVENT_STREAM):
+            oldest = group["last-delivered-id"]
+            if group["pending"]:
+                oldest = (await redis_client.xpending(VIEW_EVENT_STREAM, group["name"]))["min"]
+            if keep_from is None or _entry_order(oldest) < _entry_order(keep_from):
+                keep_from = oldest
+        if keep_from is None or keep_from == "0-0":
+            return
+        trimmed = await redis_client.xtrim(VIEW_EVENT_STREAM, minid=keep_from, approximate=False)
+        SYNC_TRIMMED.inc(trimmed)
+
+    async def read_batch(self) -> list:
+        entries = await self.claim_stale()
+        deadline = time.monotonic() + VIEW_STREAM_FLUSH_INTERVAL
+        while len(entries) < VIEW_STREAM_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            response = await redis_client.xreadgroup(
+                VIEW_STREAM_GROUP, self.consumer, {VIEW_EVENT_STREAM: ">"},
+                count=VIEW_STREAM_BATCH - len(entries), block=max(1, int(remaining * 1000)),
+            )
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+        return entries
+
+    async def process(self, entries: list):
+        started = time.perf_counter()
+        post_ids = {int(post_id) for _, fields in entries for post_id in fields["posts"].split(",") if post_id}
+        synced = await write_views(post_ids)
+        await redis_client.xack(VIEW_EVENT_STREAM, VIEW_STREAM_GROUP, *(entry_id for entry_id, _ in entries))
+        elapsed = time.perf_counter() - started
+        SYNC_EVENTS.inc(len(entries))
+        SYNC_POSTS.inc(synced)
+        SYNC_CYCLE_SECONDS.observe(elapsed)
+        SYNC_THROUGHPUT.set(synced / elapsed if elapsed > 0 else 0)
+        SYNC_LAG.set(time.time() - min(_entry_time(entry_id) for entry_id, _ in entries))
+
+    async def run(self):
+        await self.ensure_group()
+        print(f"--- [Worker] stream 모드 시작 (consumer={self.consumer}, flush={VIEW_STREAM_FLUSH_INTERVAL}s) ---")
+        while True:
+            try:
+                entries = await self.read_batch()
+                if entries:
+                    await self.process(entries)
+                await self.trim_acked()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # ACK하지 않은 이벤트는 VIEW_STREAM_CLAIM_IDLE_MS 뒤에 다시 가져옵니다.
+                SYNC_FAILURES.inc()
+                print(f"--- [Worker] 스트림 처리 중 오류 발생: {e!r} ---")
+                await asyncio.sleep(1)
 
 
 async def main():
+    start_http_server(WORKER_METRICS_PORT)
+    if VIEW_SYNC_MODE == "stream":
+        # queue 모드에서 넘어왔을 때 큐에 남은 게시글부터 처리합니다.
+        await sync_redis_to_mysql()
+        await StreamSyncer().run()
+        return
+
     scheduler = AsyncIOScheduler()
-    # 1분마다 sync_redis_to_mysql 함수를 실행하도록 스케줄을 등록합니다.
-    scheduler.add_job(sync_redis_to_mysql, 'interval', minutes=1)
+    # VIEW_SYNC_INTERVAL(기본 1분)마다 sync_redis_to_mysql 함수를 실행하도록 스케줄을 등록합니다.
+    # 앞 주기가 끝나지 않았으면 겹쳐서 실행하지 않습니다.
+    scheduler.add_job(sync_redis_to_mysql, 'interval', seconds=VIEW_SYNC_INTERVAL, max_instances=1, coalesce=True)
     scheduler.start()
-    print("--- [Worker] 백그라운드 워커 시작. 1분마다 조회수를 동기화합니다. (Ctrl+C로 종료) ---")
-    
+    print(f"--- [Worker] 백그라운드 워커 시작. {VIEW_SYNC_INTERVAL:g}초마다 조회수를 동기화합니다. (Ctrl+C로 종료) ---")
+
     try:
         # 워커가 계속 실행되도록 무한 루프를 유지합니다.
         while True:
@@ -0,0 +1,103 @@
+"""게시글 조회수 기록 방식별 처리량 비교 (워커 프로세스 하나 기준)
+
+- legacy: 조회마다 INCR + ZADD (기존 get_post 방식, Redis 왕복 2번)
+- buffered: view_counter.ViewCounter (프로세스 안에서 모았다가 주기마다 Lua 스크립트 한 번)
+
+실제 데이터와 섞이지 않도록 큰 게시글 ID 범위를 쓰고, 끝나면 그 범위의 키만 지웁니다.
+
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/bench_views.py --duration 10 --concurrency 64
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+
+from redis_client import redis_client  # noqa: E402
+from view_counter import ViewCounter, VIEW_SYNC_QUEUE, view_key  # noqa: E402
+
+
+def make_picker(posts: int, first_id: int, skew: float):
+    # 인기 글에 조회가 몰리는 상황을 흉내 내기 위해 Zipf 분포로 게시글을 고릅니다.
+    weights = [1 / (rank ** skew) for rank in range(1, posts + 1)]
+    ids = list(range(first_id, first_id + posts))
+    return lambda: random.choices(ids, weights)[0]
+
+
+async def legacy_view(post_id: int):
+    await redis_client.incr(view_key(post_id))
+    await redis_client.zadd(VIEW_SYNC_QUEUE, {str(post_id): time.time()})
+
+
+async def run(name: str, view, pick, duration: float, concurrency: int):
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await view(pick())
+            latencies.append(time.perf_counter() - started)
+            # 실제 요청 처리처럼 이벤트 루프에 양보해서 주기 작업(flush)도 돌 수 있게 합니다.
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+    print(f"{name:>9}: {len(latencies) / elapsed:10.0f} views/s   p99 {p99:6.2f} ms   ({len(latencies)} views)")
+    return len(latencies)
+
+
+async def total_views(post_ids) -> int:
+    values = await redis_client.mget([view_key(post_id) for post_id in post_ids])
+    return sum(int(value) for value in values if value is not None)
+
+
+async def cleanup(post_ids):
+    await redis_client.delete(*(view_key(post_id) for post_id in post_ids))
+    await redis_client.zrem(VIEW_SYNC_QUEUE, *post_ids)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="방식별 측정 시간(초)")
+    parser.add_argument("--concurrency", type=int, default=64, help="동시에 조회하는 코루틴 수")
+    parser.add_argument("--posts", type=int, default=1000, help="조회 대상 게시글 수")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf 지수. 클수록 인기 글에 몰립니다")
+    parser.add_argument("--first-id", type=int, default=900_000_000, help="벤치마크용 게시글 ID 시작값")
+    parser.add_argument("--flush-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    post_ids = list(range(args.first_id, args.first_id + args.posts))
+    pick = make_picker(args.posts, args.first_id, args.skew)
+    print(f"redis={os.environ['REDIS_URL']} posts={args.posts} skew={args.skew} concurrency={args.concurrency}")
+
+    await cleanup(post_ids)
+    try:
+        legacy_count = await run("legacy", legacy_view, pick, args.duration, args.concurrency)
+        assert await total_views(post_ids) == legacy_count
+        await cleanup(post_ids)
+
+        counter = ViewCounter(redis_client, flush_interval=args.flush_interval)
+        await counter.start()
+        buffered_count = await run("buffered", counter.record, pick, args.duration, args.concurrency)
+        await counter.stop()
+        # 종료할 때 남은 증가분까지 반영되어 한 건도 빠지지 않아야 합니다.
+        stored = await total_views(post_ids)
+        print(f"buffered: {counter.flushes} flushes, {stored}/{buffered_count} views stored")
+        assert stored == buffered_count
+        print(f"speedup: {buffered_count / max(legacy_count, 1):.1f}x")
+    finally:
+        await cleanup(post_ids)
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
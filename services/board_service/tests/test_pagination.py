@@ -0,0 +1,77 @@
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import ListCounter, Post
+from pagination import adjust_totals, get_total, reconcile_totals
+
+
+async def _engine_with_posts(owner_ids):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        for owner_id in owner_ids:
+            session.add(Post(title="t", content="c", owner_id=owner_id))
+            await adjust_totals(session, ListCounter, owner_id, 1)
+        await session.commit()
+    return engine
+
+
+async def _counters(engine) -> dict:
+    async with AsyncSession(engine) as session:
+        return dict((await session.exec(select(ListCounter.name, ListCounter.value))).all())
+
+
+def test_adjust_totals_increments_all_and_owner_counters():
+    async def go():
+        engine = await _engine_with_posts([1, 1, 2])
+        async with AsyncSession(engine) as session:
+            assert await get_total(session, ListCounter) == 3
+            assert await get_total(session, ListCounter, 1) == 2
+            assert await get_total(session, ListCounter, 3) == 0
+            await adjust_totals(session, ListCounter, 1, -1)
+            await session.commit()
+        assert await _counters(engine) == {"all": 2, "owner:1": 1, "owner:2": 1}
+
+    asyncio.run(go())
+
+
+def test_reconcile_leaves_correct_counters_alone():
+    async def go():
+        engine = await _engine_with_posts([1, 1, 2])
+        assert await reconcile_totals(engine, Post, ListCounter) == 0
+        assert await _counters(engine) == {"all": 3, "owner:1": 2, "owner:2": 1}
+
+    asyncio.run(go())
+
+
+def test_reconcile_fixes_drifted_missing_and_orphaned_counters():
+    async def go():
+        engine = await _engine_with_posts([1, 1, 2])
+        async with AsyncSession(engine) as session:
+            # owner:1은 어긋나고, owner:3은 카운터 없이 글만 있고, owner:9는 글 없이 카운터만 남은 상태
+            session.add(Post(title="t", content="c", owner_id=3))
+            await session.execute(
+                ListCounter.__table__.update().where(ListCounter.name == "owner:1").values(value=5)
+            )
+            session.add(ListCounter(name="owner:9", value=4))
+            await session.commit()
+
+        assert await reconcile_totals(engine, Post, ListCounter) == 4
+        assert await _counters(engine) == {"all": 4, "owner:1": 2, "owner:2": 1, "owner:3": 1, "owner:9": 0}
+
+    asyncio.run(go())
+
+
+def test_reconcile_fixes_all_counter_alone():
+    async def go():
+        engine = await _engine_with_posts([1, 2])
+        async with AsyncSession(engine) as session:
+            await session.execute(ListCounter.__table__.update().where(ListCounter.name == "all").values(value=7))
+            await session.commit()
+
+        assert await reconcile_totals(engine, Post, ListCounter) == 1
+        assert (await _counters(engine))["all"] == 2
+
+    asyncio.run(go())
@@ -0,0 +1,83 @@
+import asyncio
+import fakeredis
+import redis.asyncio as redis
+from post_cache import PostCache
+
+
+def _cache(client, version_ttl: float = 60) -> PostCache:
+    return PostCache(client, ttl=60, local_max=100, local_ttl=60, version_ttl=version_ttl)
+
+
+class CountingLoader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_list_page_is_loaded_once_until_invalidated():
+    async def go():
+        cache = _cache(fakeredis.FakeAsyncRedis(decode_responses=True))
+        loader = CountingLoader({"items": [1]})
+        for _ in range(3):
+            assert await cache.list_page(1, 10, None, None, loader) == {"items": [1]}
+        assert loader.calls == 1
+
+        await cache.invalidate_lists()
+        await cache.list_page(1, 10, None, None, loader)
+        assert loader.calls == 2
+
+    asyncio.run(go())
+
+
+def test_post_invalidation_also_refreshes_lists_on_other_workers():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        writer = _cache(client)
+        # 다른 워커는 버전을 프로세스 안에 기억하지 않아야 바로 바뀐 버전을 봅니다.
+        reader = _cache(client, version_ttl=0)
+        list_loader = CountingLoader({"items": ["old title"]})
+        post_loader = CountingLoader({"title": "old title"})
+        await reader.list_page(1, 10, None, None, list_loader)
+        await reader.post(1, post_loader)
+        # 두 번째 읽기부터는 Redis에서 읽습니다.
+        await reader.list_page(1, 10, None, None, list_loader)
+        await reader.post(1, post_loader)
+        assert (list_loader.calls, post_loader.calls) == (1, 1)
+
+        await writer.invalidate_post(1)
+        await reader.list_page(1, 10, None, None, list_loader)
+        await reader.post(1, post_loader)
+        assert (list_loader.calls, post_loader.calls) == (2, 2)
+
+    asyncio.run(go())
+
+
+def test_missing_post_is_not_cached():
+    async def go():
+        cache = _cache(fakeredis.FakeAsyncRedis(decode_responses=True))
+        loader = CountingLoader(None)
+        assert await cache.post(1, loader) is None
+        assert await cache.post(1, loader) is None
+        assert loader.calls == 2
+
+    asyncio.run(go())
+
+
+def test_redis_failure_falls_back_to_loader():
+    class DownRedis(fakeredis.FakeAsyncRedis):
+        async def get(self, *args, **kwargs):
+            raise redis.ConnectionError("down")
+
+    async def go():
+        cache = _cache(DownRedis(decode_responses=True))
+        loader = CountingLoader({"items": []})
+        assert await cache.list_page(1, 10, None, None, loader) == {"items": []}
+        assert await cache.list_page(1, 10, None, None, loader) == {"items": []}
+        assert loader.calls == 2
+        assert cache.stats()["bypasses"] == 2
+
+    asyncio.run(go())
@@ -0,0 +1,38 @@
+import asyncio
+import time
+import fakeredis
+import trending
+from trending import TRENDING_EPOCH_KEY, TRENDING_HALF_LIFE_SECONDS, TRENDING_KEY, TrendingPosts
+
+
+def test_maintain_keeps_only_top_posts(monkeypatch):
+    monkeypatch.setattr(trending, "TRENDING_MAX_SIZE", 2)
+
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        posts = TrendingPosts(client)
+        await client.set(TRENDING_EPOCH_KEY, time.time())
+        await client.zadd(TRENDING_KEY, {"1": 1.0, "2": 5.0, "3": 3.0})
+        await posts.maintain()
+        assert await posts.top(10) == [(2, 5.0), (3, 3.0)]
+        assert posts.rebases == 0
+
+    asyncio.run(go())
+
+
+def test_maintain_rebases_scores_when_weight_grows_too_large():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        posts = TrendingPosts(client)
+        # T0가 40 반감기 전이라 재기준화 지수(32)를 넘었습니다.
+        await client.set(TRENDING_EPOCH_KEY, time.time() - 40 * TRENDING_HALF_LIFE_SECONDS)
+        await client.zadd(TRENDING_KEY, {"1": 2.0 ** 41, "2": 2.0 ** 40})
+        await posts.maintain()
+
+        assert posts.rebases == 1
+        top = await posts.top(10)
+        assert [post_id for post_id, _ in top] == [1, 2]
+        assert 1.9 < top[0][1] < 2.1 and 0.9 < top[1][1] < 1.1
+        assert abs(float(await client.get(TRENDING_EPOCH_KEY)) - time.time()) < 5
+
+    asyncio.run(go())
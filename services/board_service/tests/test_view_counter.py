@@ -0,0 +1,142 @@
+import asyncio
+import fakeredis
+import redis.asyncio as redis
+import view_counter
+from trending import TRENDING_KEY
+from view_counter import VIEW_EVENT_STREAM, VIEW_SYNC_QUEUE, ViewCounter, view_key
+
+
+class FlakyScript:
+    """실제 스크립트를 감싸서, 실행 전에 끊기거나(before) 실행 뒤 응답만 잃어버리는(after) 상황을 만듭니다."""
+
+    def __init__(self, script, fail: str):
+        self.script = script
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        if self.fail == "before":
+            raise redis.ConnectionError("connection refused")
+        result = await self.script(keys=keys, args=args)
+        if self.fail == "after":
+            raise redis.TimeoutError("reply lost")
+        return result
+
+
+def _counter(client) -> ViewCounter:
+    counter = ViewCounter(client, mode="queue")
+    # 첫 조회도 바로 보내지 않고 증가분으로 모읍니다.
+    counter._direct_disabled_until = float("inf")
+    return counter
+
+
+def test_flush_applies_pending_views_once():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        counter = _counter(client)
+        for _ in range(3):
+            await counter.record(1)
+        await counter.record(2)
+        await counter.flush()
+
+        assert await client.get(view_key(1)) == "3"
+        assert await client.get(view_key(2)) == "1"
+        assert set(await client.zrange(VIEW_SYNC_QUEUE, 0, -1)) == {"1", "2"}
+        assert counter.current(1) == 3
+        assert counter.stats()["unconfirmed_batches"] == 0
+
+    asyncio.run(go())
+
+
+def test_lost_reply_is_retried_without_double_counting():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        counter = _counter(client)
+        real_script = counter._script
+        counter._script = FlakyScript(real_script, "after")
+        for _ in range(2):
+            await counter.record(1)
+        await counter.flush()
+
+        # 스크립트는 실행됐지만 응답을 못 받았으므로 반영 여부를 모르는 배치로 남습니다.
+        assert await client.get(view_key(1)) == "2"
+        assert counter.current(1) == 2
+        score = await client.zscore(TRENDING_KEY, "1")
+
+        await counter.record(1)
+        counter._script = real_script
+        await counter.flush()
+        # 재시도한 배치는 건너뛰고, 그동안 모인 1회만 더해집니다.
+        assert await client.get(view_key(1)) == "3"
+        assert counter.current(1) == 3
+        assert await client.zscore(TRENDING_KEY, "1") < score * 2
+        assert counter.stats()["unconfirmed_batches"] == 0
+
+    asyncio.run(go())
+
+
+def test_failed_send_is_retried():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        counter = _counter(client)
+        real_script = counter._script
+        counter._script = FlakyScript(real_script, "before")
+        await counter.record(1)
+        await counter.flush()
+        assert await client.get(view_key(1)) is None
+        assert counter.current(1) == 1
+
+        counter._script = real_script
+        await counter.flush()
+        assert await client.get(view_key(1)) == "1"
+
+    asyncio.run(go())
+
+
+def test_direct_increment_with_lost_reply_is_not_applied_twice():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        counter = ViewCounter(client, mode="queue")
+        real_script = counter._script
+        counter._script = FlakyScript(real_script, "after")
+        assert await counter.record(1) == 1
+
+        counter._script = real_script
+        await counter.flush()
+        assert await client.get(view_key(1)) == "1"
+        assert counter.current(1) == 1
+
+    asyncio.run(go())
+
+
+def test_unconfirmed_batch_is_dropped_after_retry_window(monkeypatch):
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        counter = _counter(client)
+        counter._script = FlakyScript(counter._script, "before")
+        await counter.record(1)
+        await counter.flush()
+
+        monkeypatch.setattr(view_counter, "VIEW_FLUSH_DEDUPE_TTL", 0)
+        await counter.flush()
+        assert counter.stats()["unconfirmed_batches"] == 0
+        assert counter.stats()["dropped_views"] == 1
+        assert counter.current(1) is None
+
+    asyncio.run(go())
+
+
+def test_stream_flush_records_one_event_per_batch():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        counter = ViewCounter(client, mode="stream")
+        counter._direct_disabled_until = float("inf")
+        await counter.record(1)
+        await counter.record(2)
+        await counter.flush()
+
+        (entry,) = await client.xrange(VIEW_EVENT_STREAM)
+        assert entry[1] == {"posts": "1,2"}
+
+    asyncio.run(go())
@@ -0,0 +1,144 @@
+import asyncio
+import fakeredis
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+import worker
+from models import Post
+from view_counter import VIEW_EVENT_STREAM, VIEW_SYNC_QUEUE, view_key
+
+
+@pytest.fixture
+def env(monkeypatch):
+    """워커가 쓰는 Redis와 DB 엔진을 fakeredis와 메모리 sqlite로 바꿉니다."""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    monkeypatch.setattr(worker, "redis_client", client)
+    monkeypatch.setattr(worker, "engine", engine)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            for views in (10, 3, 0, 0, 0):
+                session.add(Post(title="t", content="c", owner_id=1, views=views))
+            await session.commit()
+
+    asyncio.run(setup())
+    return client, engine
+
+
+async def _views(engine) -> dict:
+    async with AsyncSession(engine) as session:
+        return dict((await session.exec(select(Post.id, Post.views))).all())
+
+
+def test_write_views_never_lowers_stored_views(env):
+    client, engine = env
+
+    async def go():
+        # 1번은 늦게 도착한 작은 값, 2번은 새 값, 3번은 Redis에 값이 없습니다.
+        await client.mset({view_key(1): 5, view_key(2): 7})
+        assert await worker.write_views([1, 2, 3]) == 2
+        views = await _views(engine)
+        assert (views[1], views[2], views[3]) == (10, 7, 0)
+
+    asyncio.run(go())
+
+
+def test_failed_chunk_is_requeued_with_its_older_score(env, monkeypatch):
+    client, _ = env
+
+    async def broken_write(post_ids):
+        list(post_ids)
+        raise RuntimeError("db down")
+
+    async def go():
+        # 청크를 꺼낸 사이에 새 조회로 1번이 더 늦은 시각으로 다시 들어왔습니다.
+        await client.zadd(VIEW_SYNC_QUEUE, {"1": 200.0})
+        monkeypatch.setattr(worker, "write_views", broken_write)
+        with pytest.raises(RuntimeError):
+            await worker.sync_chunk([("1", 100.0), ("2", 150.0)])
+        assert await client.zrange(VIEW_SYNC_QUEUE, 0, -1, withscores=True) == [("1", 100.0), ("2", 150.0)]
+
+    asyncio.run(go())
+
+
+def test_sync_drains_queue_in_chunks(env, monkeypatch):
+    client, engine = env
+    monkeypatch.setattr(worker, "VIEW_SYNC_CHUNK_SIZE", 2)
+
+    async def go():
+        for post_id in range(1, 6):
+            await client.set(view_key(post_id), 20 + post_id)
+            await client.zadd(VIEW_SYNC_QUEUE, {str(post_id): float(post_id)})
+        await worker.sync_redis_to_mysql()
+        assert await client.zcard(VIEW_SYNC_QUEUE) == 0
+        assert await _views(engine) == {post_id: 20 + post_id for post_id in range(1, 6)}
+
+    asyncio.run(go())
+
+
+def test_stream_events_are_written_then_acked(env, monkeypatch):
+    client, engine = env
+    monkeypatch.setattr(worker, "VIEW_STREAM_FLUSH_INTERVAL", 0.05)
+
+    async def go():
+        syncer = worker.StreamSyncer("test-worker")
+        await syncer.ensure_group()
+        await client.set(view_key(4), 9)
+        await client.set(view_key(5), 11)
+        await client.xadd(VIEW_EVENT_STREAM, {"posts": "4,5"})
+        await client.xadd(VIEW_EVENT_STREAM, {"posts": "5"})
+
+        entries = await syncer.read_batch()
+        assert len(entries) == 2
+        await syncer.process(entries)
+        views = await _views(engine)
+        assert (views[4], views[5]) == (9, 11)
+        pending = await client.xpending(VIEW_EVENT_STREAM, worker.VIEW_STREAM_GROUP)
+        assert pending["pending"] == 0
+
+    asyncio.run(go())
+
+
+def test_trim_keeps_undelivered_and_unacked_events(env):
+    client, _ = env
+
+    async def go():
+        syncer = worker.StreamSyncer("test-worker")
+        await syncer.ensure_group()
+        ids = [await client.xadd(VIEW_EVENT_STREAM, {"posts": str(post_id)}) for post_id in range(1, 6)]
+        await client.xreadgroup(worker.VIEW_STREAM_GROUP, "test-worker", {VIEW_EVENT_STREAM: ">"}, count=3)
+        await client.xack(VIEW_EVENT_STREAM, worker.VIEW_STREAM_GROUP, ids[0])
+
+        await syncer.trim_acked()
+        # ACK되지 않은 두 번째/세 번째와 아직 전달되지 않은 네 번째/다섯 번째는 남습니다.
+        assert [entry_id for entry_id, _ in await client.xrange(VIEW_EVENT_STREAM)] == ids[1:]
+
+        await client.xack(VIEW_EVENT_STREAM, worker.VIEW_STREAM_GROUP, ids[1], ids[2])
+        syncer._next_trim = 0
+        await syncer.trim_acked()
+        assert [entry_id for entry_id, _ in await client.xrange(VIEW_EVENT_STREAM)] == ids[2:]
+
+    asyncio.run(go())
+
+
+def test_idle_consumers_without_pending_events_are_removed(env, monkeypatch):
+    client, _ = env
+    monkeypatch.setattr(worker, "VIEW_STREAM_CONSUMER_IDLE_MS", 0)
+
+    async def go():
+        syncer = worker.StreamSyncer("test-worker")
+        await syncer.ensure_group()
+        await client.xadd(VIEW_EVENT_STREAM, {"posts": "1"})
+        await client.xreadgroup(worker.VIEW_STREAM_GROUP, "busy", {VIEW_EVENT_STREAM: ">"})
+        await client.xreadgroup(worker.VIEW_STREAM_GROUP, "gone", {VIEW_EVENT_STREAM: ">"})
+        await client.xreadgroup(worker.VIEW_STREAM_GROUP, "test-worker", {VIEW_EVENT_STREAM: ">"})
+
+        await syncer.remove_idle_consumers()
+        consumers = await client.xinfo_consumers(VIEW_EVENT_STREAM, worker.VIEW_STREAM_GROUP)
+        assert sorted(consumer["name"] for consumer in consumers) == ["busy", "test-worker"]
+
+    asyncio.run(go())
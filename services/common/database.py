@@ -0,0 +1,128 @@
+import os
+import time
+from dotenv import load_dotenv
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import exc, inspect
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# create_async_engine과 AsyncEngine은 sqlalchemy.ext.asyncio에서 직접 가져옵니다.
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# --- 커넥션 풀 설정 (환경 변수로 조정 가능) ---
+# 풀은 uvicorn 워커 프로세스마다 따로 생기므로, DB_CONNECTION_BUDGET(이 서비스가 쓸 수 있는 전체 연결 수)을 주면
+# 워커 수(WEB_CONCURRENCY)로 나눠서 기본 풀 크기를 정합니다. DB_POOL_SIZE를 직접 주면 그 값을 씁니다.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "0"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+_budget_pool_size = DB_CONNECTION_BUDGET // WEB_CONCURRENCY - DB_MAX_OVERFLOW if DB_CONNECTION_BUDGET else 10
+if _budget_pool_size < 1 and "DB_POOL_SIZE" not in os.environ:
+    # 풀 크기는 최소 1이어야 하므로, 이 경우 실제 최대 연결 수가 예산을 넘습니다.
+    print(
+        f"[db] DB_CONNECTION_BUDGET={DB_CONNECTION_BUDGET} is too small for WEB_CONCURRENCY={WEB_CONCURRENCY} "
+        f"and DB_MAX_OVERFLOW={DB_MAX_OVERFLOW}; using pool_size=1, up to "
+        f"{(1 + DB_MAX_OVERFLOW) * WEB_CONCURRENCY} connections"
+    )
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(max(1, _budget_pool_size))))
+# 풀이 가득 찼을 때 연결을 기다리는 최대 시간(초). 넘으면 sqlalchemy.exc.TimeoutError가 발생합니다.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# MySQL wait_timeout(기본 8시간)이나 중간 프록시가 끊기 전에 연결을 새로 만듭니다.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# 연결을 꺼낼 때 가볍게 확인해서, 끊긴 연결로 요청이 실패하는 대신 새 연결로 바꿉니다.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# 컴파일된 SQL 문을 재사용하는 캐시 크기 (SQLAlchemy 기본값 500)
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
+
+POOL_WAIT = Histogram(
+    "db_pool_checkout_seconds", "커넥션 풀에서 연결을 얻는 데 걸린 시간 (대기 + 새 연결 생성)",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+POOL_EXHAUSTED = Counter("db_pool_exhausted_total", "풀과 overflow가 모두 사용 중이어서 연결 반납을 기다린 횟수")
+POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "DB_POOL_TIMEOUT 안에 연결을 얻지 못한 횟수")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "사용 중인 DB 연결 수")
+POOL_OVERFLOW = Gauge("db_pool_overflow", "pool_size를 넘어 추가로 만든 DB 연결 수")
+POOL_SIZE = Gauge("db_pool_size", "설정된 커넥션 풀 크기")
+# /stats 엔드포인트용 누적 횟수. dispose()로 풀이 다시 만들어져도 유지됩니다.
+_pool_events = {"exhausted": 0, "timeouts": 0}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """연결을 꺼내는 데 걸린 시간과 풀 고갈 횟수를 기록하는 커넥션 풀입니다.
+
+    풀이 고갈되면 요청이 이유 없이 느려진 것처럼 보이므로, 대기 시간을 메트릭으로 드러냅니다.
+    """
+
+    def _do_get(self):
+        exhausted = self._pool.qsize() == 0 and self._overflow >= self._max_overflow
+        if exhausted:
+            _pool_events["exhausted"] += 1
+            POOL_EXHAUSTED.inc()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            _pool_events["timeouts"] += 1
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+
+# 타입 힌트를 위해 AsyncEngine 사용
+engine: AsyncEngine = create_async_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedPool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+)
+
+# 풀은 dispose() 때 새로 만들어지므로 engine.pool을 매번 다시 읽습니다.
+POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout())
+POOL_OVERFLOW.set_function(lambda: max(0, engine.pool.overflow()))
+POOL_SIZE.set(DB_POOL_SIZE)
+
+
+def pool_stats() -> dict:
+    """현재 풀 상태와 고갈/타임아웃 누적 횟수를 반환합니다."""
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "timeout": DB_POOL_TIMEOUT,
+        "recycle": DB_POOL_RECYCLE,
+        "pre_ping": DB_POOL_PRE_PING,
+        "exhausted_total": _pool_events["exhausted"],
+        "timeouts_total": _pool_events["timeouts"],
+    }
+
+
+def _create_missing_indexes(sync_conn):
+    """create_all은 이미 있는 테이블에 나중에 선언한 인덱스를 추가하지 않으므로, 빠진 인덱스만 따로 만듭니다."""
+    inspector = inspect(sync_conn)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                print(f"[database] creating missing index {index.name}")
+                index.create(sync_conn)
+
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+
+async def get_session():
+    async with AsyncSession(engine) as session:
+        yield session
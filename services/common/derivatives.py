@@ -0,0 +1,173 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Type
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel, select, col
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow가 없으면 파생 이미지를 만들지 않고 원본을 그대로 사용합니다.
+    Image = None
+
+# 파생 이미지 이름 -> 긴 변의 최대 픽셀 (환경 변수로 조정 가능)
+DERIVATIVE_VARIANTS: Dict[str, int] = {
+    "thumb": int(os.getenv("DERIVATIVE_THUMB_SIZE", "320")),
+    "medium": int(os.getenv("DERIVATIVE_MEDIUM_SIZE", "1024")),
+}
+DERIVATIVE_QUALITY = int(os.getenv("DERIVATIVE_QUALITY", "80"))
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+
+# (파생 이미지 이름, 파일 이름, 너비, 높이)
+RenderedVariant = Tuple[str, str, int, int]
+
+
+def render_variants(directory: str, source_filename: str, variants: Dict[str, int], quality: int) -> List[RenderedVariant]:
+    """원본 이미지에서 크기별 파생 이미지를 만듭니다. 프로세스 풀에서 실행됩니다.
+
+    원본 이름이 내용의 해시이므로 파생 이미지 이름도 그대로 정해지고, 이미 있는 파일은 다시 만들지 않습니다.
+    WebP를 지원하면 WebP로, 아니면 JPEG로 저장합니다.
+    """
+    stem = os.path.splitext(source_filename)[0]
+    use_webp = features.check("webp")
+    extension, image_format = (".webp", "WEBP") if use_webp else (".jpg", "JPEG")
+    rendered = []
+    with Image.open(os.path.join(directory, source_filename)) as source:
+        # 휴대폰 사진의 EXIF 회전 정보를 반영하고, 애니메이션 GIF는 첫 프레임만 사용합니다.
+        image = ImageOps.exif_transpose(source)
+        # WebP는 투명도를 유지하고, JPEG는 RGB만 저장할 수 있습니다.
+        target_mode = "RGBA" if use_webp and "A" in image.getbands() else "RGB"
+        if image.mode != target_mode:
+            image = image.convert(target_mode)
+        for name, max_size in variants.items():
+            filename = f"{stem}_{name}{extension}"
+            path = os.path.join(directory, filename)
+            variant = image.copy()
+            # thumbnail()은 비율을 유지하고 원본보다 크게 늘리지 않습니다.
+            variant.thumbnail((max_size, max_size), Image.LANCZOS)
+            if not os.path.exists(path):
+                tmp_path = f"{path}.tmp"
+                variant.save(tmp_path, image_format, quality=quality)
+                os.replace(tmp_path, path)
+            rendered.append((name, filename, variant.width, variant.height))
+    return rendered
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class DerivativePipeline:
+    """업로드된 원본 이미지의 썸네일/중간 크기 이미지를 백그라운드에서 만드는 파이프라인입니다.
+
+    이미지 처리는 CPU를 많이 쓰므로 요청을 처리하는 이벤트 루프가 아니라 별도 프로세스 풀에서 실행하고,
+    결과는 서비스의 파생 이미지 테이블(model: source_filename, variant, filename, width, height)에
+    원본 파일 이름 기준으로 기록합니다.
+    같은 내용의 원본은 파일 하나를 공유하므로 파생 이미지도 한 번만 만들어집니다.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        model: Type[SQLModel],
+        directory: str,
+        url_prefix: str,
+        workers: int = DERIVATIVE_WORKERS,
+    ):
+        self.engine = engine
+        self.model = model
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks = set()
+        self._running = set()
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, source_filename: str, on_ready: Optional[Callable[[str], Awaitable[None]]] = None):
+        """응답을 기다리게 하지 않고 파생 이미지 생성을 예약합니다. 끝나면 on_ready(원본 파일 이름)를 호출합니다."""
+        if not self.enabled or source_filename in self._running:
+            return
+        self._running.add(source_filename)
+        task = asyncio.create_task(self._process(source_filename, on_ready))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, source_filename: str, on_ready):
+        try:
+            async with AsyncSession(self.engine) as session:
+                existing = await session.exec(
+                    select(self.model.variant).where(self.model.source_filename == source_filename)
+                )
+                if set(existing.all()) >= set(DERIVATIVE_VARIANTS):
+                    return
+                rendered = await asyncio.get_running_loop().run_in_executor(
+                    self._get_executor(), render_variants,
+                    self.directory, source_filename, DERIVATIVE_VARIANTS, DERIVATIVE_QUALITY,
+                )
+                for variant, filename, width, height in rendered:
+                    session.add(self.model(
+                        source_filename=source_filename, variant=variant, filename=filename, width=width, height=height,
+                    ))
+                try:
+                    await session.commit()
+                except IntegrityError:
+                    # 다른 워커가 같은 원본을 먼저 기록했습니다.
+                    await session.rollback()
+            if on_ready is not None:
+                await on_ready(source_filename)
+        except Exception as e:
+            print(f"[derivatives] failed for {source_filename}: {e!r}")
+        finally:
+            self._running.discard(source_filename)
+
+    async def backfill(self, source_filenames: Iterable[str], on_ready=None):
+        """파생 이미지가 아직 없는 원본을 다시 예약합니다. 재시작 전에 끝나지 못한 작업을 복구할 때 씁니다."""
+        if not self.enabled:
+            return
+        filenames = set(filter(None, source_filenames))
+        if not filenames:
+            return
+        async with AsyncSession(self.engine) as session:
+            done = await session.exec(
+                select(self.model.source_filename).where(col(self.model.source_filename).in_(filenames)).distinct()
+            )
+            done = set(done.all())
+        for filename in filenames - done:
+            if os.path.exists(os.path.join(self.directory, filename)):
+                self.submit(filename, on_ready)
+
+    async def variant_urls(self, session: AsyncSession, source_filenames: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """원본 파일 이름 -> {파생 이미지 이름: URL}. 아직 만들어지지 않은 원본은 결과에 없습니다."""
+        filenames = set(filter(None, source_filenames))
+        if not filenames:
+            return {}
+        result = await session.exec(select(self.model).where(col(self.model.source_filename).in_(filenames)))
+        urls: Dict[str, Dict[str, str]] = {}
+        for derivative in result.all():
+            urls.setdefault(derivative.source_filename, {})[derivative.variant] = f"{self.url_prefix}/{derivative.filename}"
+        return urls
+
+    async def delete_variants(self, session: AsyncSession, source_filename: str):
+        """원본을 지울 때 파생 이미지 파일과 기록도 함께 지웁니다. 커밋은 호출한 쪽에서 합니다."""
+        result = await session.exec(select(self.model).where(self.model.source_filename == source_filename))
+        for derivative in result.all():
+            await asyncio.to_thread(_remove_quietly, os.path.join(self.directory, derivative.filename))
+            await session.delete(derivative)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,53 @@
+import os
+from typing import Dict, Iterable
+import httpx
+from dotenv import load_dotenv
+from metrics import httpx_event_hooks
+from tracing import traced_transport
+
+load_dotenv()
+
+USER_SERVICE_URL = os.getenv("USER_SERVICE_URL")
+# 이보다 많은 ID는 URL이 길어지지 않도록 POST /api/users/batch로 조회합니다.
+USER_BATCH_GET_MAX = int(os.getenv("USER_BATCH_GET_MAX", "50"))
+
+
+# 요청마다 AsyncClient를 새로 만들면 매번 TCP 연결을 새로 맺어야 하므로,
+# 프로세스 전체에서 keep-alive 커넥션 풀을 하나 공유합니다.
+user_service_client = httpx.AsyncClient(
+    base_url=USER_SERVICE_URL,
+    timeout=httpx.Timeout(5.0, connect=2.0),
+    transport=traced_transport(
+        httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("USER_SERVICE_POOL_SIZE", "50")),
+                max_keepalive_connections=int(os.getenv("USER_SERVICE_POOL_KEEPALIVE", "20")),
+                keepalive_expiry=float(os.getenv("USER_SERVICE_KEEPALIVE_EXPIRY", "30")),
+            ),
+        ),
+        "user_service",
+    ),
+    event_hooks=httpx_event_hooks("user_service"),
+)
+
+async def close_http_clients():
+    await user_service_client.aclose()
+
+
+async def fetch_authors(user_ids: Iterable[int]) -> Dict[int, dict]:
+    """작성자 정보를 user_service 배치 조회 한 번으로 가져옵니다. 실패하거나 없는 ID는 결과에서 빠집니다."""
+    ids = sorted(set(user_ids))
+    if not ids:
+        return {}
+    try:
+        if len(ids) <= USER_BATCH_GET_MAX:
+            resp = await user_service_client.get("/api/users", params={"ids": ",".join(map(str, ids))})
+        else:
+            resp = await user_service_client.post("/api/users/batch", json={"ids": ids})
+        if resp.status_code != 200:
+            print(f"Error fetching authors: HTTP {resp.status_code}")
+            return {}
+        return {int(user_id): data for user_id, data in resp.json().items()}
+    except Exception as e:
+        print(f"Error fetching authors: {e}")
+        return {}
@@ -0,0 +1,91 @@
+import time
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_COUNT = Counter("http_requests_total", "처리한 HTTP 요청 수", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "처리 중인 HTTP 요청 수")
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "다른 서비스 호출 시간", ["target", "status"], buckets=LATENCY_BUCKETS
+)
+DB_LATENCY = Histogram("db_query_duration_seconds", "DB 쿼리 실행 시간", ["operation"], buckets=LATENCY_BUCKETS)
+REDIS_LATENCY = Histogram("redis_command_duration_seconds", "Redis 명령 실행 시간", ["command"], buckets=LATENCY_BUCKETS)
+
+
+class MetricsMiddleware:
+    """요청 수, 지연 시간, 처리 중 요청 수를 기록하는 pure ASGI 미들웨어입니다.
+
+    route 라벨은 실제 경로 대신 라우트 템플릿(/api/users/{user_id})을 사용합니다.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            REQUEST_COUNT.labels(method, route, str(status_code)).inc()
+
+
+def instrument_engine(engine: AsyncEngine):
+    """SQLAlchemy 커서 실행 이벤트로 쿼리 시간을 기록합니다."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        DB_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def httpx_event_hooks(target: str) -> dict:
+    """httpx 클라이언트에 붙여 다른 서비스 호출 시간을 기록하는 이벤트 훅입니다."""
+
+    async def on_request(request):
+        request.extensions["metrics_started"] = time.perf_counter()
+
+    async def on_response(response):
+        started = response.request.extensions.get("metrics_started")
+        if started is not None:
+            UPSTREAM_LATENCY.labels(target, str(response.status_code)).observe(time.perf_counter() - started)
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,183 @@
+import os
+import asyncio
+from typing import Dict, List, Optional, Tuple, Type
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# 목록 개수 카운터 키: 전체 목록은 "all", 작성자별 목록은 "owner:{id}"
+# 카운터 모델(counter_model)은 서비스마다 models.py에 있는 name(기본 키)/value 두 열짜리 테이블입니다.
+ALL_KEY = "all"
+# 카운터를 COUNT(*)로 다시 맞추는 주기(초). 0이면 서버 시작 때만 맞춥니다.
+LIST_COUNTER_RECONCILE_INTERVAL = float(os.getenv("LIST_COUNTER_RECONCILE_INTERVAL", "3600"))
+
+
+def counter_key(owner_id: Optional[int] = None) -> str:
+    return ALL_KEY if owner_id is None else f"owner:{owner_id}"
+
+
+def _upsert_counters(session: AsyncSession, counter_model: Type[SQLModel], rows: List[dict], increment: bool):
+    """카운터 여러 개를 INSERT ... ON DUPLICATE KEY UPDATE 한 문장으로 쓰는 구문을 만듭니다.
+
+    increment면 기존 값에 더하고, 아니면 덮어씁니다. MySQL이 아닌 DB(로컬 sqlite)는 ON CONFLICT를 씁니다.
+    """
+    table = counter_model.__table__
+    if session.bind.dialect.name in ("mysql", "mariadb"):
+        stmt = mysql_insert(table).values(rows)
+        new_value = stmt.inserted.value
+        return stmt.on_duplicate_key_update(value=table.c.value + new_value if increment else new_value)
+    stmt = sqlite_insert(table).values(rows)
+    new_value = stmt.excluded.value
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.name], set_={"value": table.c.value + new_value if increment else new_value}
+    )
+
+
+async def adjust_totals(session: AsyncSession, counter_model: Type[SQLModel], owner_id: int, delta: int):
+    """글을 만들거나 지울 때 전체/작성자별 카운터를 같은 트랜잭션 안에서 갱신합니다. 커밋은 호출한 쪽에서 합니다.
+
+    카운터는 서버 시작 때 모두 만들어 두므로, 없는 카운터는 글이 하나도 없던 작성자의 것이고 delta로 새로 만듭니다.
+    """
+    # "all"을 항상 먼저 갱신합니다. _fix_counter()가 이 순서에 기대어 "all"을 작성자 카운터의 합으로 맞춥니다.
+    rows = [{"name": ALL_KEY, "value": delta}, {"name": counter_key(owner_id), "value": delta}]
+    await session.execute(_upsert_counters(session, counter_model, rows, increment=True))
+
+
+async def get_total(session: AsyncSession, counter_model: Type[SQLModel], owner_id: Optional[int] = None) -> int:
+    """요청마다 COUNT(*)를 하는 대신 유지되는 카운터를 읽습니다. 카운터가 없으면 글이 없는 작성자입니다."""
+    result = await session.exec(select(counter_model.value).where(counter_model.name == counter_key(owner_id)))
+    return result.one_or_none() or 0
+
+
+async def _fix_counter(engine: AsyncEngine, model: Type[SQLModel], counter_model: Type[SQLModel], name: str) -> bool:
+    """카운터 행 하나만 잠그고 다시 센 값으로 맞추는 짧은 트랜잭션입니다. 값이 달랐으면 True를 반환합니다.
+
+    잠근 뒤에 세므로, 진행 중이던 글 생성/삭제는 먼저 커밋되어 세는 값에 들어가거나
+    이 트랜잭션이 끝난 뒤에 카운터에 더해집니다.
+    """
+    async with AsyncSession(engine) as session:
+        locked = await session.exec(select(counter_model.value).where(counter_model.name == name).with_for_update())
+        current = locked.one_or_none() or 0
+        if name == ALL_KEY:
+            # adjust_totals는 "all"을 작성자 카운터보다 먼저 갱신하므로, "all"을 잠근 동안에는 작성자 카운터가 바뀌지 않습니다.
+            # 글 테이블 전체를 세는 대신 (앞에서 맞춘) 작성자 카운터의 합을 씁니다.
+            result = await session.exec(select(func.sum(counter_model.value)).where(counter_model.name.startswith("owner:")))
+        else:
+            owner_id = int(name.split(":", 1)[1])
+            result = await session.exec(select(func.count()).select_from(model).where(model.owner_id == owner_id))
+        expected = int(result.one() or 0)
+        if current != expected:
+            await session.execute(_upsert_counters(session, counter_model, [{"name": name, "value": expected}], increment=False))
+        await session.commit()
+    return current != expected
+
+
+async def reconcile_totals(engine: AsyncEngine, model: Type[SQLModel], counter_model: Type[SQLModel]) -> int:
+    """모든 카운터를 COUNT(*) 결과와 맞추고, 값이 달랐던 카운터 수를 반환합니다.
+
+    글 테이블 전체를 세는 동안에는 아무 행도 잠그지 않습니다. 잠금 없이 센 값과 다른 카운터만 골라
+    카운터마다 _fix_counter()로 다시 맞추므로, 글 생성/삭제는 그 카운터 하나를 고치는 동안만 기다립니다.
+    """
+    async with AsyncSession(engine) as session:
+        # 같은 트랜잭션(같은 스냅샷)에서 읽어서, 동시에 커밋된 글 때문에 멀쩡한 카운터를 후보로 고르지 않게 합니다.
+        existing: Dict[str, int] = dict((await session.exec(select(counter_model.name, counter_model.value))).all())
+        counts = await session.exec(select(model.owner_id, func.count()).group_by(model.owner_id))
+        expected = {counter_key(owner_id): count for owner_id, count in counts.all()}
+    expected[ALL_KEY] = sum(expected.values())
+
+    suspects = [
+        name for name in sorted(set(existing) | set(expected))
+        if name != ALL_KEY and existing.get(name, 0) != expected.get(name, 0)
+    ]
+    changed = 0
+    for name in suspects:
+        changed += await _fix_counter(engine, model, counter_model, name)
+    # 작성자 카운터를 고쳤다면 "all"도 다시 확인합니다.
+    if changed or existing.get(ALL_KEY, 0) != expected[ALL_KEY]:
+        changed += await _fix_counter(engine, model, counter_model, ALL_KEY)
+    return changed
+
+
+class TotalsReconciler:
+    """서버 시작 때와 주기적으로 목록 개수 카운터를 COUNT(*)와 맞춥니다.
+
+    카운터는 글 생성/삭제와 같은 트랜잭션에서 갱신되므로 평소에는 어긋나지 않지만,
+    DB를 직접 고치거나 배포 중 예전 코드가 쓴 경우 등을 대비해 주기적으로 바로잡습니다.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        model: Type[SQLModel],
+        counter_model: Type[SQLModel],
+        interval: float = LIST_COUNTER_RECONCILE_INTERVAL,
+    ):
+        self.engine = engine
+        self.model = model
+        self.counter_model = counter_model
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.corrected = 0
+
+    async def reconcile(self) -> int:
+        changed = await reconcile_totals(self.engine, self.model, self.counter_model)
+        self.runs += 1
+        if changed:
+            self.corrected += changed
+            print(f"[pagination] corrected {changed} {self.model.__tablename__} list counters")
+        return changed
+
+    async def start(self):
+        """카운터를 한 번 맞춘 뒤 주기 작업을 시작합니다. 요청을 받기 전에 카운터가 준비되도록 서버 시작 때 호출합니다."""
+        await self.reconcile()
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                print(f"[pagination] counter reconcile failed: {e!r}")
+
+    def stats(self) -> dict:
+        return {"interval": self.interval, "runs": self.runs, "corrected": self.corrected}
+
+
+async def fetch_page(
+    session: AsyncSession,
+    model: Type[SQLModel],
+    size: int,
+    page: int = 1,
+    after_id: Optional[int] = None,
+    owner_id: Optional[int] = None,
+) -> Tuple[List[SQLModel], Optional[int]]:
+    """id 내림차순으로 한 페이지를 읽고 (목록, 다음 페이지의 after_id)를 반환합니다.
+
+    after_id를 주면 OFFSET 대신 id < after_id 조건으로 읽으므로 몇 번째 페이지든 기본 키 인덱스로 바로 찾아갑니다.
+    size + 1개를 읽어서 다음 페이지가 있는지 판단하고, 없으면 next_after_id는 None입니다.
+    """
+    query = select(model).order_by(model.id.desc())
+    if owner_id is not None:
+        query = query.where(model.owner_id == owner_id)
+    if after_id is not None:
+        query = query.where(model.id < after_id)
+    else:
+        query = query.offset((page - 1) * size)
+    rows = (await session.exec(query.limit(size + 1))).all()
+    items = rows[:size]
+    next_after_id = items[-1].id if len(rows) > size else None
+    return items, next_after_id
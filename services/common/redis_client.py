@@ -0,0 +1,44 @@
+import os
+import time
+from dotenv import load_dotenv
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from metrics import REDIS_LATENCY
+from tracing import span
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+
+class InstrumentedPipeline(Pipeline):
+    """파이프라인은 execute_command를 거치지 않으므로 execute 전체 시간을 따로 기록합니다."""
+
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            with span("redis.pipeline", kind="client", **{"db.redis.commands": len(self.command_stack)}):
+                return await super().execute(raise_on_error)
+        finally:
+            REDIS_LATENCY.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """모든 Redis 명령의 실행 시간을 명령 이름별로 기록하는 클라이언트입니다."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with span(f"redis.{str(args[0]).upper()}", kind="client"):
+                return await super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+redis_client = InstrumentedRedis.from_url(REDIS_URL, decode_responses=True)
+
+async def get_redis():
+    yield redis_client
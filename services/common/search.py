@@ -0,0 +1,91 @@
+from typing import List, Optional, Sequence, Tuple, Type
+from sqlalchemy import inspect, or_, literal
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+class FullTextSearch:
+    """MySQL FULLTEXT 인덱스(ngram 파서)로 여러 컬럼을 검색합니다.
+
+    ngram 파서는 공백이 없는 한국어도 글자 단위 n-gram(기본 2글자)으로 색인하므로 단어 일부로도 찾을 수 있습니다.
+    InnoDB가 글을 만들고, 고치고, 지울 때마다 인덱스를 함께 갱신하므로 따로 동기화할 필요가 없습니다.
+    MySQL이 아닌 DB(로컬 sqlite 등)에서는 LIKE 검색으로 대신하고 점수는 0입니다.
+    """
+
+    def __init__(self, model: Type[SQLModel], columns: Sequence[str], index_name: str):
+        self.model = model
+        self.columns = list(columns)
+        self.index_name = index_name
+
+    @property
+    def table_name(self) -> str:
+        return self.model.__table__.name
+
+    def _ensure(self, sync_conn) -> bool:
+        if sync_conn.dialect.name not in ("mysql", "mariadb"):
+            return False
+        existing = {index["name"] for index in inspect(sync_conn).get_indexes(self.table_name)}
+        if self.index_name in existing:
+            return False
+        # 테이블 크기에 비례해서 오래 걸리므로 새로 만들 때만 실행합니다.
+        print(f"[search] creating FULLTEXT index {self.index_name} on {self.table_name}")
+        columns = ", ".join(f"`{column}`" for column in self.columns)
+        sync_conn.exec_driver_sql(
+            f"ALTER TABLE `{self.table_name}` ADD FULLTEXT INDEX `{self.index_name}` ({columns}) WITH PARSER ngram"
+        )
+        return True
+
+    def _drop(self, sync_conn):
+        if sync_conn.dialect.name not in ("mysql", "mariadb"):
+            return
+        existing = {index["name"] for index in inspect(sync_conn).get_indexes(self.table_name)}
+        if self.index_name in existing:
+            sync_conn.exec_driver_sql(f"ALTER TABLE `{self.table_name}` DROP INDEX `{self.index_name}`")
+
+    async def ensure_index(self, engine: AsyncEngine) -> bool:
+        """인덱스가 없으면 만듭니다. 서버 시작 때 호출합니다."""
+        async with engine.begin() as conn:
+            return await conn.run_sync(self._ensure)
+
+    async def rebuild_index(self, engine: AsyncEngine):
+        """인덱스를 지우고 기존 데이터로 다시 만듭니다. ngram_token_size를 바꿨거나 인덱스가 조각났을 때 사용합니다."""
+        async with engine.begin() as conn:
+            await conn.run_sync(self._drop)
+            await conn.run_sync(self._ensure)
+
+    def _score(self, session: AsyncSession, query: str):
+        if session.bind.dialect.name in ("mysql", "mariadb"):
+            columns = [getattr(self.model, column) for column in self.columns]
+            return match(*columns, against=query).in_natural_language_mode(), True
+        pattern = f"%{query}%"
+        return or_(*(getattr(self.model, column).like(pattern) for column in self.columns)), False
+
+    async def search(
+        self,
+        session: AsyncSession,
+        query: str,
+        page: int,
+        size: int,
+        owner_id: Optional[int] = None,
+    ) -> Tuple[int, List[Tuple[SQLModel, float]]]:
+        """관련도 높은 순으로 한 페이지를 읽고 (전체 결과 수, [(행, 점수)])를 반환합니다."""
+        condition, ranked = self._score(session, query)
+        score = condition if ranked else literal(0.0)
+        filters = [condition]
+        if owner_id is not None:
+            filters.append(self.model.owner_id == owner_id)
+
+        total = (await session.exec(select(func.count()).select_from(self.model).where(*filters))).one()
+        if total == 0:
+            return 0, []
+        rows_query = (
+            select(self.model, score.label("score"))
+            .where(*filters)
+            .order_by(score.desc(), self.model.id.desc())
+            .offset((page - 1) * size)
+            .limit(size)
+        )
+        rows = (await session.exec(rows_query)).all()
+        return total, [(row, float(row_score)) for row, row_score in rows]
@@ -0,0 +1,211 @@
+import os
+import asyncio
+import hashlib
+import secrets
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from fastapi import HTTPException, UploadFile
+
+# 업로드 제한 (환경 변수로 조정 가능)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+# 허용하는 이미지 형식과 저장할 때 붙이는 확장자
+IMAGE_EXTENSIONS: Dict[str, str] = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """파일 앞부분의 매직 바이트로 실제 이미지 형식을 판별합니다. 클라이언트가 보낸 Content-Type은 믿지 않습니다."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+@dataclass
+class StoredFile:
+    filename: str
+    sha256: str
+    size: int
+    content_type: str
+    # False면 같은 내용의 파일이 이미 있어서 새로 쓰지 않은 것입니다.
+    created: bool
+    # 같은 내용의 파일이 이미 있을 때 settle() 전까지 남겨 두는 임시 파일
+    pending_path: Optional[str] = field(default=None, repr=False)
+
+
+# filename -> 그 파일을 참조하는 DB 행이 있는지. 다른 요청이 방금 커밋한 행도 보이도록 새 트랜잭션에서 확인해야 합니다.
+ReferenceCheck = Callable[[str], Awaitable[bool]]
+
+
+def _write_chunk(buffer, hasher, chunk: bytes):
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def _finalize(tmp_path: str, target_path: str) -> bool:
+    """임시 파일을 최종 경로로 옮깁니다. 같은 내용이 이미 있으면 임시 파일은 그대로 두고 False를 반환합니다."""
+    if os.path.exists(target_path):
+        return False
+    os.replace(tmp_path, target_path)
+    return True
+
+
+def _settle(tmp_path: str, target_path: str):
+    # 참조를 커밋하는 사이에 다른 요청이 파일을 지웠으면 남겨 둔 임시 파일로 다시 만듭니다.
+    if os.path.exists(target_path):
+        _remove_quietly(tmp_path)
+    else:
+        os.replace(tmp_path, target_path)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ContentAddressedStorage:
+    """업로드 파일을 내용의 sha256 이름({sha256}{확장자})으로 저장하는 저장소입니다.
+
+    - 파일 전체를 메모리에 올리지 않고 청크 단위로 임시 파일에 쓰며, 쓰는 동안 해시를 계산합니다.
+    - 디스크 쓰기와 해시 계산은 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+    - 크기와 형식은 첫 청크를 읽는 즉시 확인해서 잘못된 파일은 끝까지 받지 않습니다.
+    - 같은 내용의 파일은 한 번만 저장되므로 여러 행이 같은 파일 이름을 참조할 수 있습니다.
+
+    같은 내용의 업로드와 마지막 참조 삭제가 겹쳐도 파일이 사라지지 않도록 양쪽이 다시 확인합니다.
+    - 업로드: 이미 있는 파일이면 임시 파일을 남겨 두고, 호출한 쪽이 참조를 커밋한 뒤 settle()에서
+      파일이 여전히 있는지 보고 없으면 임시 파일로 다시 만듭니다.
+    - 삭제: delete_unreferenced()는 파일을 다른 이름으로 옮긴 뒤 참조를 한 번 더 확인하고, 그 사이 참조가 생겼으면 되돌립니다.
+    여러 프로세스가 같은 디렉터리를 써도 잠금 없이 동작합니다.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = UPLOAD_MAX_BYTES, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _reject_early(self, upload: UploadFile):
+        # multipart 파서가 이미 알고 있는 크기/형식은 본문을 읽기 전에 거절합니다.
+        if upload.size is not None and upload.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File too large (max {self.max_bytes} bytes)")
+        declared = upload.content_type
+        if declared and declared not in IMAGE_EXTENSIONS and declared != "application/octet-stream":
+            raise HTTPException(status_code=415, detail=f"Unsupported file type: {declared}")
+
+    async def save(self, upload: UploadFile) -> StoredFile:
+        self._reject_early(upload)
+        hasher = hashlib.sha256()
+        fd, tmp_path = await asyncio.to_thread(tempfile.mkstemp, dir=self.directory, prefix=".upload-")
+        buffer = os.fdopen(fd, "wb")
+        size = 0
+        content_type = None
+        try:
+            while True:
+                chunk = await upload.read(self.chunk_size)
+                if not chunk:
+                    break
+                if content_type is None:
+                    content_type = sniff_image_type(chunk)
+                    if content_type is None:
+                        raise HTTPException(status_code=415, detail="File is not a supported image")
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File too large (max {self.max_bytes} bytes)")
+                await asyncio.to_thread(_write_chunk, buffer, hasher, chunk)
+            await asyncio.to_thread(buffer.close)
+            if content_type is None:
+                raise HTTPException(status_code=400, detail="Empty file")
+
+            digest = hasher.hexdigest()
+            filename = f"{digest}{IMAGE_EXTENSIONS[content_type]}"
+            created = await asyncio.to_thread(_finalize, tmp_path, self.path(filename))
+            return StoredFile(
+                filename=filename, sha256=digest, size=size, content_type=content_type, created=created,
+                pending_path=None if created else tmp_path,
+            )
+        except BaseException:
+            buffer.close()
+            await asyncio.to_thread(_remove_quietly, tmp_path)
+            raise
+
+    async def save_many(self, uploads: List[UploadFile], is_referenced: Optional[ReferenceCheck] = None) -> List[StoredFile]:
+        """여러 파일을 동시에 저장합니다. 하나라도 실패하면 이번 요청에서 새로 만든 파일은 지우고 첫 오류를 다시 던집니다.
+
+        is_referenced를 주면 새로 만든 파일이라도 그 사이 다른 요청이 참조했으면 지우지 않습니다.
+        """
+        results = await asyncio.gather(*(self.save(upload) for upload in uploads), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            stored = [result for result in results if isinstance(result, StoredFile)]
+            await self.settle(stored)
+            for result in stored:
+                if not result.created:
+                    continue
+                if is_referenced is None:
+                    await self.delete(result.filename)
+                else:
+                    await self.delete_unreferenced(result.filename, is_referenced)
+            raise errors[0]
+        return results
+
+    async def settle(self, stored_files: Iterable[StoredFile]):
+        """save()한 파일의 참조를 DB에 커밋한 뒤(또는 커밋이 실패한 뒤) 반드시 호출합니다. 남겨 둔 임시 파일을 정리합니다."""
+        for stored in stored_files:
+            if stored.pending_path is not None:
+                await asyncio.to_thread(_settle, stored.pending_path, self.path(stored.filename))
+                stored.pending_path = None
+
+    def recover(self, max_age: float = 3600):
+        """서버 시작 때 호출합니다. 삭제 확인 도중 종료돼 남은 파일은 되돌리고, 오래된 업로드 임시 파일은 지웁니다."""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = self.path(name)
+            if name.startswith(".deleting-"):
+                # 참조가 없었다면 다음 삭제 때 다시 지워지므로, 확인 없이 되돌리는 편이 안전합니다.
+                original = self.path(name.split("-", 2)[2])
+                if os.path.exists(original):
+                    _remove_quietly(path)
+                else:
+                    os.replace(path, original)
+            elif name.startswith(".upload-") and now - os.path.getmtime(path) > max_age:
+                _remove_quietly(path)
+
+    async def delete(self, filename: str):
+        """참조를 확인하지 않고 지웁니다. 다른 행이 같은 파일을 참조할 수 있으면 delete_unreferenced()를 사용합니다."""
+        await asyncio.to_thread(_remove_quietly, self.path(filename))
+
+    async def delete_unreferenced(self, filename: str, is_referenced: ReferenceCheck) -> bool:
+        """참조하는 행이 없을 때만 파일을 지우고, 지웠으면 True를 반환합니다."""
+        if await is_referenced(filename):
+            return False
+        path = self.path(filename)
+        tombstone = os.path.join(self.directory, f".deleting-{secrets.token_hex(8)}-{filename}")
+        try:
+            await asyncio.to_thread(os.rename, path, tombstone)
+        except FileNotFoundError:
+            return False
+        # 처음 확인한 뒤 같은 내용의 업로드가 이 파일을 참조하고 커밋했을 수 있습니다.
+        # 그 업로드가 settle()을 이미 지났다면 파일이 있는 것을 보고 임시 파일을 지웠으므로 여기서 되돌려야 합니다.
+        if await is_referenced(filename):
+            await asyncio.to_thread(os.replace, tombstone, path)
+            return False
+        await asyncio.to_thread(_remove_quietly, tombstone)
+        return True
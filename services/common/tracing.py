@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import random
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 새로 시작하는 트레이스 중 기록할 비율 (0.0 ~ 1.0). traceparent를 받은 요청은 호출한 쪽의 결정을 따릅니다.
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.1"))
+# 최근 스팬을 보관하는 메모리 링 버퍼 크기
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+# 지정하면 끝난 스팬을 JSON lines 형식으로 이 파일에도 씁니다.
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "")
+
+
+class Span:
+    """W3C trace context 기반의 스팬 하나입니다. sampled가 False면 ID 전파에만 쓰이고 기록되지 않습니다."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled", "start", "started", "duration", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, kind: str = "internal"):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.attributes = {}
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.started
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.sampled:
+            exporter.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "service": exporter.service_name,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanExporter:
+    """끝난 스팬을 메모리 링 버퍼(와 선택적으로 JSON lines 파일)에 보관합니다. 외부 수집기가 필요 없습니다."""
+
+    def __init__(self, max_spans: int, export_file: str):
+        self.service_name = os.getenv("TRACE_SERVICE_NAME", "unknown")
+        self.spans = deque(maxlen=max_spans)
+        self.exported = 0
+        self._file = open(export_file, "a", buffering=1, encoding="utf-8") if export_file else None
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        self.spans.append(record)
+        self.exported += 1
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def recent(self, limit: int = 100, trace_id: Optional[str] = None) -> list:
+        spans = [span for span in self.spans if trace_id is None or span["trace_id"] == trace_id]
+        return spans[-limit:]
+
+
+exporter = SpanExporter(TRACE_BUFFER_SIZE, TRACE_EXPORT_FILE)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: Optional[str]):
+    """traceparent 헤더에서 (trace_id, parent_span_id, sampled)를 꺼냅니다. 형식이 틀리면 None입니다."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(name: str, kind: str = "internal") -> Optional[Span]:
+    """현재 스팬의 자식 스팬을 시작합니다. 진행 중인 기록 대상 트레이스가 없으면 None을 반환합니다.
+
+    컨텍스트를 바꾸지 않으므로 이벤트 훅처럼 시작/끝이 다른 콜백에 나뉜 곳에서 씁니다.
+    """
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, True, kind)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """현재 스팬의 자식 스팬을 열고, 블록 안에서는 그 스팬을 현재 스팬으로 둡니다."""
+    child = start_span(name, kind)
+    if child is None:
+        yield None
+        return
+    child.attributes.update(attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.end(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced_transport(transport, target: str):
+    """httpx transport를 감싸서 나가는 요청마다 client 스팬을 만들고 traceparent를 전파합니다.
+
+    이벤트 훅은 응답이 와야 불리므로, 연결 실패/타임아웃처럼 응답이 없는 요청도 오류와 함께 스팬을 끝내도록
+    transport에서 처리합니다. 클라이언트의 limits/http2 설정은 안쪽 transport에 직접 줘야 합니다.
+    """
+    import httpx
+
+    class TracingTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            parent = _current_span.get()
+            if parent is None:
+                return await transport.handle_async_request(request)
+            child = start_span(f"HTTP {request.method}", kind="client")
+            if child is None:
+                # 기록하지 않는 트레이스도 ID는 전파해서 다음 서비스가 다시 샘플링하지 않도록 합니다.
+                request.headers["traceparent"] = parent.traceparent()
+                return await transport.handle_async_request(request)
+            child.attributes.update({"peer.service": target, "http.method": request.method, "http.url": str(request.url)})
+            request.headers["traceparent"] = child.traceparent()
+            try:
+                response = await transport.handle_async_request(request)
+            except BaseException as exc:
+                child.end(exc)
+                raise
+            child.set_attribute("http.status_code", response.status_code)
+            child.end()
+            return response
+
+        async def aclose(self):
+            await transport.aclose()
+
+    return TracingTransport()
+
+
+def trace_engine(engine):
+    """SQLAlchemy 커서 실행을 현재 요청 트레이스의 자식 스팬으로 기록합니다."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        child = start_span("db.query", kind="client")
+        if child is not None:
+            child.attributes["db.statement"] = statement[:500]
+            child.attributes["db.executemany"] = executemany
+        conn.info.setdefault("trace_spans", []).append(child)
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        child = conn.info["trace_spans"].pop()
+        if child is not None:
+            child.end()
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("trace_spans"):
+            child = conn.info["trace_spans"].pop()
+            if child is not None:
+                child.end(exception_context.original_exception)
+
+
+class TracingMiddleware:
+    """들어온 traceparent를 이어받거나 새 트레이스를 시작해 요청 전체를 server 스팬으로 기록하는 pure ASGI 미들웨어입니다."""
+
+    def __init__(self, app: ASGIApp, service_name: str, sample_ratio: float = TRACE_SAMPLE_RATIO):
+        self.app = app
+        self.sample_ratio = sample_ratio
+        exporter.service_name = service_name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                incoming = parse_traceparent(value.decode("latin-1"))
+                break
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = os.urandom(16).hex(), None, random.random() < self.sample_ratio
+
+        server_span = Span(f"{scope['method']} {scope['path']}", trace_id, parent_id, sampled, kind="server")
+        server_span.set_attribute("http.method", scope["method"])
+        server_span.set_attribute("http.target", scope["path"])
+        token = _current_span.set(server_span)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                server_span.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            _current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                server_span.name = f"{scope['method']} {route}"
+            server_span.end(error)
+
+
+def traces_response(limit: int = 100, trace_id: Optional[str] = None) -> JSONResponse:
+    return JSONResponse(content={
+        "service": exporter.service_name,
+        "sample_ratio": TRACE_SAMPLE_RATIO,
+        "exported": exporter.exported,
+        "spans": exporter.recent(limit, trace_id),
+    })
@@ -1,10 +1,27 @@
+import os
 import secrets
 from typing import Optional
 from passlib.context import CryptContext
 from redis.asyncio import Redis
+from session_tokens import (
+    SESSION_TOKEN_TTL_SECONDS, signed_sessions_enabled, is_signed_token,
+    SESSION_SIGNING_KEY, sign_session_token, verify_session_token, needs_refresh,
+    revoke_session_token, revoke_user_sessions, is_revoked,
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt 비용(rounds). 값을 바꾸면 기존 해시는 그대로 검증되고, 다음 로그인 때 새 rounds로 다시 해싱됩니다.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 SESSION_TTL_SECONDS = 3600
+# 세션 쿠키 수명: 서명 토큰은 게이트웨이를 지나는 인증 요청과 /api/auth/me에서 갱신됩니다.
+SESSION_COOKIE_MAX_AGE = SESSION_TOKEN_TTL_SECONDS if signed_sessions_enabled() else SESSION_TTL_SECONDS
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -13,13 +30,41 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 async def create_session(redis: Redis, user_id: int) -> str:
+    if signed_sessions_enabled():
+        # 서명 토큰은 Redis에 아무것도 저장하지 않습니다.
+        return sign_session_token(user_id)
     session_id = secrets.token_hex(16)
     await redis.setex(f"session:{session_id}", SESSION_TTL_SECONDS, user_id)
     return session_id
 
 async def get_user_id_from_session(redis: Redis, session_id: str) -> Optional[int]:
+    # 모드를 바꾸는 동안에도 이미 발급된 두 형식의 쿠키를 모두 받습니다.
+    if is_signed_token(session_id):
+        claims = verify_session_token(session_id)
+        if claims is None or await is_revoked(redis, claims):
+            return None
+        return claims.user_id
     user_id = await redis.get(f"session:{session_id}")
     return int(user_id) if user_id else None
 
 async def delete_session(redis: Redis, session_id: str):
-    await redis.delete(f"session:{session_id}")
\ No newline at end of file
+    if is_signed_token(session_id):
+        claims = verify_session_token(session_id)
+        if claims is not None:
+            await revoke_session_token(redis, claims)
+        return
+    await redis.delete(f"session:{session_id}")
+
+async def delete_user_sessions(redis: Redis, user_id: int):
+    """비밀번호 변경 시 이 사용자에게 발급된 서명 토큰을 모두 폐기합니다."""
+    if SESSION_SIGNING_KEY:
+        await revoke_user_sessions(redis, user_id)
+
+def refresh_session_token(session_id: str) -> Optional[str]:
+    """서명 토큰이 수명의 절반을 넘겼으면 새 토큰을 반환합니다."""
+    if not signed_sessions_enabled() or not is_signed_token(session_id):
+        return None
+    claims = verify_session_token(session_id)
+    if claims is None or not needs_refresh(claims):
+        return None
+    return sign_session_token(claims.user_id)
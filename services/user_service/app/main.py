@@ -1,40 +1,116 @@
 import os
-import uuid
-from typing import Annotated, Optional
-from fastapi import FastAPI, Depends, HTTPException, status, Response, Cookie, UploadFile, File, Header
+import asyncio
+from typing import Annotated, Dict, Iterable, List, Optional
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Cookie, UploadFile, File, Header, Query
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from sqlmodel import select, col
 from sqlmodel.ext.asyncio.session import AsyncSession
 from redis.asyncio import Redis
 
 # 같은 폴더에 있는 다른 .py 파일들을 임포트
-from database import init_db, get_session
+from database import init_db, get_session, engine, pool_stats
+from metrics import MetricsMiddleware, instrument_engine, metrics_response
+from tracing import TracingMiddleware, trace_engine, traces_response
 from redis_client import get_redis
-from models import User, UserCreate, UserPublic, UserUpdate, PasswordUpdate,Userlogin
+from user_cache import user_cache
+from storage import ContentAddressedStorage
+from derivatives import DerivativePipeline
+from models import User, UserCreate, UserPublic, UserUpdate, PasswordUpdate,Userlogin, UserBatchRequest, ImageDerivative
 from auth import (
-    get_password_hash, verify_password,
-    create_session, delete_session, get_user_id_from_session
+    SESSION_COOKIE_MAX_AGE, create_session, delete_session, delete_user_sessions,
+    get_user_id_from_session, refresh_session_token,
 )
+from password_hasher import password_hasher, PasswordHasherBusy
+
+# 배치 조회 한 번에 받을 수 있는 최대 사용자 ID 수
+USER_BATCH_MAX = int(os.getenv("USER_BATCH_MAX", "200"))
 
 app = FastAPI(title="User Service")
+app.add_middleware(MetricsMiddleware)
+# traceparent를 이어받아 요청 전체를 server 스팬으로, DB 쿼리를 자식 스팬으로 기록합니다.
+app.add_middleware(TracingMiddleware, service_name="user_service")
+instrument_engine(engine)
+trace_engine(engine)
 
 # --- 정적 파일(이미지) 제공을 위한 설정 ---
 STATIC_DIR = "/app/static"
 PROFILE_IMAGE_DIR = f"{STATIC_DIR}/profiles"
 os.makedirs(PROFILE_IMAGE_DIR, exist_ok=True)
+profile_storage = ContentAddressedStorage(PROFILE_IMAGE_DIR)
+profile_derivatives = DerivativePipeline(engine, ImageDerivative, PROFILE_IMAGE_DIR, "/static/profiles")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
-def create_user_public(user: User) -> UserPublic:
-    """DB 모델(User)을 API 응답 모델(UserPublic)으로 변환하는 함수"""
+def create_user_public(user: User, variants: Optional[Dict[str, Dict[str, str]]] = None) -> UserPublic:
+    """DB 모델(User)을 API 응답 모델(UserPublic)으로 변환하는 함수
+
+    variants는 profile_derivatives.variant_urls()의 결과입니다. 파생 이미지가 준비됐으면 썸네일/중간 크기 URL도 채웁니다.
+    """
     image_url = f"/static/profiles/{user.profile_image_filename}" if user.profile_image_filename else "https://www.w3schools.com/w3images/avatar_g.jpg"
     user_dict = user.model_dump()
     user_dict["profile_image_url"] = image_url
+    ready = (variants or {}).get(user.profile_image_filename, {})
+    user_dict["profile_image_thumb_url"] = ready.get("thumb")
+    user_dict["profile_image_medium_url"] = ready.get("medium")
     return UserPublic.model_validate(user_dict)
 
+async def _invalidate_profile_owners(filename: str):
+    """파생 이미지가 준비되면 그 이미지를 쓰는 사용자의 캐시를 지워 다음 조회에 새 URL이 나가게 합니다."""
+    async with AsyncSession(engine) as session:
+        result = await session.exec(select(User.id).where(User.profile_image_filename == filename))
+        user_ids = result.all()
+    for user_id in user_ids:
+        await user_cache.invalidate(user_id)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식의 메트릭을 반환합니다."""
+    return metrics_response()
+
+@app.get("/traces")
+async def traces(limit: int = 100, trace_id: Optional[str] = None):
+    """최근 기록된 스팬을 반환합니다. trace_id로 트레이스 하나만 볼 수 있습니다."""
+    return traces_response(limit, trace_id)
+
+@app.get("/stats/db-pool")
+async def db_pool_stats():
+    """DB 커넥션 풀의 사용 중/overflow 연결 수와 고갈/타임아웃 횟수를 반환합니다."""
+    return pool_stats()
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """비밀번호 해싱 대기열이 가득 차면 이벤트 루프를 막는 대신 바로 503으로 응답합니다."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many password operations in progress"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.get("/stats/password-hasher")
+async def password_hasher_stats():
+    """비밀번호 해싱 풀의 대기 작업 수와 거절/재해싱 횟수를 반환합니다."""
+    return password_hasher.stats()
+
+@app.get("/stats/user-cache")
+async def user_cache_stats():
+    """공개 프로필 캐시의 적중률과 잠금 대기 횟수를 반환합니다."""
+    return user_cache.stats()
+
 @app.on_event("startup")
 async def on_startup():
     """서버가 시작될 때 DB 테이블을 생성합니다."""
     await init_db()
+    # 재시작 전에 끝나지 못한 파생 이미지 작업을 다시 예약합니다.
+    async with AsyncSession(engine) as session:
+        filenames = await session.exec(select(User.profile_image_filename).where(User.profile_image_filename != None).distinct())
+        filenames = filenames.all()
+    await profile_derivatives.backfill(filenames, _invalidate_profile_owners)
+    await asyncio.to_thread(profile_storage.recover)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    password_hasher.shutdown()
+    profile_derivatives.shutdown()
 
 @app.get("/")
 async def root():
@@ -55,17 +131,19 @@ async def register_user(
     if existing_user_result.one_or_none():
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="이미 사용 중인 이메일입니다.")
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     # UserCreate 모델의 모든 데이터를 사용하여 User 객체 생성
     new_user = User.model_validate(user_data, update={"hashed_password": hashed_password})
     
     session.add(new_user)
     await session.commit()
     await session.refresh(new_user)
+    # 가입 전에 조회되어 '없는 사용자'로 캐시된 ID일 수 있습니다.
+    await user_cache.invalidate(new_user.id)
 
     # --- 자동 로그인 처리 ---
     session_id = await create_session(redis, new_user.id)
-    response.set_cookie(key="session_id", value=session_id, httponly=True, samesite="lax", max_age=3600, path="/")
+    response.set_cookie(key="session_id", value=session_id, httponly=True, samesite="lax", max_age=SESSION_COOKIE_MAX_AGE, path="/")
     
     return create_user_public(new_user)
 
@@ -80,13 +158,21 @@ async def login(
     user_result = await session.exec(statement)
     user = user_result.one_or_none()
     
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="이메일 또는 비밀번호가 틀립니다.")
+    valid, new_hash = await password_hasher.verify_and_update(user_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="이메일 또는 비밀번호가 틀립니다.")
+    if new_hash:
+        # BCRYPT_ROUNDS가 바뀐 뒤 처음 로그인하면 새 설정으로 다시 해싱해 둡니다.
+        user.hashed_password = new_hash
+        await session.commit()
+        await session.refresh(user)
     if user.id is not None:
         session_id = await create_session(redis, user.id)
     else:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="세션 번호가 저장되지 않았습니다.")
-    response.set_cookie(key="session_id", value=session_id, httponly=True, samesite="lax", max_age=3600, path="/")
+    response.set_cookie(key="session_id", value=session_id, httponly=True, samesite="lax", max_age=SESSION_COOKIE_MAX_AGE, path="/")
     return {"message":"Login 성공!"}
 
 @app.post("/api/auth/logout")
@@ -117,21 +203,80 @@ async def get_current_user_from_auth(
         # 그 후, 인증 실패 오류를 반환합니다.
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired session")
     
-    user = await session.get(User, int(user_id))
-    if not user:
+    user_json = await user_cache.get(int(user_id), _user_loader(session))
+    if user_json is None:
         # DB에 사용자가 없는 경우에도 쿠키를 삭제해주는 것이 좋습니다.
         response.delete_cookie("session_id", path="/")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found for this session")
-        
-    return create_user_public(user)
+
+    me_response = _json_response(user_json)
+    # 서명 토큰은 수명이 짧으므로 절반 이상 지났으면 새 토큰으로 바꿔 줍니다.
+    new_session_id = refresh_session_token(session_id)
+    if new_session_id:
+        me_response.set_cookie(key="session_id", value=new_session_id, httponly=True, samesite="lax", max_age=SESSION_COOKIE_MAX_AGE, path="/")
+    return me_response
+
+def _validate_batch_ids(ids: Iterable[int]) -> List[int]:
+    unique_ids = list(dict.fromkeys(ids))
+    if len(unique_ids) > USER_BATCH_MAX:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Too many ids (max {USER_BATCH_MAX})")
+    return unique_ids
+
+def _user_loader(session: AsyncSession):
+    """캐시 미스 때 DB에서 사용자 한 명을 읽어 UserPublic JSON으로 만드는 함수를 반환합니다."""
+    async def load(user_id: int) -> Optional[str]:
+        user = await session.get(User, user_id)
+        if user is None:
+            return None
+        variants = await profile_derivatives.variant_urls(session, [user.profile_image_filename])
+        return create_user_public(user, variants).model_dump_json()
+    return load
+
+def _users_loader(session: AsyncSession):
+    """캐시 미스 ID들을 IN (...) 쿼리 한 번으로 읽어 {id: UserPublic JSON}으로 만드는 함수를 반환합니다."""
+    async def load(user_ids: List[int]) -> Dict[int, str]:
+        result = await session.exec(select(User).where(col(User.id).in_(user_ids)))
+        users = result.all()
+        variants = await profile_derivatives.variant_urls(session, (user.profile_image_filename for user in users))
+        return {user.id: create_user_public(user, variants).model_dump_json() for user in users}
+    return load
+
+def _json_response(content: str) -> Response:
+    # 캐시에 저장된 JSON을 다시 검증/직렬화하지 않고 그대로 돌려줍니다.
+    return Response(content=content, media_type="application/json")
+
+async def get_users_public(session: AsyncSession, user_ids: List[int]) -> Response:
+    """여러 사용자를 캐시(MGET)와 IN (...) 쿼리로 조회합니다. 없는 ID는 결과에서 빠집니다."""
+    found = await user_cache.get_many(user_ids, _users_loader(session))
+    return _json_response("{" + ",".join(f'"{user_id}":{found[user_id]}' for user_id in user_ids if user_id in found) + "}")
+
+@app.get("/api/users", response_model=Dict[int, UserPublic])
+async def get_users_by_ids(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    ids: str = Query(..., description="쉼표로 구분한 사용자 ID 목록 (예: 1,2,3)"),
+):
+    """여러 사용자 정보를 id -> UserPublic 맵으로 반환합니다. 긴 목록은 POST /api/users/batch를 사용하세요."""
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be comma separated integers")
+    return await get_users_public(session, _validate_batch_ids(parsed))
+
+@app.post("/api/users/batch", response_model=Dict[int, UserPublic])
+async def get_users_by_ids_batch(
+    batch: UserBatchRequest,
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    """GET /api/users?ids=...와 같지만 ID 목록을 본문으로 받습니다."""
+    return await get_users_public(session, _validate_batch_ids(batch.ids))
 
 @app.get("/api/users/{user_id}", response_model=UserPublic)
 async def get_user_by_id(user_id: int, session: Annotated[AsyncSession, Depends(get_session)]):
     """ID로 특정 사용자 정보 반환"""
-    user = await session.get(User, user_id)
-    if not user:
+    user_json = await user_cache.get(user_id, _user_loader(session))
+    if user_json is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return create_user_public(user)
+    return _json_response(user_json)
 
 @app.patch("/api/users/me", response_model=UserPublic)
 async def update_my_profile(
@@ -151,7 +296,10 @@ async def update_my_profile(
     
     await session.commit()
     await session.refresh(db_user)
-    return create_user_public(db_user)
+    # 커밋한 뒤에 지워야 다른 요청이 옛 값을 다시 채우지 않습니다.
+    await user_cache.invalidate(user_id)
+    variants = await profile_derivatives.variant_urls(session, [db_user.profile_image_filename])
+    return create_user_public(db_user, variants)
 
 @app.post("/api/users/me/upload-image", response_model=UserPublic)
 async def upload_my_profile_image(
@@ -164,17 +312,21 @@ async def upload_my_profile_image(
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404, detail="User not found")
 
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(PROFILE_IMAGE_DIR, unique_filename)
-
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
-
-    db_user.profile_image_filename = unique_filename
-    await session.commit()
+    # 청크 단위로 디스크에 쓰면서 해시를 계산하고, 내용의 sha256을 파일 이름으로 씁니다.
+    stored = await profile_storage.save(file)
+    try:
+        db_user.profile_image_filename = stored.filename
+        await session.commit()
+    finally:
+        await profile_storage.settle([stored])
     await session.refresh(db_user)
-    return create_user_public(db_user)
+    # 커밋한 뒤에 지워야 다른 요청이 옛 값을 다시 채우지 않습니다.
+    await user_cache.invalidate(user_id)
+    # 같은 사진을 전에 올린 적이 있으면 파생 이미지가 이미 있습니다. 없으면 백그라운드에서 만들고, 끝나면 캐시를 지웁니다.
+    variants = await profile_derivatives.variant_urls(session, [stored.filename])
+    if stored.filename not in variants:
+        profile_derivatives.submit(stored.filename, _invalidate_profile_owners)
+    return create_user_public(db_user, variants)
 
 @app.post("/api/auth/change-password", status_code=status.HTTP_204_NO_CONTENT)
 async def change_password(
@@ -190,15 +342,16 @@ async def change_password(
         raise HTTPException(status_code=404, detail="User not found")
 
     # 1. 현재 비밀번호가 맞는지 확인
-    if not verify_password(password_data.current_password, db_user.hashed_password):
+    if not await password_hasher.verify(password_data.current_password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect current password")
 
     # 2. 새 비밀번호를 해싱하여 저장
-    db_user.hashed_password = get_password_hash(password_data.new_password)
+    db_user.hashed_password = await password_hasher.hash(password_data.new_password)
     await session.commit()
     
-    # 3. 비밀번호 변경 후, 현재 세션을 로그아웃 처리
+    # 3. 비밀번호 변경 후, 현재 세션을 로그아웃 처리 (서명 토큰은 다른 기기의 토큰까지 폐기)
     if session_id:
         await delete_session(redis, session_id)
+    await delete_user_sessions(redis, user_id)
     
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
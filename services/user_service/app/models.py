@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import List, Optional
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, SQLModel, col
 
 class User(SQLModel, table=True):
@@ -9,6 +10,17 @@ class User(SQLModel, table=True):
     bio: Optional[str] = None
     profile_image_filename: Optional[str] = None
 
+# 업로드 이미지의 썸네일/중간 크기 파생 이미지 (derivatives.py가 백그라운드에서 기록)
+class ImageDerivative(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("source_filename", "variant"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source_filename: str = Field(index=True, max_length=255)
+    variant: str = Field(max_length=32)
+    filename: str = Field(max_length=255)
+    width: int
+    height: int
+
 class UserCreate(SQLModel):
     username: str
     email: str
@@ -25,6 +37,12 @@ class UserPublic(SQLModel):
     email: str
     bio: Optional[str] = None
     profile_image_url: Optional[str] = None
+    # 파생 이미지가 준비되기 전에는 None이고, 클라이언트는 profile_image_url을 사용합니다.
+    profile_image_thumb_url: Optional[str] = None
+    profile_image_medium_url: Optional[str] = None
+
+class UserBatchRequest(SQLModel):
+    ids: List[int]
 
 class PasswordUpdate(SQLModel):
     current_password: str
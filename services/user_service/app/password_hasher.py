@@ -0,0 +1,83 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from prometheus_client import Counter, Gauge
+from auth import pwd_context, get_password_hash, verify_password
+
+# bcrypt 계산을 맡는 스레드 수. bcrypt는 해싱하는 동안 GIL을 놓기 때문에 스레드로도 코어를 나눠 쓸 수 있습니다.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 실행 중 + 대기 중인 해싱 작업의 최대 개수. 넘으면 바로 503으로 거절합니다.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+HASH_PENDING = Gauge("password_hash_pending", "실행 중이거나 대기 중인 비밀번호 해싱 작업 수")
+HASH_REJECTED = Counter("password_hash_rejected_total", "대기열이 가득 차서 거절한 해싱 요청 수")
+HASH_REHASHED = Counter("password_rehash_total", "로그인 시 새 설정으로 다시 해싱한 비밀번호 수")
+
+
+class PasswordHasherBusy(Exception):
+    """해싱 대기열이 가득 찼을 때 발생합니다. 호출한 쪽은 503으로 응답합니다."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("password hasher is saturated")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """bcrypt 해싱/검증을 이벤트 루프 밖의 전용 스레드 풀에서 실행합니다.
+
+    요청마다 100ms 이상 걸리는 bcrypt가 이벤트 루프를 막으면 같은 워커의 다른 요청이 모두 멈추므로,
+    전용 풀에 넘기고 결과만 기다립니다. 대기열 길이를 제한해서 로그인 폭주가 메모리와 지연 시간을 끝없이 늘리지 않게 합니다.
+    """
+
+    def __init__(self, workers: int, max_pending: int, retry_after: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            HASH_REJECTED.inc()
+            raise PasswordHasherBusy(self.retry_after)
+        self.pending += 1
+        HASH_PENDING.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            HASH_PENDING.dec()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """비밀번호를 검증하고, 저장된 해시가 현재 설정(BCRYPT_ROUNDS)과 다르면 새 해시도 함께 돌려줍니다."""
+        valid, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            self.rehashed += 1
+            HASH_REHASHED.inc()
+        return valid, new_hash
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_RETRY_AFTER)
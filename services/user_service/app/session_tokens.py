@@ -0,0 +1,193 @@
+import os
+import hmac
+import time
+import base64
+import asyncio
+import hashlib
+import secrets
+from typing import Dict, NamedTuple, Optional
+import redis.asyncio as redis
+
+# opaque: Redis에 session:{id} 키를 두는 기존 방식 (기본값)
+# signed: user_id와 만료 시각을 담은 HMAC 서명 토큰. 게이트웨이가 네트워크 호출 없이 검증할 수 있습니다.
+SESSION_MODE = os.getenv("SESSION_MODE", "opaque")
+# user_service와 게이트웨이가 같은 값을 가져야 합니다. 비어 있으면 서명 토큰을 쓰지 않습니다.
+SESSION_SIGNING_KEY = os.getenv("SESSION_SIGNING_KEY", "")
+# 기본값은 opaque 세션 수명(3600초)과 같습니다. 수명의 절반이 지나면 게이트웨이와 /api/auth/me가 새 토큰을 발급합니다.
+SESSION_TOKEN_TTL_SECONDS = int(os.getenv("SESSION_TOKEN_TTL_SECONDS", "3600"))
+
+TOKEN_VERSION = "v1"
+# 폐기된 토큰(jti)과 사용자 단위 폐기(user:{id})를 담는 sorted set. score는 항목을 지워도 되는 시각(ms)입니다.
+REVOKED_KEY = "session:revoked"
+REVOKED_CHANNEL = "session:revoked"
+
+if SESSION_MODE == "signed" and not SESSION_SIGNING_KEY:
+    print("[session] SESSION_MODE=signed but SESSION_SIGNING_KEY is empty; using opaque sessions")
+
+
+class SessionClaims(NamedTuple):
+    user_id: int
+    expires_at_ms: int
+    jti: str
+
+    @property
+    def issued_at_ms(self) -> int:
+        return self.expires_at_ms - SESSION_TOKEN_TTL_SECONDS * 1000
+
+
+def signed_sessions_enabled() -> bool:
+    return SESSION_MODE == "signed" and bool(SESSION_SIGNING_KEY)
+
+
+def is_signed_token(value: str) -> bool:
+    return value.startswith(TOKEN_VERSION + ".")
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(SESSION_SIGNING_KEY.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def sign_session_token(user_id: int) -> str:
+    """v1.{user_id}.{만료 ms}.{jti}.{서명} 형식의 세션 토큰을 만듭니다."""
+    payload = f"{TOKEN_VERSION}.{user_id}.{_now_ms() + SESSION_TOKEN_TTL_SECONDS * 1000}.{secrets.token_urlsafe(9)}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def verify_session_token(token: str) -> Optional[SessionClaims]:
+    """서명과 만료 시각을 확인합니다. 폐기 여부는 따로 확인해야 합니다."""
+    if not SESSION_SIGNING_KEY:
+        return None
+    payload, _, signature = token.rpartition(".")
+    parts = payload.split(".")
+    if len(parts) != 4 or parts[0] != TOKEN_VERSION:
+        return None
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    try:
+        claims = SessionClaims(int(parts[1]), int(parts[2]), parts[3])
+    except ValueError:
+        return None
+    if claims.expires_at_ms <= _now_ms():
+        return None
+    return claims
+
+
+def needs_refresh(claims: SessionClaims) -> bool:
+    """수명의 절반이 지난 토큰은 새로 발급합니다."""
+    return claims.expires_at_ms - _now_ms() < SESSION_TOKEN_TTL_SECONDS * 500
+
+
+async def _publish_revocation(client: redis.Redis, member: str, score: int):
+    pipe = client.pipeline(transaction=False)
+    pipe.zadd(REVOKED_KEY, {member: score})
+    pipe.zremrangebyscore(REVOKED_KEY, "-inf", _now_ms())
+    pipe.publish(REVOKED_CHANNEL, f"{member} {score}")
+    await pipe.execute()
+
+
+async def revoke_session_token(client: redis.Redis, claims: SessionClaims):
+    """로그아웃: 토큰 하나를 만료 시각까지 폐기 목록에 올립니다."""
+    await _publish_revocation(client, claims.jti, claims.expires_at_ms)
+
+
+async def revoke_user_sessions(client: redis.Redis, user_id: int):
+    """비밀번호 변경: 지금까지 발급된 이 사용자의 모든 토큰을 폐기합니다.
+
+    score는 지금 발급된 토큰의 만료 시각이므로, 이보다 먼저 만료되는 토큰(= 지금 이전에 발급된 토큰)이 모두 폐기됩니다.
+    """
+    await _publish_revocation(client, f"user:{user_id}", _now_ms() + SESSION_TOKEN_TTL_SECONDS * 1000)
+
+
+def _revoked_by(claims: SessionClaims, jti_score, user_score) -> bool:
+    return jti_score is not None or (user_score is not None and claims.expires_at_ms <= int(user_score))
+
+
+async def is_revoked(client: redis.Redis, claims: SessionClaims) -> bool:
+    jti_score, user_score = await client.zmscore(REVOKED_KEY, [claims.jti, f"user:{claims.user_id}"])
+    return _revoked_by(claims, jti_score, user_score)
+
+
+class RevocationMirror:
+    """Redis 폐기 목록을 프로세스 메모리에 복제해 두고 pub/sub로 갱신합니다.
+
+    구독을 먼저 시작한 뒤 전체 목록을 읽으므로 그 사이에 폐기된 항목도 놓치지 않습니다.
+    연결이 끊긴 동안에는 ready가 False가 되고, 호출한 쪽은 user_service 확인으로 되돌아가야 합니다.
+    """
+
+    PRUNE_INTERVAL_SECONDS = 60
+
+    def __init__(self, redis_url: Optional[str]):
+        self.redis_url = redis_url
+        self.ready = False
+        self._entries: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[redis.Redis] = None
+        self._next_prune = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.redis_url and SESSION_SIGNING_KEY)
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._client = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.ready = False
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(REVOKED_CHANNEL)
+                entries = await self._client.zrangebyscore(REVOKED_KEY, _now_ms(), "+inf", withscores=True)
+                self._entries = {member: int(score) for member, score in entries}
+                self.ready = True
+                backoff = 1
+                print(f"[session] revocation mirror ready ({len(self._entries)} entries)")
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        member, _, score = message["data"].rpartition(" ")
+                        self._entries[member] = int(score)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.ready = False
+                print(f"[session] revocation mirror disconnected: {e!r}; retrying in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                await pubsub.aclose()
+
+    def _prune(self):
+        now = time.monotonic()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.PRUNE_INTERVAL_SECONDS
+        cutoff = _now_ms()
+        self._entries = {member: score for member, score in self._entries.items() if score > cutoff}
+
+    def is_revoked(self, claims: SessionClaims) -> bool:
+        self._prune()
+        return _revoked_by(claims, self._entries.get(claims.jti), self._entries.get(f"user:{claims.user_id}"))
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "ready": self.ready, "entries": len(self._entries)}
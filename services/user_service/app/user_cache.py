@@ -0,0 +1,271 @@
+import os
+import asyncio
+import secrets
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+import redis.asyncio as redis
+from prometheus_client import Counter, Gauge
+from redis_client import redis_client
+
+# 공개 프로필 캐시 설정 (환경 변수로 조정 가능)
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+# 없는 사용자도 잠깐 기억해서 같은 ID로 DB를 반복 조회하지 않도록 합니다.
+USER_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+# 콜드 키를 DB에서 채우는 동안 다른 워커가 기다리는 시간과 잠금 만료 시간
+USER_CACHE_LOCK_TTL_MS = int(os.getenv("USER_CACHE_LOCK_TTL_MS", "3000"))
+USER_CACHE_LOCK_WAIT_SECONDS = float(os.getenv("USER_CACHE_LOCK_WAIT_SECONDS", "0.5"))
+USER_CACHE_LOCK_POLL_SECONDS = 0.02
+# 사용자별 버전 키의 만료 시간. 진행 중인 채우기보다 충분히 길기만 하면 됩니다.
+USER_CACHE_VERSION_TTL_SECONDS = 86400
+
+# 없는 사용자를 나타내는 값 (UserPublic JSON은 항상 '{'로 시작합니다)
+MISSING = "-"
+
+CACHE_LOOKUPS = Counter("user_cache_lookups_total", "공개 프로필 캐시 조회 결과", ["result"])
+CACHE_STALE_WRITES = Counter("user_cache_stale_writes_skipped_total", "DB를 읽는 동안 무효화되어 저장하지 않은 캐시 값 수")
+
+# 잠금을 잡은 쪽만 풀 수 있도록 값을 비교한 뒤 삭제합니다.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# KEYS[1]: 캐시 키, KEYS[2]: 버전 키, ARGV[1]: DB를 읽기 전에 본 버전, ARGV[2]: 값, ARGV[3]: TTL
+# DB를 읽는 동안 invalidate()가 버전을 올렸으면 그 값은 옛 값일 수 있으므로 저장하지 않습니다.
+_STORE_IF_CURRENT_SCRIPT = """
+local current = redis.call('GET', KEYS[2]) or '0'
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# KEYS[1]: 캐시 키, KEYS[2]: 버전 키, ARGV[1]: 버전 키 TTL
+_INVALIDATE_SCRIPT = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return redis.call('DEL', KEYS[1])
+"""
+
+# user_id -> Optional[UserPublic JSON]
+Loader = Callable[[int], Awaitable[Optional[str]]]
+# user_ids -> {user_id: UserPublic JSON}
+BatchLoader = Callable[[List[int]], Awaitable[Dict[int, str]]]
+
+
+class UserPublicCache:
+    """UserPublic JSON을 Redis에 저장하는 read-through 캐시입니다.
+
+    콜드 키에 요청이 몰려도 DB 조회가 한 번만 일어나도록 두 단계로 막습니다.
+    - 같은 프로세스 안: 진행 중인 조회(Future)를 키별로 공유합니다.
+    - 프로세스 간: SET NX 잠금을 잡은 워커만 DB를 조회하고, 나머지는 캐시가 채워지기를 잠깐 기다립니다.
+    DB를 읽기 전에 사용자별 버전을 보고, 저장할 때 버전이 그대로인 경우에만 씁니다.
+    그래서 수정 커밋 전에 읽은 옛 값이 invalidate() 뒤에 다시 저장되는 일이 없습니다. (단건/배치 조회 모두)
+    Redis에 문제가 있으면 캐시 없이 DB에서 바로 읽습니다.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, negative_ttl: int, lock_ttl_ms: int, lock_wait: float):
+        self.redis = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock_ttl_ms = lock_ttl_ms
+        self.lock_wait = lock_wait
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._store_if_current = client.register_script(_STORE_IF_CURRENT_SCRIPT)
+        self._invalidate = client.register_script(_INVALIDATE_SCRIPT)
+        self.hits = 0
+        self.misses = 0
+        self.lock_waits = 0
+        self.stale_writes_skipped = 0
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"user:public:{user_id}"
+
+    @staticmethod
+    def version_key(user_id: int) -> str:
+        return f"user:public:{user_id}:version"
+
+    def _count(self, hit: bool, amount: int = 1):
+        if not amount:
+            return
+        if hit:
+            self.hits += amount
+        else:
+            self.misses += amount
+        CACHE_LOOKUPS.labels("hit" if hit else "miss").inc(amount)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def get(self, user_id: int, loader: Loader) -> Optional[str]:
+        """캐시된 UserPublic JSON을 반환합니다. 없으면 loader로 채웁니다. 없는 사용자는 None입니다."""
+        try:
+            cached = await self.redis.get(self.key(user_id))
+        except redis.RedisError as e:
+            print(f"[user_cache] redis get failed: {e!r}")
+            return await loader(user_id)
+        if cached is not None:
+            self._count(True)
+            return None if cached == MISSING else cached
+        self._count(False)
+
+        pending = self._inflight.get(user_id)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # 먼저 조회하던 요청이 취소된 경우에는 직접 읽습니다.
+                if not pending.cancelled():
+                    raise
+                return await loader(user_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            value = await self._fill(user_id, loader)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # 기다리는 쪽이 없어도 "exception was never retrieved" 경고가 나지 않도록 합니다.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[user_id]
+
+    async def _fill(self, user_id: int, loader: Loader) -> Optional[str]:
+        key = self.key(user_id)
+        lock_key = f"{key}:lock"
+        token = secrets.token_hex(8)
+        try:
+            locked = await self.redis.set(lock_key, token, nx=True, px=self.lock_ttl_ms)
+        except redis.RedisError:
+            return await loader(user_id)
+
+        if not locked:
+            # 다른 워커가 DB에서 채우는 중이므로 잠깐 기다렸다가 캐시에서 읽습니다.
+            self.lock_waits += 1
+            deadline = asyncio.get_running_loop().time() + self.lock_wait
+            while asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(USER_CACHE_LOCK_POLL_SECONDS)
+                try:
+                    cached = await self.redis.get(key)
+                except redis.RedisError:
+                    break
+                if cached is not None:
+                    return None if cached == MISSING else cached
+            # 기다려도 채워지지 않으면 직접 읽습니다 (잠금을 잡은 워커가 죽었을 수도 있습니다).
+            return await loader(user_id)
+
+        try:
+            try:
+                version = await self.redis.get(self.version_key(user_id)) or "0"
+            except redis.RedisError:
+                return await loader(user_id)
+            value = await loader(user_id)
+            await self._store(user_id, value, version)
+            return value
+        finally:
+            try:
+                await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except redis.RedisError:
+                pass
+
+    def _store_args(self, user_id: int, value: Optional[str], version: str) -> dict:
+        if value is None:
+            args = [version, MISSING, self.negative_ttl]
+        else:
+            args = [version, value, self.ttl]
+        return {"keys": [self.key(user_id), self.version_key(user_id)], "args": args}
+
+    def _count_skipped(self, skipped: int):
+        if skipped:
+            self.stale_writes_skipped += skipped
+            CACHE_STALE_WRITES.inc(skipped)
+
+    async def _store(self, user_id: int, value: Optional[str], version: str):
+        try:
+            stored = await self._store_if_current(**self._store_args(user_id, value, version))
+        except redis.RedisError as e:
+            print(f"[user_cache] redis set failed: {e!r}")
+            return
+        self._count_skipped(0 if stored else 1)
+
+    async def get_many(self, user_ids: Iterable[int], loader: BatchLoader) -> Dict[int, str]:
+        """MGET 한 번으로 여러 사용자를 읽고, 빠진 ID만 loader(IN 쿼리)로 채웁니다."""
+        ids = list(user_ids)
+        if not ids:
+            return {}
+        try:
+            # 값과 함께 버전도 읽어 두고, 빠진 사용자를 저장할 때 단건 조회와 같은 버전 확인을 거칩니다.
+            values = await self.redis.mget(
+                [self.key(user_id) for user_id in ids] + [self.version_key(user_id) for user_id in ids]
+            )
+        except redis.RedisError as e:
+            print(f"[user_cache] redis mget failed: {e!r}")
+            return await loader(ids)
+
+        found: Dict[int, str] = {}
+        missing: List[int] = []
+        versions: Dict[int, str] = {}
+        for user_id, value, version in zip(ids, values[:len(ids)], values[len(ids):]):
+            if value is None:
+                missing.append(user_id)
+                versions[user_id] = version or "0"
+            elif value != MISSING:
+                found[user_id] = value
+        self._count(True, len(ids) - len(missing))
+        self._count(False, len(missing))
+
+        if missing:
+            loaded = await loader(missing)
+            found.update(loaded)
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for user_id in missing:
+                    await self._store_if_current(**self._store_args(user_id, loaded.get(user_id), versions[user_id]), client=pipe)
+                stored = await pipe.execute()
+            except redis.RedisError as e:
+                print(f"[user_cache] redis pipeline failed: {e!r}")
+            else:
+                self._count_skipped(sum(1 for result in stored if not result))
+        return found
+
+    async def invalidate(self, user_id: int):
+        """커밋한 뒤에 호출합니다. 버전을 올리고 키를 지워서, 이미 DB를 읽고 있던 채우기도 옛 값을 저장하지 못하게 합니다."""
+        try:
+            await self._invalidate(
+                keys=[self.key(user_id), self.version_key(user_id)], args=[USER_CACHE_VERSION_TTL_SECONDS]
+            )
+        except redis.RedisError as e:
+            print(f"[user_cache] redis delete failed: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio(), 4),
+            "lock_waits": self.lock_waits,
+            "stale_writes_skipped": self.stale_writes_skipped,
+            "inflight": len(self._inflight),
+        }
+
+
+user_cache = UserPublicCache(
+    redis_client,
+    ttl=USER_CACHE_TTL_SECONDS,
+    negative_ttl=USER_CACHE_NEGATIVE_TTL_SECONDS,
+    lock_ttl_ms=USER_CACHE_LOCK_TTL_MS,
+    lock_wait=USER_CACHE_LOCK_WAIT_SECONDS,
+)
+
+CACHE_HIT_RATIO = Gauge("user_cache_hit_ratio", "공개 프로필 캐시 적중률 (프로세스 시작 이후)")
+CACHE_HIT_RATIO.set_function(user_cache.hit_ratio)
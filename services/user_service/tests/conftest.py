@@ -0,0 +1,9 @@
+import os
+import sys
+
+# 컨테이너 안에서처럼 app 폴더와 공통 모듈(/common)을 기준으로 임포트합니다 (from models import ...).
+TESTS_DIR = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "app"))
+sys.path.insert(1, os.path.join(TESTS_DIR, "..", "..", "common"))
+# database.py는 임포트할 때 엔진을 만들므로 테스트에서는 메모리 sqlite를 씁니다.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
@@ -0,0 +1,110 @@
+import asyncio
+import fakeredis
+from user_cache import MISSING, UserPublicCache
+
+
+def _cache(client) -> UserPublicCache:
+    return UserPublicCache(client, ttl=300, negative_ttl=30, lock_ttl_ms=3000, lock_wait=0.5)
+
+
+class CountingLoader:
+    def __init__(self, values: dict):
+        self.values = values
+        self.calls = []
+
+    async def __call__(self, user_id):
+        self.calls.append(user_id)
+        return self.values.get(user_id)
+
+    async def many(self, user_ids):
+        self.calls.append(list(user_ids))
+        return {user_id: self.values[user_id] for user_id in user_ids if user_id in self.values}
+
+
+def test_invalidation_during_fill_keeps_stale_value_out_of_cache():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        cache = _cache(client)
+
+        async def racy_loader(user_id):
+            # DB에서 옛 값을 읽은 직후 다른 요청이 프로필을 고치고 무효화했습니다.
+            await cache.invalidate(user_id)
+            return '{"name": "old"}'
+
+        assert await cache.get(1, racy_loader) == '{"name": "old"}'
+        assert await client.get(cache.key(1)) is None
+        assert cache.stats()["stale_writes_skipped"] == 1
+
+        fresh = CountingLoader({1: '{"name": "new"}'})
+        assert await cache.get(1, fresh) == '{"name": "new"}'
+        assert await cache.get(1, fresh) == '{"name": "new"}'
+        assert fresh.calls == [1]
+
+    asyncio.run(go())
+
+
+def test_missing_user_is_negatively_cached():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        cache = _cache(client)
+        loader = CountingLoader({})
+        assert await cache.get(9, loader) is None
+        assert await cache.get(9, loader) is None
+        assert loader.calls == [9]
+        assert await client.get(cache.key(9)) == MISSING
+        assert 0 < await client.ttl(cache.key(9)) <= 30
+
+    asyncio.run(go())
+
+
+def test_concurrent_gets_share_one_load():
+    async def go():
+        cache = _cache(fakeredis.FakeAsyncRedis(decode_responses=True))
+        calls = []
+
+        async def slow_loader(user_id):
+            calls.append(user_id)
+            await asyncio.sleep(0.05)
+            return '{"name": "u"}'
+
+        results = await asyncio.gather(*(cache.get(1, slow_loader) for _ in range(5)))
+        assert results == ['{"name": "u"}'] * 5
+        assert calls == [1]
+
+    asyncio.run(go())
+
+
+def test_get_many_returns_found_ids_and_omits_missing_ones():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        cache = _cache(client)
+        await client.set(cache.key(1), '{"id": 1}')
+        loader = CountingLoader({2: '{"id": 2}'})
+
+        assert await cache.get_many([1, 2, 3], loader.many) == {1: '{"id": 1}', 2: '{"id": 2}'}
+        # 캐시에 있던 1번은 DB에서 읽지 않습니다.
+        assert loader.calls == [[2, 3]]
+        assert await client.get(cache.key(2)) == '{"id": 2}'
+        assert await client.get(cache.key(3)) == MISSING
+
+        assert await cache.get_many([1, 2, 3], loader.many) == {1: '{"id": 1}', 2: '{"id": 2}'}
+        assert loader.calls == [[2, 3]]
+
+    asyncio.run(go())
+
+
+def test_get_many_skips_storing_users_invalidated_during_load():
+    async def go():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        cache = _cache(client)
+
+        async def racy_many(user_ids):
+            await cache.invalidate(2)
+            return {user_id: f'{{"id": {user_id}}}' for user_id in user_ids}
+
+        assert await cache.get_many([1, 2], racy_many) == {1: '{"id": 1}', 2: '{"id": 2}'}
+        assert await client.get(cache.key(1)) == '{"id": 1}'
+        assert await client.get(cache.key(2)) is None
+        assert cache.stats()["stale_writes_skipped"] == 1
+
+    asyncio.run(go())